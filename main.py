@@ -1,11 +1,14 @@
+import argparse
 import asyncio
 import signal
-import tkinter as tk
+from typing import Optional
 
 from src.api import TGTGApiClient
 from src.config import TGTGSettings
-from src.gui import CredentialsWindow, TGTGStyles, MainWindow
-from src.utils import NiceLogger
+from src.utils import NiceLogger, AsyncLoopThread, TkAsyncBridge
+
+# Moduły Tk (tkinter, src.gui, plyer) są importowane dopiero w trybie z GUI,
+# dzięki czemu tryb --headless działa na serwerze bez środowiska graficznego.
 
 
 class TGTGDetector:
@@ -19,10 +22,17 @@ class TGTGDetector:
 
         self.is_running = True
         self.api_client = None
-        self.settings = TGTGSettings()
+        self.settings = TGTGSettings.instance()
         self.root = None
+        self.bridge = None
         self.main_window = None
         self.last_check_time = None
+        # Błąd logowania zgłoszony w callbacku mostu — start() rzuca go po zamknięciu pętli Tk
+        self.login_error: Optional[BaseException] = None
+
+        # Cała praca sieciowa odbywa się w jednej pętli asyncio w wątku tła
+        self.loop_thread = AsyncLoopThread()
+        self.loop_thread.start()
 
         self.logger.debug("Konfiguracja obsługi sygnałów...")
         self._setup_signal_handlers()
@@ -68,6 +78,9 @@ class TGTGDetector:
 
         try:
             if not self.root:
+                import tkinter as tk
+                from src.gui import TGTGStyles
+
                 self.root = tk.Tk()
                 self.logger.debug("Utworzono nowy obiekt Tk")
 
@@ -79,6 +92,10 @@ class TGTGDetector:
                 TGTGStyles.apply_theme(self.root)
                 self.logger.debug("Zastosowano style")
 
+                # Wyniki zadań z pętli w tle trafiają do wątku Tk przez most
+                self.bridge = TkAsyncBridge(self.root, self.loop_thread)
+                self.bridge.start()
+
                 self.logger.debug("Główne okno zostało utworzone")
             else:
                 self.logger.debug("Główne okno już istnieje")
@@ -87,40 +104,23 @@ class TGTGDetector:
             self.logger.error(f"Błąd podczas tworzenia głównego okna: {e}", exc_info=True)
             raise
 
-    async def _show_credentials_window(self):
+    def _show_credentials_window(self):
         """Pokazuje okno logowania i czeka na wprowadzenie danych"""
         self.logger.info("=== Pokazywanie okna logowania ===")
 
         try:
             self._create_root_window()
 
-            self.logger.debug("Tworzenie okna credentials...")
-            credentials_window = CredentialsWindow(self.root)
-
-            async def update_window():
-                while credentials_window.is_active:
-                    try:
-                        credentials_window.update()
-                        await asyncio.sleep(0.05)
-                    except Exception as ex:
-                        self.logger.error(f"Błąd podczas aktualizacji okna credentials: {ex}")
-                        break
+            from src.gui import CredentialsWindow
 
-            self.logger.debug("Uruchamianie pętli aktualizacji okna...")
-            update_task = asyncio.create_task(update_window())
+            self.logger.debug("Tworzenie okna credentials...")
+            credentials_window = CredentialsWindow(self.root, self.bridge)
 
-            await credentials_window.wait_for_completion()
+            # Pętla Tk obsługuje okno do jego zamknięcia; postęp logowania przychodzi zdarzeniami
+            credentials_window.wait()
             self.logger.debug("Okno credentials zakończyło pracę")
 
-            update_task.cancel()
-            try:
-                await update_task
-            except asyncio.CancelledError:
-                self.logger.debug("Task aktualizacji okna został anulowany")
-
-            # Reload konfiguracji po zamknięciu okna credentials
-            self.logger.debug("Przeładowywanie konfiguracji po logowaniu...")
-            self.settings = TGTGSettings()  # To przeładuje konfigurację z pliku
+            # Okno credentials zapisuje dane we współdzielonych ustawieniach — nie trzeba ich przeładowywać
 
             if not self._has_valid_credentials():
                 self.logger.critical("Nie wprowadzono wymaganych danych logowania!")
@@ -130,13 +130,32 @@ class TGTGDetector:
             self.logger.error(f"Błąd w oknie credentials: {e}", exc_info=True)
             raise
 
+    def _create_main_window(self):
+        """Tworzy i od razu pokazuje główne okno z ostatnim znanym stanem paczek"""
+        self.logger.info("=== Tworzenie głównego okna aplikacji ===")
+
+        try:
+            self.logger.debug("Inicjalizacja głównego okna...")
+            from src.gui import MainWindow
+
+            self.main_window = MainWindow(self.root, self.api_client, self.bridge)
+
+            # Wyrenderuj migawkę przed logowaniem i pierwszym zapytaniem sieciowym
+            self.root.deiconify()
+            self.root.update()
+            self.logger.debug("Główne okno wyrenderowane z migawki")
+
+        except Exception as e:
+            self.logger.error(f"Błąd podczas tworzenia głównego okna: {e}", exc_info=True)
+            raise
+
     def _show_main_window(self):
         """Pokazuje główne okno aplikacji"""
         self.logger.info("=== Uruchamianie głównego okna aplikacji ===")
 
         try:
-            self.logger.debug("Inicjalizacja głównego okna...")
-            self.main_window = MainWindow(self.root, self.api_client)
+            if not self.main_window:
+                self._create_main_window()
 
             self.logger.debug("Uruchamianie głównego okna...")
             self.main_window.run()
@@ -154,7 +173,49 @@ class TGTGDetector:
         if self.root:
             self.root.quit()
 
-    async def start(self):
+    def _login(self, retry: bool = True):
+        """
+        Zleca logowanie klienta API do pętli w tle, aby jego sesja należała do tej pętli.
+        Nie blokuje wątku Tk — wynik przychodzi do _on_login_done / _on_login_failed.
+        """
+        timeout = self.settings.config.get('login_timeout', 300)
+        login = self.api_client.login(
+            email=self.settings.config['email'],
+            access_token=self.settings.config.get('access_token')
+        )
+        self.bridge.submit(
+            asyncio.wait_for(login, timeout),
+            on_done=lambda _: self._on_login_done(retry),
+            on_error=lambda e: self._on_login_failed(e, retry)
+        )
+
+    def _on_login_done(self, retry: bool):
+        """Uruchamia monitorowanie po zalogowaniu (w wątku Tk)"""
+        if not self.api_client.is_logged_in:
+            self._on_login_failed(Exception("Nie udało się zalogować"), retry)
+            return
+
+        self.logger.info("Poprawnie zalogowano, uruchamiam monitorowanie...")
+        self.main_window.start_monitoring()
+
+    def _on_login_failed(self, error: BaseException, retry: bool):
+        """Po nieudanym logowaniu pokazuje okno logowania i próbuje raz jeszcze (w wątku Tk)"""
+        self.logger.error(f"Błąd logowania: {error}")
+        if not retry:
+            self.login_error = error
+            self.root.quit()
+            return
+
+        self.logger.info("Próbuję ponownie z nowymi danymi logowania...")
+        try:
+            self._show_credentials_window()
+        except Exception as e:
+            self.login_error = e
+            self.root.quit()
+            return
+        self._login(retry=False)
+
+    def start(self):
         """Główna metoda startująca aplikację"""
         self.logger.info("=== Uruchamianie aplikacji TGTG Monitor ===")
 
@@ -165,43 +226,33 @@ class TGTGDetector:
             # Sprawdź dane logowania
             if not self._has_valid_credentials():
                 self.logger.warning("Brak wymaganych danych logowania. Otwieram okno logowania...")
-                await self._show_credentials_window()
+                self._show_credentials_window()
 
             # Inicjalizacja API
             self.logger.debug("Inicjalizacja API...")
             self.api_client = TGTGApiClient()
 
-            try:
-                self.logger.debug("Próba logowania z zapisanymi danymi...")
-                await self.api_client.login(
-                    email=self.settings.config['email'],
-                    access_token=self.settings.config.get('access_token')
-                )
-            except Exception as e:
-                self.logger.error(f"Błąd logowania z zapisanymi danymi: {e}")
-                self.logger.info("Próbuję ponownie z nowymi danymi logowania...")
-                await self._show_credentials_window()
-                await self.api_client.login(
-                    email=self.settings.config['email'],
-                    access_token=self.settings.config.get('access_token')
-                )
-
-            # Pokaż główne okno
-            if self.api_client and self.api_client.is_logged_in:
-                self.logger.info("Poprawnie zalogowano, pokazuję główne okno...")
-                self._show_main_window()
-            else:
-                raise Exception("Nie udało się zalogować")
+            # Warm start — okno z migawką pojawia się przed logowaniem
+            self._create_main_window()
+
+            # Logowanie trwa w tle, a okno pozostaje responsywne; monitorowanie
+            # rusza w _on_login_done
+            self.logger.debug("Próba logowania z zapisanymi danymi...")
+            self._login()
+            self._show_main_window()
 
-        except asyncio.CancelledError:
-            self.logger.warning("Otrzymano żądanie anulowania...")
+            if self.login_error is not None:
+                raise Exception(f"Nie udało się zalogować: {self.login_error}")
+
+        except KeyboardInterrupt:
+            self.logger.warning("Otrzymano żądanie przerwania...")
         except Exception as e:
             self.logger.error(f"Wystąpił błąd w głównej pętli: {e}", exc_info=True)
             raise
         finally:
-            await self.stop()
+            self.stop()
 
-    async def stop(self):
+    def stop(self):
         """Bezpieczne zatrzymanie aplikacji"""
         self.logger.info("=== Zatrzymywanie aplikacji ===")
 
@@ -211,7 +262,13 @@ class TGTGDetector:
 
             if self.api_client:
                 self.logger.debug("Czyszczenie API client...")
-                await self.api_client.cleanup()
+                try:
+                    self.loop_thread.run_sync(self.api_client.cleanup(), timeout=5)
+                except Exception as e:
+                    self.logger.error(f"Błąd podczas czyszczenia API client: {e}")
+
+            self.loop_thread.stop()
+            self.settings.flush()
 
             if self.root:
                 self.logger.debug("Zamykanie głównego okna...")
@@ -226,46 +283,43 @@ class TGTGDetector:
         except Exception as e:
             self.logger.error(f"Błąd podczas zatrzymywania aplikacji: {e}", exc_info=True)
 
-    def run(self):
-        """Uruchamia główne okno"""
-        self.logger.info("=== Uruchamianie głównego okna ===")
-        try:
-            if not self.root.winfo_ismapped():
-                self.logger.debug("Okno nie jest widoczne, pokazuję...")
-                self.root.deiconify()
 
-            self.logger.debug("Uruchamiam główną pętlę...")
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="TGTG Detector — monitorowanie paczek Too Good To Go")
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help="uruchom bez GUI; lokalizacja, filtry i dane logowania są czytane z config.json"
+    )
+    return parser.parse_args()
 
-            # Utworzenie i ustawienie pętli zdarzeń
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
 
-            def update():
-                if self.is_running:
-                    try:
-                        loop.run_until_complete(asyncio.sleep(0.1))
-                        self.root.after(100, update)
-                    except Exception as e:
-                        self.logger.error(f"Błąd w pętli update: {e}")
+def run_headless():
+    from src.core import HeadlessDaemon
 
-            update()
-            self.root.mainloop()
-            self.logger.info("Główna pętla okna zakończona")
+    logger = NiceLogger("Main").get_logger()
+    try:
+        asyncio.run(HeadlessDaemon().run())
+    except KeyboardInterrupt:
+        logger.warning("Otrzymano KeyboardInterrupt")
+    finally:
+        logger.info("=== Zakończenie działania aplikacji ===")
 
-        except Exception as e:
-            self.logger.error(f"Błąd podczas uruchamiania głównego okna: {e}", exc_info=True)
-            raise
 
+def main():
+    args = _parse_args()
+    if args.headless:
+        run_headless()
+        return
 
-async def main():
     logger = NiceLogger("Main").get_logger()
     detector = TGTGDetector()
     try:
         logger.info("=== Uruchamianie głównej funkcji aplikacji ===")
-        await detector.start()
+        detector.start()
     except KeyboardInterrupt:
         logger.warning("Otrzymano KeyboardInterrupt")
-        await detector.stop()
+        detector.stop()
     except Exception as e:
         logger.critical(f"Krytyczny błąd programu: {e}", exc_info=True)
         raise
@@ -274,4 +328,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,3 +1,24 @@
-from .tgtg_client import TGTGApiClient
+from .details import ItemDetailCache
+from .models import ItemRecord, Store
+from .stores import StoreCatalogue
+from .tgtg_client import TGTGApiClient, IncompleteFetchError
+from .transport import AsyncTGTGTransport, TGTGTransportError
+from .sweep import SweepEngine, SweepFailedError, SweepStatus, QueryCircle
+from .geocoder import Geocoder, GeocodingError
 
-__all__ = ['TGTGApiClient']
\ No newline at end of file
+__all__ = [
+    'TGTGApiClient',
+    'IncompleteFetchError',
+    'ItemRecord',
+    'Store',
+    'StoreCatalogue',
+    'ItemDetailCache',
+    'AsyncTGTGTransport',
+    'TGTGTransportError',
+    'SweepEngine',
+    'SweepFailedError',
+    'SweepStatus',
+    'QueryCircle',
+    'Geocoder',
+    'GeocodingError'
+]
\ No newline at end of file
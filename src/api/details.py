@@ -0,0 +1,210 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import TGTGSettings
+from ..utils import NiceLogger
+
+# Czas ważności pól szczegółów (s) — opis i miejsce odbioru zmieniają się rzadko, ocena częściej
+FIELD_TTLS: Dict[str, float] = {
+    'description': 7 * 24 * 3600,
+    'collection_info': 24 * 3600,
+    'pickup_address': 24 * 3600,
+    'rating': 6 * 3600,
+}
+
+# Odbiorca szczegółów: (item_id, pola lub None po błędzie). Wywoływany w wątku pętli asyncio.
+DetailCallback = Callable[[str, Optional[Dict[str, Any]]], None]
+
+
+def extract_detail_fields(detail: Dict[str, Any]) -> Dict[str, Any]:
+    """Wyciąga z odpowiedzi GET item pola, których brakuje na liście paczek"""
+    item = detail.get('item') or {}
+    rating = (item.get('average_overall_rating') or {}).get('average_overall_rating')
+    pickup_address = ((detail.get('pickup_location') or {}).get('address') or {}).get('address_line')
+    return {
+        'description': (item.get('description') or '').strip(),
+        'collection_info': (item.get('collection_info') or '').strip(),
+        'pickup_address': pickup_address or '',
+        'rating': float(rating) if rating else None,
+    }
+
+
+class ItemDetailCache:
+    """
+    Pamięć podręczna szczegółów paczek (GET item) z czasem ważności per pole.
+
+    get() nigdy nie czeka na sieć: zwraca znane wartości, a brakujące lub
+    przeterminowane pola zleca do pobrania. Zlecenia są zbierane w kolejce
+    i pobierane w tle partiami, z ograniczoną liczbą równoczesnych żądań
+    i przerwą między partiami. Po pobraniu subskrybenci dostają komplet pól.
+
+    get() i request() można wołać z dowolnego wątku; pobieranie działa
+    w pętli asyncio, w której wywołano start().
+    """
+
+    MAX_ENTRIES = 2000
+    # Przerwa przed ponowną próbą dla paczki, której nie udało się pobrać (s)
+    RETRY_AFTER = 300
+
+    def __init__(self, api_client, settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("ItemDetailCache").get_logger()
+        self.api_client = api_client
+        self.settings = settings or TGTGSettings.instance()
+
+        # item_id -> {pole: (wartość, czas pobrania)}
+        self._entries: "OrderedDict[str, Dict[str, Tuple[Any, float]]]" = OrderedDict()
+        self._failed_until: Dict[str, float] = {}
+        self._queue: "OrderedDict[str, None]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._subscribers: List[DetailCallback] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Uruchamia pobieranie w tle — wywoływać w wątku pętli asyncio"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._worker = self._loop.create_task(self._run())
+        if self._queue:
+            self._wakeup.set()
+        self.logger.debug("Uruchomiono pobieranie szczegółów paczek w tle")
+
+    def subscribe(self, callback: DetailCallback):
+        """Rejestruje odbiorcę pobranych szczegółów"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: DetailCallback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def get(self, item_id: str, fields: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Zwraca (znane pola, czy wszystkie żądane pola są aktualne).
+        Brakujące lub przeterminowane pola są zlecane do pobrania w tle.
+        """
+        fields = list(fields or FIELD_TTLS)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(item_id)
+            if entry is not None:
+                self._entries.move_to_end(item_id)
+                values = {name: value for name, (value, _) in entry.items()}
+                fresh = all(
+                    name in entry and now - entry[name][1] < FIELD_TTLS.get(name, 0)
+                    for name in fields
+                )
+            else:
+                values, fresh = {}, False
+
+        if not fresh:
+            self.request([item_id])
+        return values, fresh
+
+    def request(self, item_ids: Iterable[str]):
+        """Kolejkuje pobranie szczegółów (bez czekania na wynik)"""
+        now = time.time()
+        added = 0
+        with self._lock:
+            for item_id in item_ids:
+                if item_id in self._queue or item_id in self._in_flight:
+                    continue
+                if item_id in self._failed_until:
+                    if self._failed_until[item_id] > now:
+                        continue
+                    del self._failed_until[item_id]
+                self._queue[item_id] = None
+                added += 1
+
+        if added and self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Pętla została już zamknięta
+                pass
+
+    def is_pending(self, item_id: str) -> bool:
+        """Czy szczegóły paczki czekają w kolejce lub są właśnie pobierane"""
+        with self._lock:
+            return item_id in self._queue or item_id in self._in_flight
+
+    def _take_batch(self, size: int) -> List[str]:
+        with self._lock:
+            batch = []
+            while self._queue and len(batch) < size:
+                item_id, _ = self._queue.popitem(last=False)
+                batch.append(item_id)
+            self._in_flight.update(batch)
+            return batch
+
+    async def _run(self):
+        """Pobiera zakolejkowane szczegóły partiami"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            config = self.settings.config
+            batch = self._take_batch(max(1, int(config.get('detail_batch_size', 10))))
+            if not batch:
+                continue
+
+            self.logger.debug("Pobieranie szczegółów %d paczek", len(batch))
+            semaphore = asyncio.Semaphore(max(1, int(config.get('detail_concurrency', 2))))
+            await asyncio.gather(*(self._fetch(item_id, semaphore) for item_id in batch))
+
+            # Przerwa między partiami ogranicza liczbę zapytań, gdy kolejka jest długa
+            if self._queue:
+                await asyncio.sleep(float(config.get('detail_batch_delay', 1.0)))
+                self._wakeup.set()
+
+    async def _fetch(self, item_id: str, semaphore: asyncio.Semaphore):
+        try:
+            async with semaphore:
+                detail = await self.api_client.get_item(item_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Nie udało się pobrać szczegółów paczki {item_id}: {e}")
+            with self._lock:
+                self._in_flight.discard(item_id)
+                self._failed_until[item_id] = time.time() + self.RETRY_AFTER
+            self._notify(item_id, None)
+            return
+
+        fields = extract_detail_fields(detail)
+        now = time.time()
+        with self._lock:
+            self._in_flight.discard(item_id)
+            self._failed_until.pop(item_id, None)
+            self._entries[item_id] = {name: (value, now) for name, value in fields.items()}
+            self._entries.move_to_end(item_id)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+        self._notify(item_id, fields)
+
+    def _notify(self, item_id: str, fields: Optional[Dict[str, Any]]):
+        for callback in list(self._subscribers):
+            try:
+                callback(item_id, fields)
+            except Exception as e:
+                self.logger.error(f"Błąd w subskrybencie szczegółów paczki: {e}")
+
+    async def close(self):
+        """Zatrzymuje pobieranie w tle"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
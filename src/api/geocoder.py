@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Optional, Tuple, Dict, List, Any
+
+import aiohttp
+
+from ..utils import NiceLogger
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = 'TGTG_Detector/1.0 (https://github.com/philornot/TGTGDetector)'
+
+
+class GeocodingError(Exception):
+    """Błąd usługi geokodowania"""
+
+
+def normalize_address(address: str) -> str:
+    """Normalizuje adres do postaci używanej jako klucz cache"""
+    address = address.casefold()
+    address = re.sub(r'\s*,\s*', ', ', address)
+    address = re.sub(r'\s+', ' ', address)
+    return address.strip(' ,')
+
+
+class Geocoder:
+    """
+    Współdzielony geokoder Nominatim.
+
+    Używa jednej sesji HTTP, trwałego cache na dysku (klucz: znormalizowany adres)
+    i ogranicza zapytania do jednego na sekundę zgodnie z polityką Nominatim.
+    Powtórne zapytania o ten sam adres nie wychodzą do sieci.
+    """
+
+    MIN_REQUEST_INTERVAL = 1.0
+    NEGATIVE_TTL = 24 * 3600
+
+    def __init__(self, cache_path: Path, country_code: str = 'pl'):
+        self.logger = NiceLogger("Geocoder").get_logger()
+        self.cache_path = Path(cache_path)
+        self.country_code = country_code
+
+        # adres -> [lat, lon] lub [None, znacznik czasu] dla nieznalezionych
+        self._cache: Dict[str, List[Any]] = self._load_cache()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._rate_lock: Optional[asyncio.Lock] = None
+        self._last_request = 0.0
+
+    def _load_cache(self) -> Dict[str, List[Any]]:
+        """Wczytuje cache geokodowania z dysku"""
+        if not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            self.logger.debug(f"Wczytano cache geokodowania: {len(cache)} adresów")
+            return cache
+        except Exception as e:
+            self.logger.error(f"Błąd podczas wczytywania cache geokodowania: {e}")
+            return {}
+
+    def _save_cache(self):
+        """Zapisuje cache geokodowania atomowo"""
+        tmp_path = self.cache_path.with_suffix(self.cache_path.suffix + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, separators=(',', ':'), ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            self.logger.error(f"Błąd podczas zapisywania cache geokodowania: {e}")
+
+    def lookup_cached(self, address: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Zwraca (czy_trafienie, współrzędne) bez wykonywania zapytania"""
+        entry = self._cache.get(normalize_address(address))
+        if entry is None:
+            return False, None
+        if entry[0] is None:
+            # Negatywny wynik wygasa, bo adres mógł zostać dodany do OSM
+            if time.time() - entry[1] > self.NEGATIVE_TTL:
+                return False, None
+            return True, None
+        return True, (entry[0], entry[1])
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Zwraca współdzieloną sesję HTTP"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=2, ttl_dns_cache=300),
+                headers={'User-Agent': USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+            self._session_loop = loop
+            self._rate_lock = asyncio.Lock()
+        return self._session
+
+    async def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        """Geokoduje adres, korzystając z cache"""
+        hit, coords = self.lookup_cached(address)
+        if hit:
+            self.logger.debug("Cache geokodowania: %s -> %s", address, coords)
+            return coords
+
+        session = await self._get_session()
+        key = normalize_address(address)
+
+        async with self._rate_lock:
+            # Inne zapytanie mogło w międzyczasie uzupełnić cache
+            hit, coords = self.lookup_cached(address)
+            if hit:
+                return coords
+
+            wait = self.MIN_REQUEST_INTERVAL - (time.monotonic() - self._last_request)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            params = {
+                'q': address,
+                'format': 'json',
+                'limit': 1,
+                'countrycodes': self.country_code
+            }
+            self.logger.debug(f"Wysyłanie zapytania do: {NOMINATIM_URL}")
+            try:
+                async with session.get(NOMINATIM_URL, params=params) as response:
+                    if response.status == 429:
+                        raise GeocodingError("Przekroczono limit zapytań. Spróbuj ponownie za kilka minut.")
+
+                    if response.status != 200:
+                        error_msg = await response.text()
+                        self.logger.error(f"Błąd serwera {response.status}: {error_msg}")
+                        raise GeocodingError(f"Błąd serwera: {response.status}")
+
+                    data = await response.json()
+            finally:
+                self._last_request = time.monotonic()
+
+        if not data:
+            self._cache[key] = [None, time.time()]
+            self._save_cache()
+            return None
+
+        try:
+            coords = (float(data[0]['lat']), float(data[0]['lon']))
+        except (KeyError, ValueError, IndexError) as e:
+            self.logger.error(f"Błąd parsowania danych: {e}")
+            raise GeocodingError("Nieprawidłowy format danych z serwera")
+
+        self._cache[key] = [coords[0], coords[1]]
+        self._save_cache()
+        return coords
+
+    async def geocode_many(self, addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Geokoduje wiele adresów — trafienia w cache wracają od razu, reszta z limitem zapytań"""
+        results = {}
+        for address in addresses:
+            try:
+                results[address] = await self.geocode(address)
+            except GeocodingError as e:
+                self.logger.error(f"Nie udało się geokodować '{address}': {e}")
+                results[address] = None
+        return results
+
+    async def close(self):
+        """Zamyka sesję HTTP"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,235 @@
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .stores import StoreCatalogue
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Zamienia czas ISO 8601 z API (np. 2024-01-01T10:00:00Z) na datetime ze strefą"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _intern(value: Optional[str]) -> str:
+    """Interning powtarzających się napisów (nazwy sklepów, miasta) — jedna kopia w pamięci"""
+    return sys.intern(value) if value else ''
+
+
+class Store:
+    """
+    Dane sklepu, które praktycznie się nie zmieniają (nazwa, adres, położenie, logo).
+
+    Jeden obiekt na store_id, współdzielony przez wszystkie paczki sklepu
+    (zob. StoreCatalogue). Flaga favorite odzwierciedla favorite_stores z konfiguracji.
+    """
+
+    __slots__ = ('store_id', 'name', 'address', 'city', 'latitude', 'longitude', 'logo_url', 'favorite')
+
+    FIELDS = ('name', 'address', 'city', 'latitude', 'longitude', 'logo_url')
+
+    def __init__(
+            self,
+            store_id: str,
+            name: str = '',
+            address: str = '',
+            city: str = '',
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            logo_url: str = ''
+    ):
+        self.store_id = store_id
+        self.name = _intern(name)
+        self.address = address or ''
+        self.city = _intern(city)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.logo_url = logo_url or ''
+        self.favorite = False
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'Store':
+        """Tworzy sklep z sekcji 'store' odpowiedzi API"""
+        location = data.get('store_location') or {}
+        address = location.get('address') or {}
+        coordinates = location.get('location') or {}
+        return cls(
+            store_id=str(data.get('store_id', '')),
+            name=data.get('store_name') or '',
+            address=address.get('address_line') or '',
+            city=address.get('city') or '',
+            latitude=coordinates.get('latitude'),
+            longitude=coordinates.get('longitude'),
+            logo_url=(data.get('logo_picture') or {}).get('current_url') or ''
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Store':
+        """Odtwarza sklep zapisany przez to_dict"""
+        return cls(
+            store_id=str(data.get('store_id', '')),
+            name=data.get('store_name') or '',
+            address=data.get('address') or '',
+            city=data.get('city') or '',
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
+            logo_url=data.get('logo_url') or ''
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'store_id': self.store_id,
+            'store_name': self.name,
+            'address': self.address,
+            'city': self.city,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'logo_url': self.logo_url,
+        }
+
+    def update_from(self, other: 'Store') -> bool:
+        """Przepisuje dane z nowszej wersji sklepu; zwraca True, jeśli coś się zmieniło"""
+        changed = False
+        for name in self.FIELDS:
+            value = getattr(other, name)
+            if value != getattr(self, name):
+                setattr(self, name, value)
+                changed = True
+        return changed
+
+    def __repr__(self) -> str:
+        return f"Store({self.store_id!r}, {self.name!r})"
+
+
+class ItemRecord:
+    """
+    Zwarty rekord paczki tworzony zaraz po pobraniu odpowiedzi API.
+
+    Przechowuje tylko zmienne pola paczki, już sparsowane: cenę w groszach,
+    odległość, granice odbioru jako datetime. Dane sklepu nie są kopiowane —
+    rekord wskazuje na współdzielony obiekt Store. __slots__ eliminuje słownik
+    atrybutów, a pełna odpowiedź API nie jest trzymana.
+    """
+
+    __slots__ = (
+        'item_id', 'store', 'item_name', 'price', 'items_available',
+        'distance', 'pickup_start', 'pickup_end'
+    )
+
+    def __init__(
+            self,
+            item_id: str,
+            store: Store,
+            item_name: str = '',
+            price: Optional[int] = None,
+            items_available: int = 0,
+            distance: float = 0.0,
+            pickup_start: Optional[datetime] = None,
+            pickup_end: Optional[datetime] = None
+    ):
+        self.item_id = item_id
+        self.store = store
+        self.item_name = item_name or ''
+        # Cena w groszach (minor units)
+        self.price = price
+        self.items_available = items_available
+        # Odległość od punktu zapytania — zależy od zapytania, nie od sklepu
+        self.distance = distance
+        self.pickup_start = pickup_start
+        self.pickup_end = pickup_end
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any], stores: Optional['StoreCatalogue'] = None) -> 'ItemRecord':
+        """Tworzy rekord z (zagnieżdżonej) odpowiedzi API; sklep trafia do katalogu"""
+        store_data = data.get('store') or {}
+        details = data.get('item') or {}
+        price = (details.get('price_including_taxes') or {}).get('minor_units')
+        pickup = data.get('pickup_interval') or {}
+
+        store = Store.from_api(store_data)
+        if stores is not None:
+            store = stores.intern(store)
+
+        return cls(
+            item_id=str(details.get('item_id', '')),
+            store=store,
+            item_name=details.get('name') or '',
+            price=int(price) if price is not None else None,
+            items_available=int(data.get('items_available', 0) or 0),
+            distance=float(store_data.get('distance', 0) or 0),
+            pickup_start=parse_datetime(pickup.get('start')),
+            pickup_end=parse_datetime(pickup.get('end'))
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], stores: Optional['StoreCatalogue'] = None) -> 'ItemRecord':
+        """
+        Odtwarza rekord zapisany przez to_dict (np. z migawki). Sklep jest brany
+        z katalogu, a gdy go tam nie ma — z pól sklepu zapisanych obok paczki.
+        """
+        store_id = str(data.get('store_id', ''))
+        store = stores.get(store_id) if stores is not None else None
+        if store is None:
+            store = Store.from_dict(data)
+            if stores is not None:
+                store = stores.intern(store)
+
+        return cls(
+            item_id=str(data.get('item_id', '')),
+            store=store,
+            item_name=data.get('item_name') or '',
+            price=data.get('price'),
+            items_available=int(data.get('items_available', 0) or 0),
+            distance=float(data.get('distance', 0) or 0),
+            pickup_start=parse_datetime(data.get('pickup_start')),
+            pickup_end=parse_datetime(data.get('pickup_end'))
+        )
+
+    @property
+    def store_id(self) -> str:
+        return self.store.store_id
+
+    @property
+    def store_name(self) -> str:
+        return self.store.name
+
+    @property
+    def address(self) -> str:
+        return self.store.address
+
+    @property
+    def city(self) -> str:
+        return self.store.city
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Płaski słownik gotowy do zapisu w JSON; sklep tylko przez store_id"""
+        return {
+            'item_id': self.item_id,
+            'store_id': self.store_id,
+            'item_name': self.item_name,
+            'price': self.price,
+            'items_available': self.items_available,
+            'distance': self.distance,
+            'pickup_start': self.pickup_start.isoformat() if self.pickup_start else None,
+            'pickup_end': self.pickup_end.isoformat() if self.pickup_end else None,
+        }
+
+    @property
+    def price_value(self) -> float:
+        """Cena w złotych"""
+        return (self.price or 0) / 100
+
+    def format_pickup(self) -> str:
+        """Okno odbioru w czasie lokalnym, np. '17.10 18:00 - 19:30'"""
+        if not self.pickup_start or not self.pickup_end:
+            return ''
+        start, end = self.pickup_start.astimezone(), self.pickup_end.astimezone()
+        return f"{start:%d.%m %H:%M} - {end:%H:%M}"
+
+    def __repr__(self) -> str:
+        return f"ItemRecord({self.item_id!r}, {self.store_name!r}, {self.price_value:.2f} PLN, x{self.items_available})"
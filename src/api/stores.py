@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from .models import Store
+from ..utils import NiceLogger
+
+CATALOGUE_VERSION = 1
+
+
+class StoreCatalogue:
+    """
+    Katalog sklepów kluczowany po store_id.
+
+    Dane sklepu (nazwa, adres, położenie, logo) są przechowywane raz, niezależnie
+    od liczby paczek i sprawdzeń — paczki wskazują na obiekty Store z katalogu.
+    Katalog jest zapisywany na dysku, więc przetrwa ponowne uruchomienie.
+    Dodawanie sklepów odbywa się w wątku pętli asyncio, odczyty mogą przychodzić
+    z wątku Tk — zmiany słownika chroni blokada.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.logger = NiceLogger("StoreCatalogue").get_logger()
+        self.path = Path(path) if path else None
+        self._stores: Dict[str, Store] = {}
+        self._favorites: Set[str] = set()
+        self._lock = threading.Lock()
+        # Zapis może przyjść z wątku roboczego — pliki zapisujemy pojedynczo
+        self._save_lock = threading.Lock()
+        self._dirty = False
+
+        if self.path:
+            self._load()
+
+    def _load(self):
+        """Wczytuje zapisany katalog"""
+        if not self.path.exists():
+            self.logger.debug("Brak zapisanego katalogu sklepów")
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CATALOGUE_VERSION:
+                self.logger.warning("Nieobsługiwana wersja katalogu sklepów, pomijam")
+                return
+
+            for entry in data.get('stores', []):
+                store = Store.from_dict(entry)
+                self._stores[store.store_id] = store
+            self.logger.debug(f"Wczytano katalog sklepów: {len(self._stores)}")
+        except Exception as e:
+            self.logger.error(f"Błąd podczas wczytywania katalogu sklepów: {e}")
+
+    def save(self):
+        """Zapisuje katalog atomowo, jeśli od ostatniego zapisu coś się zmieniło"""
+        if not self.path or not self._dirty:
+            return
+
+        with self._lock:
+            data = {
+                'version': CATALOGUE_VERSION,
+                'stores': [store.to_dict() for store in self._stores.values()],
+            }
+            self._dirty = False
+
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        try:
+            with self._save_lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            self.logger.debug(f"Zapisano katalog sklepów: {len(data['stores'])}")
+        except Exception as e:
+            self._dirty = True
+            self.logger.error(f"Błąd podczas zapisywania katalogu sklepów: {e}")
+
+    def intern(self, store: Store) -> Store:
+        """
+        Zwraca obiekt z katalogu dla danego sklepu, dodając go w razie potrzeby.
+        Zmienione dane (np. nowy adres) są przepisywane do istniejącego obiektu,
+        więc wszystkie paczki sklepu od razu je widzą.
+        """
+        existing = self._stores.get(store.store_id)
+        if existing is not None:
+            if existing.update_from(store):
+                self._dirty = True
+            return existing
+
+        with self._lock:
+            existing = self._stores.setdefault(store.store_id, store)
+        if existing is store:
+            store.favorite = store.store_id in self._favorites
+            self._dirty = True
+        return existing
+
+    def get(self, store_id: str) -> Optional[Store]:
+        """Sklep o danym store_id lub None"""
+        return self._stores.get(str(store_id))
+
+    def set_favorites(self, store_ids: Iterable):
+        """Oznacza sklepy z favorite_stores — sprawdzenie ulubionego to odczyt jednego atrybutu"""
+        self._favorites = {str(store_id) for store_id in store_ids}
+        with self._lock:
+            stores = list(self._stores.values())
+        for store in stores:
+            store.favorite = store.store_id in self._favorites
+
+    def favorites(self) -> List[Store]:
+        """Znane sklepy oznaczone jako ulubione"""
+        return [store for store in self._stores_snapshot() if store.favorite]
+
+    def _stores_snapshot(self) -> List[Store]:
+        with self._lock:
+            return list(self._stores.values())
+
+    def __contains__(self, store_id: str) -> bool:
+        return str(store_id) in self._stores
+
+    def __iter__(self) -> Iterator[Store]:
+        return iter(self._stores_snapshot())
+
+    def __len__(self) -> int:
+        return len(self._stores)
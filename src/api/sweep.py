@@ -0,0 +1,284 @@
+import asyncio
+import math
+from dataclasses import dataclass
+from typing import List, Optional, AsyncIterator, Tuple
+
+from .models import ItemRecord
+from ..config import TGTGSettings, WatchArea
+from ..utils import NiceLogger
+
+KM_PER_DEGREE = 111.32
+
+
+class SweepFailedError(Exception):
+    """Żaden okrąg przeszukania nie został odpytany — brak wyników nie oznacza braku paczek"""
+
+
+@dataclass
+class SweepStatus:
+    """Stan jednego przeszukania — wypełniany przez iter_sweep dla wywołującego"""
+    circles: int = 0
+    succeeded: int = 0
+    complete: bool = True
+
+
+@dataclass(frozen=True)
+class QueryCircle:
+    """Pojedyncze zapytanie do API — środek i promień w km"""
+    lat: float
+    lng: float
+    radius: int
+
+
+def _to_local_km(origin: Tuple[float, float], point: Tuple[float, float]) -> Tuple[float, float]:
+    """Rzutuje punkt na płaszczyznę (x, y) w km względem punktu odniesienia"""
+    lat0, lng0 = origin
+    x = (point[1] - lng0) * KM_PER_DEGREE * math.cos(math.radians(lat0))
+    y = (point[0] - lat0) * KM_PER_DEGREE
+    return x, y
+
+
+def _from_local_km(origin: Tuple[float, float], x: float, y: float) -> Tuple[float, float]:
+    """Odwrotność _to_local_km"""
+    lat0, lng0 = origin
+    lat = lat0 + y / KM_PER_DEGREE
+    lng = lng0 + x / (KM_PER_DEGREE * math.cos(math.radians(lat0)))
+    return lat, lng
+
+
+def _distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Odległość między punktami w km (przybliżenie równoodległościowe)"""
+    x, y = _to_local_km(a, b)
+    return math.hypot(x, y)
+
+
+class SweepEngine:
+    """
+    Silnik odpytujący wiele obszarów obserwacji naraz.
+
+    Każdy obszar jest pokrywany heksagonalną siatką nakładających się okręgów
+    zapytań. Spośród możliwych promieni wybierany jest ten, który pokrywa obszary
+    najmniejszą szacowaną liczbą wywołań API (uwzględniając stronicowanie przy
+    zaobserwowanej gęstości paczek). Okręgi w całości pokryte przez inne są pomijane,
+    a wyniki łączone po item_id.
+    """
+
+    def __init__(self, api_client, settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("SweepEngine").get_logger()
+        self.api_client = api_client
+        self.settings = settings or api_client.settings
+
+        # Szacowana liczba paczek na km², aktualizowana po każdym przeszukaniu
+        self.density: float = 0.0
+
+    @staticmethod
+    def _dedupe_areas(areas: List[WatchArea]) -> List[WatchArea]:
+        """Usuwa obszary w całości zawarte w innych obszarach"""
+        ordered = sorted(areas, key=lambda a: a.radius, reverse=True)
+        kept: List[WatchArea] = []
+        for area in ordered:
+            contained = any(
+                _distance_km(area.coordinates, other.coordinates) + area.radius <= other.radius
+                for other in kept
+            )
+            if not contained:
+                kept.append(area)
+        return kept
+
+    @staticmethod
+    def _tile_area(area: WatchArea, radius: int) -> List[QueryCircle]:
+        """Pokrywa obszar siatką heksagonalną okręgów o podanym promieniu"""
+        lat, lng = area.coordinates
+        if radius >= area.radius:
+            return [QueryCircle(lat, lng, max(1, math.ceil(area.radius)))]
+
+        # Siatka heksagonalna o boku r·√3 pokrywa całą płaszczyznę okręgami o promieniu r
+        spacing = radius * math.sqrt(3)
+        row_height = spacing * math.sqrt(3) / 2
+        reach = area.radius + radius
+        rows = int(math.ceil(reach / row_height))
+        cols = int(math.ceil(reach / spacing)) + 1
+
+        circles = []
+        for row in range(-rows, rows + 1):
+            offset = spacing / 2 if row % 2 else 0.0
+            y = row * row_height
+            for col in range(-cols, cols + 1):
+                x = col * spacing + offset
+                # Pomijamy okręgi, które nie przecinają obszaru
+                if math.hypot(x, y) - radius >= area.radius:
+                    continue
+                c_lat, c_lng = _from_local_km((lat, lng), x, y)
+                circles.append(QueryCircle(c_lat, c_lng, radius))
+        return circles
+
+    @staticmethod
+    def _is_covered(circle: QueryCircle, others: List[QueryCircle]) -> bool:
+        """
+        Sprawdza, czy okrąg jest w całości pokryty przez inne okręgi.
+        Testuje środek i punkty na dwóch pierścieniach wewnątrz okręgu.
+        """
+        center = (circle.lat, circle.lng)
+        samples = [(0.0, 0.0)]
+        for fraction in (0.5, 1.0):
+            for k in range(12):
+                angle = 2 * math.pi * k / 12
+                samples.append((
+                    math.cos(angle) * circle.radius * fraction,
+                    math.sin(angle) * circle.radius * fraction
+                ))
+
+        for x, y in samples:
+            point = _from_local_km(center, x, y)
+            if not any(_distance_km((o.lat, o.lng), point) <= o.radius for o in others):
+                return False
+        return True
+
+    def _estimate_calls(self, circles: List[QueryCircle]) -> int:
+        """Szacuje liczbę wywołań API dla danego zestawu okręgów"""
+        page_size = self.settings.config.get('page_size', 20)
+        calls = 0
+        for circle in circles:
+            expected_items = self.density * math.pi * circle.radius ** 2
+            calls += max(1, math.ceil(expected_items / page_size))
+        return calls
+
+    def plan(self, areas: List[WatchArea]) -> List[QueryCircle]:
+        """Wybiera pokrycie obszarów wymagające najmniejszej liczby wywołań API"""
+        areas = self._dedupe_areas([a for a in areas if a.coordinates])
+        if not areas:
+            return []
+
+        config = self.settings.config
+        max_radius = int(config.get('max_query_radius', 30))
+        max_circles = int(config.get('max_sweep_circles', 100))
+        largest = int(math.ceil(max(a.radius for a in areas)))
+
+        best: Optional[List[QueryCircle]] = None
+        best_cost: Optional[Tuple[int, int]] = None
+
+        for radius in range(min(max_radius, largest), 0, -1):
+            # Szybkie oszacowanie liczby okręgów — pomijamy zbyt gęste siatki
+            hex_cell = 3 * math.sqrt(3) / 2 * radius ** 2
+            estimated = sum(
+                1 if radius >= a.radius else math.pi * (a.radius + radius) ** 2 / hex_cell
+                for a in areas
+            )
+            if estimated > max_circles:
+                break
+
+            tilings = [self._tile_area(area, radius) for area in areas]
+
+            # Deduplikacja przestrzenna — okręgi jednej siatki nigdy nie pokrywają się w całości,
+            # więc porównujemy je tylko z okręgami innych obszarów: zachowanymi okręgami
+            # wcześniejszych obszarów i wszystkimi okręgami późniejszych
+            kept_by_area: List[List[QueryCircle]] = []
+            for index, tiling in enumerate(tilings):
+                candidates = [c for kept_list in kept_by_area for c in kept_list]
+                candidates += [c for later in tilings[index + 1:] for c in later]
+
+                kept_here = []
+                for circle in tiling:
+                    neighbours = [
+                        other for other in candidates
+                        if _distance_km((circle.lat, circle.lng), (other.lat, other.lng)) < circle.radius + other.radius
+                    ]
+                    if not neighbours or not self._is_covered(circle, neighbours):
+                        kept_here.append(circle)
+                kept_by_area.append(kept_here)
+
+            kept = [circle for kept_list in kept_by_area for circle in kept_list]
+
+            cost = (self._estimate_calls(kept), len(kept))
+            if best_cost is None or cost < best_cost:
+                best, best_cost = kept, cost
+
+        if best is None:
+            # Nawet największy promień daje zbyt wiele okręgów — użyj go mimo to
+            radius = min(max_radius, largest)
+            best = [circle for area in areas for circle in self._tile_area(area, radius)]
+            best_cost = (self._estimate_calls(best), len(best))
+
+        self.logger.debug(
+            "Plan przeszukania: %d okręgów, szacowane wywołania: %d (gęstość %.2f/km²)",
+            len(best), best_cost[0], self.density
+        )
+        return best
+
+    def _update_density(self, areas: List[WatchArea], item_count: int):
+        """Aktualizuje szacowaną gęstość paczek (średnia wykładnicza)"""
+        total_area = sum(math.pi * a.radius ** 2 for a in self._dedupe_areas(areas))
+        if total_area <= 0:
+            return
+        observed = item_count / total_area
+        self.density = observed if self.density == 0 else 0.7 * self.density + 0.3 * observed
+
+    async def iter_sweep(
+            self,
+            areas: List[WatchArea],
+            status: Optional[SweepStatus] = None
+    ) -> AsyncIterator[List[ItemRecord]]:
+        """
+        Odpytuje równolegle wszystkie okręgi planu i zwraca partie nowych
+        (niewidzianych wcześniej w tym przeszukaniu) paczek, w miarę jak docierają.
+        Rzuca SweepFailedError, jeśli nie udało się odpytać żadnego okręgu.
+        Czy przeszukanie objęło wszystkie okręgi i strony, trafia do status — osobnego
+        dla każdego wywołania, bo przeszukania różnych obszarów mogą trwać równocześnie.
+        """
+        status = status if status is not None else SweepStatus()
+        circles = self.plan(areas)
+        status.circles = len(circles)
+        if not circles:
+            return
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.config.get('sweep_concurrency', 3)))
+        queue: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+        seen_ids = set()
+
+        async def sweep_circle(circle: QueryCircle):
+            try:
+                async with semaphore:
+                    async for batch in self.api_client.iter_items(circle.lat, circle.lng, circle.radius):
+                        await queue.put(batch)
+                status.succeeded += 1
+            except Exception as e:
+                status.complete = False
+                self.logger.error(f"Błąd podczas odpytywania okręgu {circle}: {e}")
+            finally:
+                await queue.put(done_marker)
+
+        tasks = [asyncio.create_task(sweep_circle(circle)) for circle in circles]
+        remaining = len(tasks)
+
+        try:
+            while remaining:
+                batch = await queue.get()
+                if batch is done_marker:
+                    remaining -= 1
+                    continue
+
+                fresh = []
+                for item in batch:
+                    if item.item_id not in seen_ids:
+                        seen_ids.add(item.item_id)
+                        fresh.append(item)
+                if fresh:
+                    yield fresh
+
+            if not status.succeeded:
+                raise SweepFailedError(f"Nie udało się odpytać żadnego z {len(circles)} okręgów")
+            # Gęstość tylko z pełnego przeszukania — brakujące okręgi zaniżyłyby oszacowanie
+            if status.complete:
+                self._update_density(areas, len(seen_ids))
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def sweep(self, areas: List[WatchArea]) -> List[ItemRecord]:
+        """Odpytuje wszystkie obszary i zwraca połączone wyniki"""
+        items = []
+        async for batch in self.iter_sweep(areas):
+            items.extend(batch)
+        return items
@@ -1,10 +1,103 @@
-from typing import Optional, List, Dict, Any
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable, AsyncIterator, Tuple
 
 from tgtg import TgtgClient
 
+from .details import ItemDetailCache
+from .models import ItemRecord
+from .stores import StoreCatalogue
+from .transport import AsyncTGTGTransport
 from ..config import TGTGSettings
 from ..utils import NiceLogger
 
+# Znacznik "użyj domyślnego timeoutu" — None oznacza brak limitu czasu
+_DEFAULT_TIMEOUT = object()
+
+
+class IncompleteFetchError(Exception):
+    """Część stron listy paczek nie została pobrana — wynik jest niepełny"""
+
+
+class TGTGExecutor:
+    """
+    Ograniczona pula wątków dla blokujących wywołań TgtgClient.
+
+    Każde wywołanie trafia do wątku roboczego i zwraca awaitable, dzięki czemu
+    żądania HTTP biblioteki tgtg nie blokują pętli zdarzeń ani pętli Tk.
+    Liczba jednocześnie zleconych wywołań jest ograniczona do rozmiaru puli —
+    kolejne czekają po stronie asyncio, więc można je anulować, zanim trafią do wątku.
+    """
+
+    def __init__(self, max_workers: int = 4, default_timeout: Optional[float] = 30.0):
+        self.logger = NiceLogger("TGTG_Executor").get_logger()
+        self.max_workers = max(1, int(max_workers))
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="tgtg-api"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.logger.debug(f"Utworzono pulę wątków API: workers={self.max_workers}, timeout={default_timeout}")
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        """Zwraca semafor powiązany z bieżącą pętlą zdarzeń"""
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    @staticmethod
+    def _release_threadsafe(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+        """Zwalnia slot semafora z wątku roboczego"""
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # Pętla została już zamknięta — nie ma czego zwalniać
+            pass
+
+    async def run(self, func: Callable, *args, timeout: Any = _DEFAULT_TIMEOUT, **kwargs) -> Any:
+        """
+        Uruchamia blokującą funkcję w wątku roboczym i czeka na wynik.
+
+        Przekroczenie timeoutu lub anulowanie taska anuluje wywołanie, jeśli nie
+        zdążyło jeszcze wystartować. Wywołanie już trwające w wątku zajmuje slot
+        puli aż do swojego zakończenia, więc pula nigdy nie rośnie ponad limit.
+        """
+        if timeout is _DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore(loop)
+        await semaphore.acquire()
+
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except Exception:
+            semaphore.release()
+            raise
+
+        future.add_done_callback(lambda _: self._release_threadsafe(loop, semaphore))
+
+        name = getattr(func, '__name__', repr(func))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.logger.warning(f"Przekroczono limit czasu ({timeout}s) dla wywołania {name}")
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            self.logger.debug("Anulowano wywołanie %s", name)
+            raise
+
+    def shutdown(self):
+        """Zamyka pulę wątków, porzucając oczekujące wywołania"""
+        self.logger.debug("Zamykanie puli wątków API...")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 class TGTGApiClient:
     """
@@ -14,9 +107,70 @@ class TGTGApiClient:
     def __init__(self):
         self.logger = NiceLogger("TGTG_API").get_logger()
         self.client = None
-        self.settings = TGTGSettings()
+        self.transport: Optional[AsyncTGTGTransport] = None
+        self.settings = TGTGSettings.instance()
         self.is_logged_in = False
 
+        config = self.settings.config
+        # Katalog sklepów — paczki wskazują na współdzielone obiekty Store
+        self.stores = StoreCatalogue(self.settings.config_dir / "stores.json")
+        self.stores.set_favorites(config.get('favorite_stores', []))
+        # Szczegóły paczek pobierane w tle, na żądanie
+        self.details = ItemDetailCache(self, self.settings)
+
+        self.executor = TGTGExecutor(
+            max_workers=config.get('api_workers', 4),
+            default_timeout=config.get('api_timeout', 30)
+        )
+        self.settings.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, changed: set):
+        """Reaguje na zmiany ustawień dotyczące klienta API"""
+        if 'api_timeout' in changed:
+            self.executor.default_timeout = self.settings.config.get('api_timeout', 30)
+            self.logger.debug("Nowy domyślny timeout API: %s", self.executor.default_timeout)
+        if 'favorite_stores' in changed:
+            self.stores.set_favorites(self.settings.config.get('favorite_stores', []))
+
+    def _create_transport(self, credentials: Dict[str, str]):
+        """Tworzy natywny transport aiohttp dla podanych credentials"""
+        config = self.settings.config
+        if config.get('transport', 'aiohttp') != 'aiohttp':
+            self.logger.debug("Transport aiohttp wyłączony w konfiguracji, używam biblioteki tgtg")
+            self.transport = None
+            return
+
+        self.logger.debug("Tworzenie transportu aiohttp...")
+        self.transport = AsyncTGTGTransport(
+            access_token=credentials['access_token'],
+            refresh_token=credentials['refresh_token'],
+            user_id=credentials['user_id'],
+            cookie=credentials['cookie'],
+            connection_limit=config.get('http_connection_limit', 10),
+            request_timeout=config.get('api_timeout', 30),
+            on_token_refresh=self._on_token_refresh
+        )
+
+    def _on_token_refresh(self, credentials: Dict[str, str]):
+        """Zapisuje credentials po odświeżeniu tokenu przez transport"""
+        self.logger.debug("Zapisywanie odświeżonych credentials...")
+        self.settings.update_credentials(credentials)
+
+        # Refresh token jest jednorazowy — klient tgtg musi znać nowe wartości
+        if self.client:
+            self.client.access_token = credentials['access_token']
+            self.client.refresh_token = credentials['refresh_token']
+            self.client.cookie = credentials['cookie']
+
+    async def _verify_credentials(self):
+        """
+        Weryfikuje credentials lekkim odświeżeniem tokenu zamiast pełnego pobrania listy paczek
+        """
+        if self.transport:
+            await self.transport.refresh_token()
+        else:
+            await self.executor.run(self.client.login)
+
     async def login(self, email: str, access_token: Optional[str] = None):
         """
         Logowanie do TGTG. Wykorzystuje zapisane credentials, jeśli są dostępne,
@@ -50,7 +204,8 @@ class TGTGApiClient:
                 )
                 try:
                     # Weryfikacja czy credentials działają
-                    self.client.get_items()
+                    self._create_transport({**config, 'access_token': access_token})
+                    await self._verify_credentials()
                     self.is_logged_in = True
                     self.logger.info("Pomyślnie zalogowano przy użyciu dostarczonego access_token")
                     return
@@ -76,7 +231,8 @@ class TGTGApiClient:
                         cookie=config['cookie']
                     )
                     # Weryfikacja czy credentials działają
-                    self.client.get_items()
+                    self._create_transport(config)
+                    await self._verify_credentials()
                     self.is_logged_in = True
                     self.logger.info("Pomyślnie zalogowano przy użyciu zapisanych credentials")
                     return
@@ -89,9 +245,11 @@ class TGTGApiClient:
                 self.logger.info(f"Próba logowania za pomocą emaila: {email}")
                 try:
                     self.client = TgtgClient(email=email)
-                    # TgtgClient automatycznie spróbuje się zalogować przez email
-                    credentials = self.client.get_credentials()
+                    # TgtgClient automatycznie spróbuje się zalogować przez email.
+                    # Czekanie na kliknięcie linku trwa długo, więc bez limitu czasu
+                    credentials = await self.executor.run(self.client.get_credentials, timeout=None)
                     self.settings.update_credentials(credentials)
+                    self._create_transport(credentials)
                     self.is_logged_in = True
                     self.logger.info("Pomyślnie zalogowano przy użyciu emaila")
                     return
@@ -107,44 +265,199 @@ class TGTGApiClient:
             self.is_logged_in = False
             raise
 
-    async def get_items(self, lat: float, lng: float, radius: int = 5) -> List[Dict[str, Any]]:
-        """
-        Pobiera dostępne paczki w określonej lokalizacji
-        """
-        try:
-            items = self.client.get_items(
-                favorites_only=False,
+    async def _fetch_page(
+            self,
+            lat: float,
+            lng: float,
+            radius: int,
+            page: int,
+            page_size: int,
+            favorites_only: bool = False
+    ) -> List[ItemRecord]:
+        """Pobiera pojedynczą stronę listy paczek i od razu zamienia ją na zwarte rekordy"""
+        if self.transport:
+            raw_items = await self.transport.get_items(
+                latitude=lat,
+                longitude=lng,
+                radius=radius,
+                page_size=page_size,
+                page=page,
+                favorites_only=favorites_only
+            )
+        else:
+            raw_items = await self.executor.run(
+                self.client.get_items,
+                favorites_only=favorites_only,
                 latitude=lat,
                 longitude=lng,
                 radius=radius,
+                page_size=page_size,
+                page=page
             )
+        return [ItemRecord.from_api(item, self.stores) for item in raw_items]
+
+    async def iter_items(
+            self,
+            lat: float,
+            lng: float,
+            radius: int = 5,
+            page_size: Optional[int] = None,
+            max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[List[ItemRecord]]:
+        """
+        Pobiera wszystkie strony listy paczek i zwraca je partiami, w miarę jak docierają.
+
+        Pierwsza strona jest pobierana sekwencyjnie. Jeśli jest pełna, kolejne strony
+        są pobierane równolegle w przesuwnym oknie o rozmiarze max_concurrency, aż
+        do pierwszej niepełnej strony. Paczki powtarzające się między stronami są pomijane.
+        """
+        config = self.settings.config
+        page_size = page_size or config.get('page_size', 20)
+        max_concurrency = max(1, max_concurrency or config.get('page_concurrency', 4))
+        max_pages = config.get('max_pages', 50)
+
+        seen_ids = set()
+
+        def unseen(batch: List[ItemRecord]) -> List[ItemRecord]:
+            fresh = []
+            for item in batch:
+                if item.item_id in seen_ids:
+                    continue
+                seen_ids.add(item.item_id)
+                fresh.append(item)
+            return fresh
+
+        first_page = await self._fetch_page(lat, lng, radius, 1, page_size)
+        self.logger.debug("Strona 1: %d paczek", len(first_page))
+        yield unseen(first_page)
+
+        if len(first_page) < page_size:
+            return
+
+        # Numer ostatniej strony poznajemy dopiero po pierwszej niepełnej odpowiedzi
+        last_page = max_pages
+        next_page = 2
+        pending: Dict[asyncio.Task, int] = {}
+        failed_pages: List[int] = []
+        # Niepełna strona oznacza koniec listy — limit stron nie obciął wtedy wyników
+        short_page_seen = False
+
+        try:
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < max_concurrency:
+                    task = asyncio.create_task(self._fetch_page(lat, lng, radius, next_page, page_size))
+                    pending[task] = next_page
+                    next_page += 1
+
+                done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    page = pending.pop(task)
+                    try:
+                        batch = task.result()
+                    except Exception as e:
+                        self.logger.error(f"Błąd podczas pobierania strony {page}: {e}")
+                        failed_pages.append(page)
+                        last_page = min(last_page, page - 1)
+                        continue
+
+                    self.logger.debug("Strona %d: %d paczek", page, len(batch))
+                    if len(batch) < page_size:
+                        short_page_seen = True
+                        last_page = min(last_page, page)
+
+                    fresh = unseen(batch)
+                    if fresh:
+                        yield fresh
+
+                # Strony za ostatnią są zbędne — anuluj je
+                for task, page in list(pending.items()):
+                    if page > last_page:
+                        task.cancel()
+                        del pending[task]
+
+            if last_page == max_pages and not short_page_seen:
+                self.logger.warning(f"Osiągnięto limit {max_pages} stron, część paczek mogła zostać pominięta")
+
+            # Paczki zwrócone do tej pory są poprawne, ale brak części stron trzeba zgłosić
+            if failed_pages:
+                raise IncompleteFetchError(f"Nie udało się pobrać stron: {sorted(failed_pages)}")
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_items(self, lat: float, lng: float, radius: int = 5) -> List[ItemRecord]:
+        """
+        Pobiera wszystkie dostępne paczki w określonej lokalizacji
+        """
+        items = []
+        try:
+            async for batch in self.iter_items(lat, lng, radius):
+                items.extend(batch)
             return items
 
+        except IncompleteFetchError as e:
+            self.logger.warning(f"Niepełna lista paczek: {e}")
+            return items
+        except asyncio.TimeoutError:
+            self.logger.error("Przekroczono limit czasu podczas pobierania paczek")
+            return []
         except Exception as e:
             self.logger.error(f"Błąd podczas pobierania paczek: {e}")
             return []
 
+    async def get_item(self, item_id: str) -> Dict[str, Any]:
+        """
+        Pobiera szczegóły pojedynczej paczki
+        """
+        if self.transport:
+            return await self.transport.get_item(item_id)
+        return await self.executor.run(self.client.get_item, item_id)
+
+    async def get_item_record(self, item_id: str) -> ItemRecord:
+        """Pobiera aktualny stan pojedynczej paczki jako rekord"""
+        return ItemRecord.from_api(await self.get_item(item_id), self.stores)
+
+    async def get_favorites(self, lat: float, lng: float, page_size: Optional[int] = None) -> Tuple[List[ItemRecord], int]:
+        """
+        Pobiera paczki ulubionych sklepów konta (favorites_only) — zwykle jedna strona.
+        Zwraca (paczki, liczba wykonanych zapytań).
+        """
+        config = self.settings.config
+        page_size = page_size or config.get('page_size', 20)
+        max_pages = config.get('max_pages', 50)
+
+        items: List[ItemRecord] = []
+        page = 0
+        while page < max_pages:
+            page += 1
+            # Ulubione nie zależą od odległości — promień jest tylko wymaganym parametrem
+            batch = await self._fetch_page(lat, lng, config.get('max_query_radius', 30), page, page_size, True)
+            items.extend(batch)
+            if len(batch) < page_size:
+                break
+        return items, page
+
     @staticmethod
-    def format_item_info(item: Dict[str, Any]) -> str:
+    def format_item_info(item: ItemRecord) -> str:
         """
         Formatuje informacje o paczce do czytelnej postaci
         """
-        store = item.get("store", {})
-        items_available = item.get("items_available", 0)
-        price = item.get("item", {}).get("price_including_taxes", {})
-        price_value = float(price.get("minor_units", 0)) / 100
-        pickup_interval = item.get("pickup_interval", {})
-
         return (
-            f"🏪 {store.get('store_name', 'Nieznany sklep')}\n"
-            f"📍 {store.get('store_location', {}).get('address', {}).get('address_line', 'Brak adresu')}\n"
-            f"💰 {price_value:.2f} PLN\n"
-            f"📦 Dostępnych paczek: {items_available}\n"
-            f"🕒 Odbiór: {pickup_interval.get('start')} - {pickup_interval.get('end')}\n"
+            f"🏪 {item.store_name or 'Nieznany sklep'}\n"
+            f"📍 {item.address or 'Brak adresu'}\n"
+            f"💰 {item.price_value:.2f} PLN\n"
+            f"📦 Dostępnych paczek: {item.items_available}\n"
+            f"🕒 Odbiór: {item.format_pickup()}\n"
         )
 
     async def cleanup(self):
         """
         Czyszczenie zasobów
         """
-        pass
+        await self.details.close()
+        if self.transport:
+            await self.transport.close()
+        self.executor.shutdown()
+        self.stores.save()
@@ -0,0 +1,229 @@
+import asyncio
+import time
+from typing import Optional, List, Dict, Any, Callable
+
+import aiohttp
+
+from ..utils import NiceLogger
+
+# Endpointy i nagłówki zgodne z biblioteką tgtg
+BASE_URL = "https://apptoogoodtogo.com/api/"
+API_ITEM_ENDPOINT = "item/v8/"
+REFRESH_ENDPOINT = "auth/v3/token/refresh"
+DEFAULT_USER_AGENT = "TGTG/24.11.0 Dalvik/2.1.0 (Linux; U; Android 14; Pixel 7 Pro Build/UQ1A.240105.004)"
+DEFAULT_ACCESS_TOKEN_LIFETIME = 3600 * 4  # 4 godziny
+
+
+class TGTGTransportError(Exception):
+    """Błąd odpowiedzi API TGTG zwrócony przez transport asynchroniczny"""
+
+    def __init__(self, status: int, message: str = ""):
+        self.status = status
+        super().__init__(f"HTTP {status}: {message}" if message else f"HTTP {status}")
+
+
+class AsyncTGTGTransport:
+    """
+    Natywny, asynchroniczny transport HTTP dla API TGTG.
+
+    Korzysta z jednej, długo żyjącej sesji aiohttp z keep-alive, cache DNS
+    i limitami połączeń, dzięki czemu kolejne odpytania używają już
+    nawiązanych połączeń TLS zamiast wykonywać za każdym razem nowy handshake.
+    """
+
+    def __init__(
+            self,
+            access_token: str,
+            refresh_token: str,
+            user_id: str,
+            cookie: str,
+            user_agent: Optional[str] = None,
+            language: str = "pl-PL",
+            connection_limit: int = 10,
+            connection_limit_per_host: int = 6,
+            dns_cache_ttl: int = 300,
+            keepalive_timeout: float = 60.0,
+            request_timeout: float = 30.0,
+            on_token_refresh: Optional[Callable[[Dict[str, str]], None]] = None
+    ):
+        self.logger = NiceLogger("TGTG_Transport").get_logger()
+
+        self.access_token = access_token
+        self.refresh_token_value = refresh_token
+        self.user_id = user_id
+        self.cookie = cookie
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.language = language
+
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.on_token_refresh = on_token_refresh
+
+        self.last_token_refresh: Optional[float] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+        self.logger.debug(
+            f"Utworzono transport: limit={connection_limit}, limit_per_host={connection_limit_per_host}, "
+            f"dns_ttl={dns_cache_ttl}s, keepalive={keepalive_timeout}s"
+        )
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Zwraca współdzieloną sesję, tworząc ją przy pierwszym użyciu w danej pętli"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed and self._session_loop is not loop:
+                self.logger.warning("Sesja HTTP należy do innej pętli zdarzeń, tworzę nową")
+
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            self._session_loop = loop
+            self._refresh_lock = asyncio.Lock()
+            self.logger.debug("Utworzono nową sesję HTTP")
+
+        return self._session
+
+    def _headers(self, authorized: bool = True) -> Dict[str, str]:
+        """Buduje nagłówki żądania"""
+        headers = {
+            "user-agent": self.user_agent,
+            "accept-language": self.language,
+            "accept": "application/json",
+            "accept-encoding": "gzip",
+        }
+        if self.cookie:
+            headers["cookie"] = self.cookie
+        if authorized and self.access_token:
+            headers["authorization"] = f"Bearer {self.access_token}"
+        return headers
+
+    def _token_expired(self) -> bool:
+        """Sprawdza, czy access token wymaga odświeżenia"""
+        if self.last_token_refresh is None:
+            return True
+        return time.monotonic() - self.last_token_refresh > DEFAULT_ACCESS_TOKEN_LIFETIME
+
+    async def _post(self, endpoint: str, payload: Optional[Dict[str, Any]], authorized: bool = True) -> Any:
+        """Wysyła żądanie POST i zwraca zdekodowany JSON"""
+        session = await self._get_session()
+
+        async with session.post(f"{BASE_URL}{endpoint}", json=payload, headers=self._headers(authorized)) as response:
+            if "set-cookie" in response.headers:
+                self.cookie = response.headers["set-cookie"]
+
+            if response.status != 200:
+                message = await response.text()
+                raise TGTGTransportError(response.status, message[:200])
+
+            return await response.json(content_type=None)
+
+    async def _authorized_post(self, endpoint: str, payload: Optional[Dict[str, Any]]) -> Any:
+        """Wysyła autoryzowane żądanie, odświeżając token w razie potrzeby"""
+        if self._token_expired():
+            await self.refresh_token()
+
+        try:
+            return await self._post(endpoint, payload)
+        except TGTGTransportError as e:
+            if e.status not in (401, 403):
+                raise
+            self.logger.warning(f"Odrzucono token (HTTP {e.status}), odświeżam i ponawiam żądanie...")
+            await self.refresh_token(force=True)
+            return await self._post(endpoint, payload)
+
+    async def refresh_token(self, force: bool = False) -> Dict[str, str]:
+        """Odświeża access token przy użyciu refresh tokenu"""
+        await self._get_session()
+
+        async with self._refresh_lock:
+            # Inne żądanie mogło odświeżyć token, gdy czekaliśmy na blokadę
+            if not force and not self._token_expired():
+                return self.credentials
+
+            self.logger.debug("Odświeżanie access tokenu...")
+            data = await self._post(
+                REFRESH_ENDPOINT,
+                {"refresh_token": self.refresh_token_value},
+                authorized=False
+            )
+
+            self.access_token = data["access_token"]
+            self.refresh_token_value = data["refresh_token"]
+            self.last_token_refresh = time.monotonic()
+            self.logger.info("Access token został odświeżony")
+
+            if self.on_token_refresh:
+                try:
+                    self.on_token_refresh(self.credentials)
+                except Exception as e:
+                    self.logger.error(f"Błąd w callbacku odświeżenia tokenu: {e}")
+
+            return self.credentials
+
+    @property
+    def credentials(self) -> Dict[str, str]:
+        """Zwraca aktualne dane uwierzytelniające"""
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token_value,
+            "user_id": self.user_id,
+            "cookie": self.cookie
+        }
+
+    async def get_items(
+            self,
+            latitude: float,
+            longitude: float,
+            radius: int = 5,
+            page_size: int = 20,
+            page: int = 1,
+            favorites_only: bool = False,
+            with_stock_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Pobiera stronę listy paczek"""
+        payload = {
+            "user_id": self.user_id,
+            "origin": {"latitude": latitude, "longitude": longitude},
+            "radius": radius,
+            "page_size": page_size,
+            "page": page,
+            "discover": False,
+            "favorites_only": favorites_only,
+            "item_categories": [],
+            "diet_categories": [],
+            "pickup_earliest": None,
+            "pickup_latest": None,
+            "search_phrase": None,
+            "with_stock_only": with_stock_only,
+            "hidden_only": False,
+            "we_care_only": False,
+        }
+        data = await self._authorized_post(API_ITEM_ENDPOINT, payload)
+        return data.get("items", [])
+
+    async def get_item(self, item_id: str) -> Dict[str, Any]:
+        """Pobiera szczegóły pojedynczej paczki"""
+        return await self._authorized_post(
+            f"{API_ITEM_ENDPOINT}{item_id}",
+            {"user_id": self.user_id, "origin": None}
+        )
+
+    async def close(self):
+        """Zamyka sesję HTTP"""
+        if self._session is not None and not self._session.closed:
+            self.logger.debug("Zamykanie sesji HTTP...")
+            await self._session.close()
+        self._session = None
@@ -1,3 +1,3 @@
-from .settings import TGTGSettings, Location
+from .settings import TGTGSettings, Location, WatchArea
 
-__all__ = ['TGTGSettings', 'Location']
+__all__ = ['TGTGSettings', 'Location', 'WatchArea']
@@ -1,9 +1,14 @@
+import atexit
+import copy
 import json
+import os
+import tempfile
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Set, Callable
 
-from src.utils import NiceLogger
+from src.utils import NiceLogger, set_log_level
 
 
 @dataclass
@@ -39,6 +44,36 @@ class Location:
         )
 
 
+@dataclass
+class WatchArea:
+    name: str = ""
+    coordinates: Optional[Tuple[float, float]] = None
+    radius: float = 5
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "coordinates": self.coordinates,
+            "radius": self.radius
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WatchArea':
+        coords_data = data.get('coordinates')
+        coordinates = None
+        if coords_data and isinstance(coords_data, (list, tuple)) and len(coords_data) == 2:
+            try:
+                coordinates = (float(coords_data[0]), float(coords_data[1]))
+            except (ValueError, TypeError):
+                coordinates = None
+
+        return cls(
+            name=str(data.get('name', "")),
+            coordinates=coordinates,
+            radius=float(data.get('radius', 5))
+        )
+
+
 @dataclass
 class Filters:
     keywords: str = ""
@@ -64,7 +99,11 @@ class Filters:
 class TGTGSettings:
     """Zarządzanie ustawieniami aplikacji"""
 
+    # Wersja formatu config.json — starsze pliki są migrowane przy wczytaniu
+    CONFIG_VERSION = 2
+
     DEFAULT_CONFIG = {
+        "config_version": CONFIG_VERSION,
         "refresh_interval": 30,
         "location": {
             "street": "",
@@ -82,8 +121,19 @@ class TGTGSettings:
         "refresh_token": "",
         "user_id": "",
         "cookie": "",
-        "notification_methods": ["console"],
+        "notification_methods": ["desktop", "console"],
+        "notification_webhook_url": "",
+        "notification_file": "",
+        "notification_socket": "",
+        "notification_queue_size": 100,
+        "notification_retries": 3,
+        "notification_min_intervals": {},
+        "notification_digest_window": 5,
+        "notification_digest_group": "store",
         "favorite_stores": [],
+        "favorites_enabled": True,
+        "favorites_interval": 15,
+        "favorites_requests_per_minute": 12,
         "min_price": 0,
         "max_price": 1000,
         "auto_reserve": False,
@@ -91,9 +141,39 @@ class TGTGSettings:
         "quiet_hours": {
             "start": "23:00",
             "end": "07:00"
-        }
+        },
+        "api_workers": 4,
+        "api_timeout": 30,
+        "login_timeout": 300,
+        "transport": "aiohttp",
+        "http_connection_limit": 10,
+        "page_size": 20,
+        "page_concurrency": 4,
+        "max_pages": 50,
+        "detail_batch_size": 10,
+        "detail_concurrency": 2,
+        "detail_batch_delay": 1.0,
+        "watch_areas": [],
+        "max_query_radius": 30,
+        "sweep_concurrency": 3,
+        "max_sweep_circles": 100,
+        "min_refresh_interval": 10,
+        "max_refresh_interval": 180,
+        "quiet_refresh_interval": 900,
+        "hot_window_threshold": 2.0,
+        "favorite_hot_window_threshold": 1.0,
+        "drop_stats_half_life_days": 14,
+        "history_enabled": True,
+        "snapshot_max_age": 3600,
+        "log_level": "INFO"
     }
 
+    # Opóźnienie zapisu — szybkie, kolejne zmiany trafiają do jednego zapisu
+    SAVE_DELAY = 0.5
+
+    _instance: Optional['TGTGSettings'] = None
+    _instance_lock = threading.Lock()
+
     def __init__(self):
         self.logger = NiceLogger("TGTGSettings").get_logger()
         self.logger.info("=== Inicjalizacja menedżera ustawień ===")
@@ -109,8 +189,25 @@ class TGTGSettings:
             self.logger.info(f"Tworzenie katalogu konfiguracji: {self.config_dir}")
             self.config_dir.mkdir(parents=True, exist_ok=True)
 
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._save_timer: Optional[threading.Timer] = None
+        self._callbacks: List[Callable[[Set[str]], None]] = []
+
         self.config = self.load_config()
-        self.logger.debug(f"Załadowana konfiguracja: {self.config}")
+        # Ostatnio zapisany stan — porównanie z nim wyznacza zmienione sekcje
+        self._saved = copy.deepcopy(self.config)
+        set_log_level(self.config.get('log_level', 'INFO'))
+
+    @classmethod
+    def instance(cls) -> 'TGTGSettings':
+        """Zwraca współdzieloną instancję ustawień"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+                    atexit.register(cls._instance.flush)
+        return cls._instance
 
     def load_config(self) -> Dict[str, Any]:
         """Wczytuje konfigurację z pliku"""
@@ -118,31 +215,132 @@ class TGTGSettings:
 
         if not self.config_path.exists():
             self.logger.info(f"Plik konfiguracji nie istnieje, tworzę domyślny: {self.config_path}")
-            self.save_config(self.DEFAULT_CONFIG)
-            return self.DEFAULT_CONFIG
+            config = copy.deepcopy(self.DEFAULT_CONFIG)
+            self._write(config)
+            return config
 
         try:
             self.logger.debug(f"Wczytywanie konfiguracji z: {self.config_path}")
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                merged_config = {**self.DEFAULT_CONFIG, **config}
-                self.logger.debug(f"Załadowana konfiguracja: {merged_config}")
-                return merged_config
+            merged_config = {**copy.deepcopy(self.DEFAULT_CONFIG), **config}
+            if self._migrate(merged_config, config.get('config_version', 1)):
+                self._write(merged_config)
+            self.logger.debug("Załadowana konfiguracja: %s", merged_config)
+            return merged_config
         except Exception as e:
             self.logger.error(f"Błąd podczas wczytywania konfiguracji: {e}", exc_info=True)
             raise
 
+    def _migrate(self, config: Dict[str, Any], version: int) -> bool:
+        """Jednorazowo dostosowuje konfigurację zapisaną przez starszą wersję; True, jeśli coś zmieniono"""
+        if version >= self.CONFIG_VERSION:
+            return False
+
+        if version < 2:
+            # Dawniej notification_methods było ignorowane, a powiadomienia pulpitu
+            # wysyłane zawsze — zapisane ["console"] oznacza więc "pulpit i konsola"
+            if config.get('notification_methods') == ["console"]:
+                config['notification_methods'] = ["desktop", "console"]
+                self.logger.info("Migracja konfiguracji: włączono powiadomienia pulpitu (notification_methods)")
+
+        config['config_version'] = self.CONFIG_VERSION
+        return True
+
+    def subscribe(self, callback: Callable[[Set[str]], None]):
+        """
+        Rejestruje callback wywoływany ze zbiorem zmienionych kluczy.
+        Callback jest wywoływany w wątku, który dokonał zmiany.
+        """
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Set[str]], None]):
+        """Wyrejestrowuje callback zmian"""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def _notify(self, changed: Set[str]):
+        for callback in list(self._callbacks):
+            try:
+                callback(changed)
+            except Exception as e:
+                self.logger.error(f"Błąd w callbacku zmiany ustawień: {e}")
+
+    def _mark_dirty(self, keys: Optional[Set[str]] = None):
+        """Oznacza zmienione sekcje i planuje opóźniony zapis"""
+        with self._lock:
+            if keys is None:
+                keys = {
+                    key for key in set(self.config) | set(self._saved)
+                    if self.config.get(key) != self._saved.get(key)
+                }
+            if not keys:
+                return
+
+            self._dirty |= keys
+            if 'log_level' in keys:
+                set_log_level(self.config.get('log_level', 'INFO'))
+
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+        self.logger.debug("Zmienione sekcje konfiguracji: %s", keys)
+        self._notify(keys)
+
+    def update(self, values: Dict[str, Any]):
+        """Aktualizuje wiele kluczy naraz"""
+        with self._lock:
+            changed = {key for key, value in values.items() if self.config.get(key) != value}
+            self.config.update(values)
+        self._mark_dirty(changed)
+
     def save_config(self, config: Dict[str, Any]):
-        """Zapisuje konfigurację do pliku"""
+        """Zapisuje konfigurację (z opóźnieniem — zmiany z krótkiego okna łączą się w jeden zapis)"""
+        with self._lock:
+            if config is not self.config:
+                self.config = config
+        self._mark_dirty()
+
+    def flush(self):
+        """Natychmiast zapisuje oczekujące zmiany"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            try:
+                self._write(self.config)
+                self._saved = copy.deepcopy(self.config)
+                self.logger.debug("Zapisano sekcje konfiguracji: %s", dirty)
+            except Exception:
+                # Zapis nie powiódł się — spróbujemy przy kolejnej zmianie
+                self._dirty |= dirty
+                raise
+
+    def _write(self, config: Dict[str, Any]):
+        """Zapisuje konfigurację atomowo (plik tymczasowy + rename)"""
         self.logger.debug("=== Zapisywanie konfiguracji ===")
 
         try:
-            self.logger.info(f"Zapisywanie konfiguracji do: {self.config_path}")
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
-            self.config = config
-            self.logger.debug("Konfiguracja została pomyślnie zapisana")
-            self.logger.debug(f"Zapisana konfiguracja: {config}")
+            fd, tmp_path = tempfile.mkstemp(dir=self.config_dir, prefix='.config-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    # Plik edytowany ręcznie (tryb headless) — zostaje czytelny
+                    json.dump(config, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.config_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self.logger.info(f"Zapisano konfigurację do: {self.config_path}")
         except Exception as e:
             self.logger.error(f"Błąd podczas zapisywania konfiguracji: {e}", exc_info=True)
             raise
@@ -152,6 +350,12 @@ class TGTGSettings:
         self.logger.debug("Pobieranie ustawień lokalizacji")
         return Location.from_dict(self.config.get('location', {}))
 
+    def get_watch_areas(self) -> List[WatchArea]:
+        """Pobiera dodatkowe obszary obserwacji"""
+        self.logger.debug("Pobieranie obszarów obserwacji")
+        areas = [WatchArea.from_dict(area) for area in self.config.get('watch_areas', [])]
+        return [area for area in areas if area.coordinates]
+
     def get_filters(self) -> Filters:
         """Pobiera ustawienia filtrów"""
         self.logger.debug("Pobieranie ustawień filtrów")
@@ -160,24 +364,20 @@ class TGTGSettings:
     def update_location(self, location: Location):
         """Aktualizuje ustawienia lokalizacji"""
         self.logger.debug(f"Aktualizacja lokalizacji: {location}")
-        self.config['location'] = location.to_dict()
-        self.save_config(self.config)
+        self.update({'location': location.to_dict()})
 
     def update_filters(self, filters: Filters):
         """Aktualizuje ustawienia filtrów"""
         self.logger.debug(f"Aktualizacja filtrów: {filters}")
-        self.config['filters'] = filters.to_dict()
-        self.save_config(self.config)
+        self.update({'filters': filters.to_dict()})
 
     def update_credentials(self, credentials: Dict[str, str]):
         """Aktualizuje dane uwierzytelniające"""
         self.logger.info("=== Aktualizacja danych uwierzytelniających ===")
-        self.logger.debug(f"Nowe credentials: {credentials}")
 
-        self.config.update({
+        self.update({
             "access_token": credentials.get("access_token", ""),
             "refresh_token": credentials.get("refresh_token", ""),
             "user_id": credentials.get("user_id", ""),
             "cookie": credentials.get("cookie", "")
         })
-        self.save_config(self.config)
@@ -0,0 +1,23 @@
+from .scheduler import AdaptiveScheduler
+from .single_flight import SingleFlight
+from .changes import ChangeDetector, ChangeType, ItemChange
+from .filters import CompiledFilter, KeywordMatcher
+from .monitor import PackageMonitor, MonitorEvent, CheckResult
+from .favorites import FavoritesLane, RequestBudget
+from .daemon import HeadlessDaemon
+
+__all__ = [
+    'AdaptiveScheduler',
+    'SingleFlight',
+    'ChangeDetector',
+    'ChangeType',
+    'ItemChange',
+    'CompiledFilter',
+    'KeywordMatcher',
+    'PackageMonitor',
+    'MonitorEvent',
+    'CheckResult',
+    'FavoritesLane',
+    'RequestBudget',
+    'HeadlessDaemon'
+]
@@ -0,0 +1,223 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..api import ItemRecord
+from ..utils import NiceLogger
+
+
+class ChangeType(Enum):
+    """Rodzaje zmian stanu paczki"""
+    APPEARED = "appeared"
+    RESTOCKED = "restocked"
+    SOLD_OUT = "sold_out"
+    PRICE_CHANGED = "price_changed"
+    WINDOW_CHANGED = "window_changed"
+
+
+# Stan paczki: (dostępne, cena w groszach, początek odbioru, koniec odbioru)
+ItemState = Tuple[int, Optional[int], Optional[datetime], Optional[datetime]]
+
+
+@dataclass(frozen=True)
+class ItemChange:
+    """Pojedyncza zmiana stanu paczki"""
+    type: ChangeType
+    item_id: str
+    package: Optional[ItemRecord]
+    previous: Optional[ItemState] = None
+    current: Optional[ItemState] = None
+
+
+def item_state(package: ItemRecord) -> ItemState:
+    """Wyciąga z paczki pola, których zmiany śledzimy"""
+    return package.items_available, package.price, package.pickup_start, package.pickup_end
+
+
+class ChangeDetector:
+    """
+    Wykrywa zmiany stanu paczek między kolejnymi sprawdzeniami.
+
+    Dla każdej paczki przechowuje ostatni stan i jego odcisk (hash). Paczki, których
+    odcisk się nie zmienił, są pomijane bez porównywania pól, więc koszt analizy
+    zależy od liczby zmian. Działa na surowych (niefiltrowanych) wynikach — zmiana
+    filtrów nie powoduje ponownych alertów.
+
+    Jedno sprawdzenie to: begin(), dowolnie wiele observe(partia), finish().
+    Paczki nieobecne w pełnym sprawdzeniu są traktowane jak wyprzedane; ich stan
+    jest pamiętany przez FORGET_AFTER sekund, by wykryć ponowną dostępność.
+    Po zmianie obszaru przeszukania stan jest budowany od nowa (reset()).
+
+    Paczki odpytywane bezpośrednio (observe_direct — szybka ścieżka ulubionych)
+    mają świeższy stan niż przeszukanie obszaru, więc przeszukanie ich nie zmienia
+    i nie uznaje za wyprzedane, gdy leżą poza obszarem. Paczka nieodpytana
+    bezpośrednio dłużej niż direct_timeout sekund wraca pod przeszukanie.
+    """
+
+    FORGET_AFTER = 24 * 3600
+
+    def __init__(self):
+        self.logger = NiceLogger("ChangeDetector").get_logger()
+        self._states: Dict[str, ItemState] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._seen: Set[str] = set()
+        # item_id -> czas ostatniego odpytania bezpośredniego
+        self._direct: Dict[str, float] = {}
+        self.direct_timeout = 120.0
+        self._emit_changes = False
+        self.has_baseline = False
+
+    def seed(self, packages: Iterable[ItemRecord]):
+        """Ustawia znany stan (np. z migawki) bez generowania zmian"""
+        now = time.time()
+        for package in packages:
+            item_id = package.item_id
+            state = item_state(package)
+            self._states[item_id] = state
+            self._fingerprints[item_id] = hash(state)
+            self._last_seen[item_id] = now
+        self.has_baseline = True
+
+    def reset(self):
+        """
+        Zaczyna nowy stan bazowy (np. po zmianie obszaru przeszukania). Paczki spoza
+        nowego obszaru nie są wtedy uznawane za wyprzedane, a po powrocie do większego
+        obszaru — za dostępne ponownie. Stan paczek odpytywanych bezpośrednio zostaje.
+        """
+        now = time.time()
+        for item_id in list(self._states):
+            if not self._is_direct(item_id, now):
+                del self._states[item_id]
+                self._fingerprints.pop(item_id, None)
+                self._last_seen.pop(item_id, None)
+        self.has_baseline = False
+
+    def begin(self):
+        """Rozpoczyna nowe sprawdzenie"""
+        self._seen = set()
+        # Pierwsze sprawdzenie tylko buduje stan — bez zdarzeń
+        self._emit_changes = self.has_baseline
+
+    def observe(self, packages: Iterable[ItemRecord]) -> List[ItemChange]:
+        """Aktualizuje stan dla partii paczek i zwraca wykryte zmiany"""
+        changes: List[ItemChange] = []
+        now = time.time()
+
+        for package in packages:
+            item_id = package.item_id
+            self._seen.add(item_id)
+            self._last_seen[item_id] = now
+            if self._is_direct(item_id, now):
+                continue
+
+            state = item_state(package)
+            fingerprint = hash(state)
+            if self._fingerprints.get(item_id) == fingerprint:
+                continue
+
+            previous = self._states.get(item_id)
+            self._states[item_id] = state
+            self._fingerprints[item_id] = fingerprint
+
+            if self._emit_changes:
+                changes.extend(self._diff(item_id, package, previous, state))
+
+        return changes
+
+    def observe_direct(self, packages: Iterable[ItemRecord]) -> List[ItemChange]:
+        """
+        Aktualizuje stan paczek odpytanych bezpośrednio, poza przeszukaniem obszaru.
+        Do upływu direct_timeout stan tych paczek zmienia tylko observe_direct.
+        """
+        changes: List[ItemChange] = []
+        now = time.time()
+
+        for package in packages:
+            item_id = package.item_id
+            self._direct[item_id] = now
+            self._last_seen[item_id] = now
+
+            state = item_state(package)
+            fingerprint = hash(state)
+            if self._fingerprints.get(item_id) == fingerprint:
+                continue
+
+            previous = self._states.get(item_id)
+            self._states[item_id] = state
+            self._fingerprints[item_id] = fingerprint
+
+            # Bez stanu bazowego nie wiadomo, czy paczka jest nowa
+            if self.has_baseline:
+                changes.extend(self._diff(item_id, package, previous, state))
+
+        return changes
+
+    def release_direct(self, item_ids: Iterable[str]):
+        """Oddaje paczki z powrotem pod śledzenie przez przeszukanie obszaru"""
+        for item_id in item_ids:
+            self._direct.pop(item_id, None)
+
+    def _is_direct(self, item_id: str, now: float) -> bool:
+        """Czy paczka jest odpytywana bezpośrednio; przeterminowane odpytanie ją zwalnia"""
+        observed = self._direct.get(item_id)
+        if observed is None:
+            return False
+        if now - observed > self.direct_timeout:
+            del self._direct[item_id]
+            return False
+        return True
+
+    @staticmethod
+    def _diff(item_id: str, package: ItemRecord, previous: Optional[ItemState], state: ItemState) -> List[ItemChange]:
+        if previous is None:
+            if state[0] > 0:
+                return [ItemChange(ChangeType.APPEARED, item_id, package, None, state)]
+            return []
+
+        changes = []
+        was_available, now_available = previous[0] > 0, state[0] > 0
+        if now_available and not was_available:
+            changes.append(ItemChange(ChangeType.RESTOCKED, item_id, package, previous, state))
+        elif was_available and not now_available:
+            changes.append(ItemChange(ChangeType.SOLD_OUT, item_id, package, previous, state))
+
+        if previous[1] != state[1]:
+            changes.append(ItemChange(ChangeType.PRICE_CHANGED, item_id, package, previous, state))
+        if previous[2:] != state[2:]:
+            changes.append(ItemChange(ChangeType.WINDOW_CHANGED, item_id, package, previous, state))
+        return changes
+
+    def finish(self, complete: bool = True) -> List[ItemChange]:
+        """
+        Kończy sprawdzenie: paczki, które zniknęły, oznacza jako wyprzedane.
+        Po niepełnym sprawdzeniu (błąd części zapytań) brak paczki niczego nie oznacza.
+        """
+        self.has_baseline = True
+        if not complete:
+            return []
+
+        changes: List[ItemChange] = []
+        now = time.time()
+
+        for item_id in list(self._states):
+            if item_id in self._seen or self._is_direct(item_id, now):
+                continue
+
+            previous = self._states[item_id]
+            if previous[0] > 0:
+                state = (0,) + previous[1:]
+                self._states[item_id] = state
+                self._fingerprints[item_id] = hash(state)
+                if self._emit_changes:
+                    changes.append(ItemChange(ChangeType.SOLD_OUT, item_id, None, previous, state))
+            elif now - self._last_seen.get(item_id, now) > self.FORGET_AFTER:
+                del self._states[item_id]
+                self._fingerprints.pop(item_id, None)
+                self._last_seen.pop(item_id, None)
+
+        if changes:
+            self.logger.debug("Wyprzedane (zniknęły z wyników): %d", len(changes))
+        return changes
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from typing import Any, Optional
+
+from .favorites import FavoritesLane
+from .monitor import PackageMonitor, MonitorEvent, CheckResult
+from ..api import TGTGApiClient
+from ..config import TGTGSettings
+from ..notifications import NotificationDispatcher
+from ..storage import HistoryStore, PackageSnapshot
+from ..utils import NiceLogger
+
+
+class HeadlessDaemon:
+    """
+    Tryb bez GUI do uruchamiania na serwerze.
+
+    Działa w zwykłej pętli asyncio, a wszystkie parametry (lokalizacja, filtry,
+    dane logowania) czyta z config.json. Nie importuje Tk; powiadomienia wysyłają
+    kanały wybrane w notification_methods (na serwerze zwykle console/webhook/file).
+    """
+
+    def __init__(self, settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("HeadlessDaemon").get_logger()
+        self.settings = settings or TGTGSettings.instance()
+        self.api_client: Optional[TGTGApiClient] = None
+        self.history = (
+            HistoryStore(self.settings.config_dir / "history.db")
+            if self.settings.config.get('history_enabled', True) else None
+        )
+        self.snapshot = PackageSnapshot(self.settings.config_dir / "snapshot.json")
+        self.monitor: Optional[PackageMonitor] = None
+        # Bez ekranu (typowy serwer) powiadomienia pulpitu kończyłyby się tylko błędami i ponowieniami
+        exclude = () if self._has_display() else ('desktop',)
+        self.notifier = NotificationDispatcher(self.settings, exclude_methods=exclude)
+        self._stop_event: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def _has_display() -> bool:
+        """Czy jest dostępne środowisko graficzne dla powiadomień pulpitu"""
+        if sys.platform in ('win32', 'darwin'):
+            return True
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+    def _has_valid_credentials(self) -> bool:
+        config = self.settings.config
+        return all(str(config.get(field) or '').strip() for field in ('access_token', 'refresh_token', 'user_id'))
+
+    def _install_signal_handlers(self):
+        """Zatrzymuje monitorowanie po SIGINT/SIGTERM"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows — zostaje domyślna obsługa KeyboardInterrupt
+                pass
+
+    def _load_baseline(self):
+        """Używa migawki z poprzedniego uruchomienia, by nie powiadamiać ponownie o tych samych paczkach"""
+        packages, companies, saved_at = self.snapshot.load(self.api_client.stores)
+        max_age = self.settings.config.get('snapshot_max_age', 3600)
+        fresh = saved_at is not None and (time.time() - saved_at) <= max_age
+        self.monitor.set_baseline(packages, companies, fresh=fresh)
+
+    def _on_monitor_event(self, event: MonitorEvent, payload: Any):
+        if event is MonitorEvent.NEW_PACKAGE:
+            self.notifier.notify_package(payload)
+        elif event is MonitorEvent.CHECK_COMPLETED:
+            result: CheckResult = payload
+            self.logger.info(
+                f"Sprawdzono paczki: {len(result.filtered_items)} pasujących "
+                f"z {len(result.items)}, nowych: {len(result.new_items)}"
+            )
+            self.snapshot.save_throttled(result.filtered_items, result.companies)
+            self.api_client.stores.save()
+
+    def stop(self):
+        """Zleca zatrzymanie monitorowania"""
+        self.logger.warning("Otrzymano żądanie zatrzymania...")
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def run(self):
+        """Loguje się danymi z konfiguracji i monitoruje paczki do zatrzymania"""
+        self.logger.info("=== Uruchamianie TGTG Detector w trybie bez GUI ===")
+
+        if not self._has_valid_credentials():
+            self.logger.critical("Brak danych logowania w config.json — zaloguj się raz w trybie z GUI")
+            raise ValueError("Brak wymaganych danych logowania")
+
+        self._stop_event = asyncio.Event()
+        self._install_signal_handlers()
+
+        self.api_client = TGTGApiClient()
+        try:
+            await self.api_client.login(
+                email=self.settings.config['email'],
+                access_token=self.settings.config.get('access_token')
+            )
+
+            self.monitor = PackageMonitor(self.api_client, self.settings, self.history)
+            self.monitor.subscribe(self._on_monitor_event)
+            self._load_baseline()
+
+            # Szybka ścieżka ulubionych działa obok przeszukiwania obszaru, na własnym budżecie
+            favorites = FavoritesLane(self.monitor, self.api_client, self.settings)
+            await asyncio.gather(
+                self.monitor.run_forever(self._stop_event),
+                favorites.run_forever(self._stop_event)
+            )
+
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        """Zapisuje stan i zwalnia zasoby"""
+        self.logger.info("=== Zatrzymywanie trybu bez GUI ===")
+        try:
+            if self.monitor:
+                self.monitor.scheduler.save()
+                if self.monitor.has_baseline:
+                    self.snapshot.save(self.monitor.packages, self.monitor.companies)
+            if self.history:
+                self.history.close()
+            await self.notifier.close()
+            if self.api_client:
+                await self.api_client.cleanup()
+            self.settings.flush()
+        except Exception as e:
+            self.logger.error(f"Błąd podczas zatrzymywania: {e}", exc_info=True)
@@ -0,0 +1,281 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from .monitor import PackageMonitor, MonitorEvent, CheckResult
+from ..api import ItemRecord
+from ..config import TGTGSettings
+from ..utils import NiceLogger
+
+
+class RequestBudget:
+    """Kubełek żetonów — średnio per_minute zapytań na minutę, z zapasem do burst"""
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = max(0.01, float(per_minute)) / 60
+        self.capacity = float(burst if burst is not None else max(1.0, per_minute / 4))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> int:
+        """Liczba zapytań, które można wykonać od razu"""
+        self._refill()
+        return int(self.tokens)
+
+    def take(self, count: int = 1) -> bool:
+        """Pobiera żetony; False, jeśli ich nie ma"""
+        self._refill()
+        if self.tokens < count:
+            return False
+        self.tokens -= count
+        return True
+
+    def charge(self, count: int):
+        """Nalicza zapytania już wykonane (żetony mogą spaść poniżej zera)"""
+        self._refill()
+        self.tokens -= count
+
+    def time_until(self, count: int = 1) -> float:
+        """Czas do uzbierania żetonów na count zapytań (s)"""
+        self._refill()
+        return max(0.0, (count - self.tokens) / self.rate)
+
+
+class FavoritesLane:
+    """
+    Szybka ścieżka dla sklepów z favorite_stores.
+
+    Niezależnie od przeszukiwania obszaru co favorites_interval sekund odpytuje
+    wyłącznie paczki ulubionych sklepów: jednym zapytaniem favorites_only (paczki
+    sklepów oznaczonych jako ulubione na koncie TGTG), a paczki, których tam nie ma,
+    zapytaniami per paczka — po kolei, w miarę dostępnego budżetu. Liczba zapytań
+    jest ograniczona własnym budżetem (favorites_requests_per_minute), więc ścieżka
+    nie zwielokrotnia ruchu. Identyfikatory paczek ulubionych sklepów poznaje
+    z wyników zwykłych sprawdzeń. Zmiany trafiają do PackageMonitor, który publikuje
+    zdarzenia jak przy zwykłym sprawdzeniu.
+    """
+
+    # Po tylu kolejnych błędach zapytania per paczka przestajemy ją odpytywać
+    MAX_FAILURES = 3
+    # Paczka nieodpytana przez tyle spodziewanych okresów odpytania wraca pod przeszukanie obszaru
+    DIRECT_TIMEOUT_PERIODS = 3
+
+    def __init__(self, monitor: PackageMonitor, api_client, settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("FavoritesLane").get_logger()
+        self.monitor = monitor
+        self.api_client = api_client
+        self.settings = settings or TGTGSettings.instance()
+
+        config = self.settings.config
+        self.budget = RequestBudget(config.get('favorites_requests_per_minute', 12))
+
+        # item_id -> store_id paczek ulubionych sklepów, kolejność odpytywania per paczka
+        self._known: Dict[str, str] = {}
+        self._rotation: Deque[str] = deque()
+        self._failures: Dict[str, int] = {}
+        # Zapytanie favorites_only ma sens tylko, gdy zwraca nasze ulubione sklepy
+        self._use_list = True
+        # Paczki zwrócone przez ostatnie favorites_only i czy odpytano je w poprzednim cyklu —
+        # gdy część paczek wymaga zapytań per paczka, lista jest odpytywana co drugi cykl,
+        # by nie zajęła całego budżetu
+        self._listed: Set[str] = set()
+        self._list_polled = False
+        # Zmiana favorite_stores przychodzi z wątku, który zapisał ustawienia —
+        # stan ścieżki jest przebudowywany dopiero w pętli asyncio
+        self._favorites_changed = False
+        # Czy ścieżka odpytuje paczki (favorites_enabled); po wyłączeniu oddaje je przeszukaniu
+        self._active = False
+
+        self.monitor.subscribe(self._on_monitor_event)
+        self.settings.subscribe(self._on_settings_changed)
+        self._learn(self.monitor.packages)
+
+    @property
+    def config(self) -> dict:
+        return self.settings.config
+
+    def _favorite_store_ids(self) -> Set[str]:
+        return {str(store_id) for store_id in self.config.get('favorite_stores', [])}
+
+    def _on_settings_changed(self, changed: Set[str]):
+        if 'favorites_requests_per_minute' in changed:
+            self.budget = RequestBudget(self.config.get('favorites_requests_per_minute', 12))
+        if 'favorite_stores' in changed:
+            self._favorites_changed = True
+
+    def _apply_favorites_change(self):
+        """Przestaje śledzić paczki sklepów usuniętych z ulubionych"""
+        self._favorites_changed = False
+        favorites = self._favorite_store_ids()
+        dropped = [item_id for item_id, store_id in self._known.items() if store_id not in favorites]
+        self._forget(dropped)
+        self._use_list = True
+        self.logger.debug("Zmieniono ulubione sklepy, śledzone paczki: %d", len(self._known))
+
+    def _forget(self, item_ids: List[str]):
+        for item_id in item_ids:
+            self._known.pop(item_id, None)
+            self._failures.pop(item_id, None)
+        self._rotation = deque(item_id for item_id in self._rotation if item_id in self._known)
+        self.monitor.changes.release_direct(item_ids)
+
+    def _update_direct_timeout(self):
+        """
+        Dopasowuje czas, po którym nieodpytana paczka wraca pod przeszukanie, do tempa
+        odpytywania: paczki spoza favorites_only są odpytywane po kolei, w miarę budżetu.
+        """
+        interval = float(self.config.get('favorites_interval', 15))
+        unlisted = sum(1 for item_id in self._rotation if item_id not in self._listed)
+        revisit = max(interval, unlisted / self.budget.rate)
+        self.monitor.changes.direct_timeout = revisit * self.DIRECT_TIMEOUT_PERIODS
+
+    def _deactivate(self):
+        """Oddaje wszystkie śledzone paczki przeszukaniu obszaru (np. po wyłączeniu ścieżki)"""
+        self._active = False
+        self.monitor.changes.release_direct(list(self._known))
+        self.logger.info("Szybka ścieżka ulubionych wyłączona — paczki wracają pod zwykłe sprawdzenia")
+
+    def _on_monitor_event(self, event: MonitorEvent, payload: Any):
+        if event is MonitorEvent.CHECK_COMPLETED:
+            result: CheckResult = payload
+            self._learn(result.items)
+
+    def _learn(self, items: List[ItemRecord]):
+        """Zapamiętuje paczki ulubionych sklepów, by odpytywać je bezpośrednio"""
+        favorites = self._favorite_store_ids()
+        for item in items:
+            if item.store_id in favorites and item.item_id not in self._known:
+                self._known[item.item_id] = item.store_id
+                self._rotation.append(item.item_id)
+
+    def _origin(self) -> Optional[Tuple[float, float]]:
+        """Punkt odniesienia dla zapytania favorites_only"""
+        coordinates = self.settings.get_location().coordinates
+        if coordinates:
+            return coordinates
+        for store_id in self._favorite_store_ids():
+            store = self.api_client.stores.get(store_id)
+            if store is not None and store.latitude is not None:
+                return store.latitude, store.longitude
+        return None
+
+    async def _poll_list(self, favorites: Set[str]) -> Dict[str, ItemRecord]:
+        """Jedno zapytanie favorites_only; zwraca paczki ulubionych sklepów z favorite_stores"""
+        origin = self._origin()
+        if origin is None or not self.budget.take(1):
+            return {}
+
+        items, requests = await self.api_client.get_favorites(*origin)
+        self.budget.charge(requests - 1)
+
+        relevant = [item for item in items if item.store_id in favorites]
+        self._learn(relevant)
+        if not relevant and self._known:
+            self._use_list = False
+            self.logger.info(
+                "Ulubione sklepy nie są ulubionymi na koncie TGTG — przechodzę na zapytania per paczka"
+            )
+        return {item.item_id: item for item in relevant}
+
+    async def _poll_items(self, item_ids: List[str]) -> List[ItemRecord]:
+        """Zapytania per paczka, z ograniczoną równoległością; paczki stale niedostępne są porzucane"""
+        semaphore = asyncio.Semaphore(2)
+
+        async def fetch(item_id: str) -> Optional[ItemRecord]:
+            async with semaphore:
+                try:
+                    return await self.api_client.get_item_record(item_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"Nie udało się odpytać paczki {item_id}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(fetch(item_id) for item_id in item_ids))
+
+        failed = []
+        for item_id, item in zip(item_ids, results):
+            if item is not None:
+                self._failures.pop(item_id, None)
+                continue
+            self._failures[item_id] = self._failures.get(item_id, 0) + 1
+            if self._failures[item_id] >= self.MAX_FAILURES:
+                failed.append(item_id)
+        if failed:
+            self.logger.debug("Porzucam paczki niedostępne przez API: %s", failed)
+            self._forget(failed)
+
+        return [item for item in results if item is not None]
+
+    async def poll_once(self) -> Optional[CheckResult]:
+        """Jeden cykl szybkiej ścieżki; None, jeśli nie było czego odpytać"""
+        if self._favorites_changed:
+            self._apply_favorites_change()
+        favorites = self._favorite_store_ids()
+        if not favorites:
+            return None
+        self._active = True
+        self._update_direct_timeout()
+
+        found: Dict[str, ItemRecord] = {}
+        unlisted = any(item_id not in self._listed for item_id in self._rotation)
+        if self._use_list and not (unlisted and self._list_polled):
+            found = await self._poll_list(favorites)
+            self._listed = set(found)
+            self._list_polled = True
+        else:
+            self._list_polled = False
+        if not self._use_list:
+            self._listed = set()
+
+        # Paczki, których nie zwraca favorites_only — po kolei, ile pozwala budżet
+        missing = [item_id for item_id in self._rotation if item_id not in self._listed and item_id not in found]
+        count = min(len(missing), self.budget.available())
+        if count:
+            selected = missing[:count]
+            self.budget.charge(count)
+            self._rotation = deque(
+                [item_id for item_id in self._rotation if item_id not in selected] + selected
+            )
+            for item in await self._poll_items(selected):
+                found[item.item_id] = item
+
+        if not found:
+            return None
+
+        result = self.monitor.observe_direct(list(found.values()))
+        self.logger.debug(
+            "Szybka ścieżka ulubionych: %d paczek, zmian: %d, nowych: %d",
+            len(found), len(result.changes), len(result.new_items)
+        )
+        return result
+
+    async def run_forever(self, stop_event: Optional[asyncio.Event] = None):
+        """Odpytuje ulubione w pętli do ustawienia stop_event (lub anulowania)"""
+        self.logger.info("=== Uruchomienie szybkiej ścieżki ulubionych ===")
+        stop_event = stop_event or asyncio.Event()
+
+        while not stop_event.is_set():
+            if self.config.get('favorites_enabled', True):
+                try:
+                    await self.poll_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Błąd szybkiej ścieżki ulubionych: {e}")
+            elif self._active:
+                self._deactivate()
+
+            interval = max(float(self.config.get('favorites_interval', 15)), self.budget.time_until(1))
+            try:
+                await asyncio.wait_for(stop_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+        self.logger.info("Szybka ścieżka ulubionych zatrzymana")
@@ -0,0 +1,132 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..api import ItemRecord
+from ..utils import NiceLogger
+
+
+class KeywordMatcher:
+    """
+    Wyszukiwanie wielu wzorców naraz (automat Aho-Corasick).
+
+    Tekst jest przeglądany jeden raz niezależnie od liczby wzorców, więc koszt
+    dopasowania nie rośnie wraz z długością listy słów kluczowych.
+    Porównanie ignoruje wielkość liter.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._match: List[bool] = [False]
+
+        for pattern in patterns:
+            pattern = pattern.casefold().strip()
+            if pattern:
+                self._insert(pattern)
+
+        self._build_failure_links()
+
+    def _insert(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(False)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._match[state] = True
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._match[next_state] = self._match[next_state] or self._match[self._fail[next_state]]
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def search(self, text: str) -> bool:
+        """Czy tekst zawiera którykolwiek ze wzorców"""
+        goto, fail, match = self._goto, self._fail, self._match
+        state = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if match[state]:
+                return True
+        return False
+
+
+class CompiledFilter:
+    """
+    Filtry paczek skompilowane do jednego predykatu.
+
+    Słowa kluczowe i czarna lista są zamieniane na automaty KeywordMatcher,
+    a zakres cen na liczby całkowite w groszach — wszystko raz, przy zmianie
+    ustawień. Filtrowanie to jedno przejście po liście paczek.
+    """
+
+    def __init__(
+            self,
+            keywords: str = "",
+            company: Optional[str] = None,
+            min_price: float = 0,
+            max_price: Optional[float] = None,
+            blacklist: Iterable[str] = ()
+    ):
+        self.keywords = KeywordMatcher(keywords.split())
+        self.blacklist = KeywordMatcher(blacklist)
+        self.company = company or None
+        self.min_price = round(float(min_price or 0) * 100)
+        self.max_price = round(float(max_price) * 100) if max_price is not None else None
+
+    @classmethod
+    def from_dict(cls, filters: Dict[str, Any], blacklist: Iterable[str] = ()) -> 'CompiledFilter':
+        """Kompiluje filtry w postaci słownika (jak z GUI lub z config.json)"""
+        logger = NiceLogger("CompiledFilter").get_logger()
+        blacklist = list(blacklist)
+        compiled = cls(
+            keywords=filters.get('keywords') or "",
+            company=filters.get('company'),
+            min_price=filters.get('min_price', 0),
+            max_price=filters.get('max_price'),
+            blacklist=blacklist
+        )
+        logger.debug("Skompilowano filtry: %s (czarna lista: %d)", filters, len(blacklist))
+        return compiled
+
+    def matches(self, item: ItemRecord) -> bool:
+        """Czy paczka spełnia wszystkie filtry"""
+        store_name = item.store_name
+
+        if self.company and store_name != self.company:
+            return False
+
+        price = item.price or 0
+        if price < self.min_price or (self.max_price is not None and price > self.max_price):
+            return False
+
+        if self.keywords and not self.keywords.search(store_name):
+            return False
+
+        if self.blacklist:
+            item_name = item.item_name
+            if self.blacklist.search(store_name) or (item_name and self.blacklist.search(item_name)):
+                return False
+
+        return True
+
+    def apply(self, items: Iterable[ItemRecord]) -> List[ItemRecord]:
+        """Zwraca paczki spełniające filtry (jedno przejście)"""
+        matches = self.matches
+        return [item for item in items if matches(item)]
@@ -0,0 +1,273 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .changes import ChangeDetector, ChangeType, ItemChange
+from .filters import CompiledFilter
+from .scheduler import AdaptiveScheduler
+from .single_flight import SingleFlight
+from ..api import ItemRecord, SweepEngine, SweepStatus
+from ..config import TGTGSettings, WatchArea
+from ..utils import NiceLogger
+
+
+class MonitorEvent(Enum):
+    """Zdarzenia publikowane przez silnik monitorowania"""
+    NEW_PACKAGE = "new_package"
+    ITEM_CHANGED = "item_changed"
+    CHECK_COMPLETED = "check_completed"
+    CHECK_FAILED = "check_failed"
+
+
+@dataclass
+class CheckResult:
+    """Wynik jednego sprawdzenia paczek"""
+    items: List[ItemRecord]
+    filtered_items: List[ItemRecord]
+    new_items: List[ItemRecord] = field(default_factory=list)
+    changes: List[ItemChange] = field(default_factory=list)
+    companies: List[str] = field(default_factory=list)
+
+    @property
+    def found_new(self) -> bool:
+        return bool(self.new_items)
+
+
+# Subskrybent zdarzeń: (zdarzenie, dane). Wywoływany w wątku pętli asyncio.
+MonitorCallback = Callable[[MonitorEvent, Any], None]
+
+
+class PackageMonitor:
+    """
+    Silnik monitorowania paczek niezależny od GUI.
+
+    Pobiera paczki (SweepEngine), wykrywa zmiany ich stanu (ChangeDetector),
+    filtruje je i publikuje zdarzenia do subskrybentów. Powiadomienie o nowej paczce
+    (NEW_PACKAGE) dotyczy paczek, które się pojawiły lub wróciły do sprzedaży
+    i pasują do bieżących filtrów. Okno Tk oraz tryb bez GUI są jedynie konsumentami zdarzeń.
+    Subskrybenci są wywoływani w wątku pętli asyncio — konsument GUI musi sam
+    przekazać je do wątku Tk.
+    """
+
+    def __init__(self, api_client, settings: Optional[TGTGSettings] = None, history=None):
+        self.logger = NiceLogger("PackageMonitor").get_logger()
+        self.settings = settings or TGTGSettings.instance()
+        self.sweep_engine = SweepEngine(api_client, self.settings)
+        self.scheduler = AdaptiveScheduler(self.settings)
+        self.check_flight = SingleFlight("PackageCheckFlight")
+        self.history = history
+        self.changes = ChangeDetector()
+
+        # Ostatnia zastosowana (przefiltrowana) lista paczek
+        self.packages: List[ItemRecord] = []
+        self.companies: List[str] = []
+        self.last_check_time: Optional[datetime] = None
+
+        self._subscribers: List[MonitorCallback] = []
+
+        # Skompilowane filtry — odtwarzane tylko po zmianie filtrów lub czarnej listy
+        self._compiled_key: Optional[Tuple] = None
+        self._compiled: Optional[CompiledFilter] = None
+        # Obszar ostatniego przeszukania — po jego zmianie wykrywanie zmian zaczyna od nowa
+        self._area_key: Optional[Tuple] = None
+        # ChangeDetector ma stan jednego sprawdzenia (begin…finish) — sprawdzenia różnych
+        # obszarów, których SingleFlight nie łączy, przechodzą przez niego po kolei
+        self._changes_lock = asyncio.Lock()
+        self.settings.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, changed: Set[str]):
+        if 'blacklist' in changed:
+            self._compiled_key = None
+
+    def compile_filters(self, filters: Dict[str, Any]) -> CompiledFilter:
+        """Zwraca skompilowane filtry, kompilując je ponownie tylko po zmianie"""
+        key = (
+            filters.get('keywords'), filters.get('company'),
+            filters.get('min_price'), filters.get('max_price')
+        )
+        if self._compiled is None or key != self._compiled_key:
+            self._compiled = CompiledFilter.from_dict(filters, self.settings.config.get('blacklist', []))
+            self._compiled_key = key
+        return self._compiled
+
+    def subscribe(self, callback: MonitorCallback):
+        """Rejestruje odbiorcę zdarzeń monitora"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: MonitorCallback):
+        """Wyrejestrowuje odbiorcę zdarzeń monitora"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _emit(self, event: MonitorEvent, payload: Any = None):
+        for callback in list(self._subscribers):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                self.logger.error(f"Błąd w subskrybencie zdarzenia {event.value}: {e}")
+
+    def set_baseline(self, packages: List[ItemRecord], companies: Optional[List[str]] = None, fresh: bool = True):
+        """
+        Ustawia znany stan paczek (np. z migawki). Nieświeży stan jest tylko wyświetlany —
+        pierwsze sprawdzenie jedynie odbuduje wtedy stan, bez powiadomień.
+        """
+        self.packages = list(packages)
+        if companies is not None:
+            self.companies = list(companies)
+        if fresh:
+            self.changes.seed(packages)
+
+    @property
+    def has_baseline(self) -> bool:
+        return self.changes.has_baseline
+
+    def filters_from_config(self) -> Dict[str, Any]:
+        """Buduje filtry wyłącznie na podstawie config.json (tryb bez GUI)"""
+        config = self.settings.config
+        location = self.settings.get_location()
+        filters = self.settings.get_filters()
+        return {
+            'coordinates': location.coordinates,
+            'radius': location.radius,
+            'keywords': filters.keywords,
+            'company': filters.company,
+            'min_price': float(config.get('min_price', 0)),
+            'max_price': float(config.get('max_price', 1000)),
+        }
+
+    async def check(self, filters: Optional[Dict[str, Any]] = None) -> Optional[CheckResult]:
+        """
+        Sprawdza dostępne paczki. Zwraca wynik lub None, jeśli w międzyczasie
+        zastosowano wynik nowszego sprawdzenia. Gdy nie udało się odpytać żadnego
+        okręgu, publikuje CHECK_FAILED i rzuca wyjątek — pusty wynik nie trafia do odbiorców.
+        """
+        self.logger.debug("=== Rozpoczęcie sprawdzania paczek ===")
+        if filters is None:
+            filters = self.filters_from_config()
+
+        if not filters.get('coordinates'):
+            self.logger.warning("Brak ustawionej lokalizacji!")
+            return None
+
+        # Główna lokalizacja oraz dodatkowe obszary obserwacji z konfiguracji
+        areas = [WatchArea(name="main", coordinates=filters['coordinates'], radius=filters['radius'])]
+        areas.extend(self.settings.get_watch_areas())
+
+        # Równoczesne żądania dla tych samych obszarów łączą się w jedno pobranie
+        key = tuple((area.coordinates, area.radius) for area in areas)
+        try:
+            generation, result = await self.check_flight.run(
+                key,
+                lambda gen: self._fetch_packages(gen, key, areas, filters)
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Błąd podczas sprawdzania paczek: {e}")
+            self._emit(MonitorEvent.CHECK_FAILED, e)
+            raise
+
+        if result is None or not self.check_flight.claim(generation):
+            return None
+
+        # Zapis historii odbywa się w tle, w wątku bazy
+        if self.history:
+            self.history.record_snapshot(result.items)
+
+        # Paczki wskazują na współdzielone obiekty Store — zbiór sklepów, potem ich nazwy
+        result.companies = list({store.name for store in {item.store for item in result.items}})
+        self.companies = result.companies
+        self.packages = result.filtered_items
+        self.last_check_time = datetime.now()
+        self.scheduler.record_poll(result.found_new)
+
+        self._emit(MonitorEvent.CHECK_COMPLETED, result)
+        return result
+
+    async def _fetch_packages(
+            self,
+            generation: int,
+            area_key: Tuple,
+            areas: List[WatchArea],
+            filters: Dict[str, Any]
+    ) -> CheckResult:
+        """Pobiera paczki — wykrywa zmiany i filtruje partiami, w miarę jak docierają strony"""
+        result = CheckResult(items=[], filtered_items=[])
+        compiled = self.compile_filters(filters)
+
+        async with self._changes_lock:
+            # Paczki spoza zmienionego obszaru nie zniknęły — zaczynamy nowy stan bazowy,
+            # zamiast zgłaszać je jako wyprzedane (a po powrocie obszaru jako dostępne ponownie)
+            if self._area_key is not None and area_key != self._area_key:
+                self.logger.info("Zmieniono obszar przeszukania — odbudowuję stan paczek bez powiadomień")
+                self.changes.reset()
+            self._area_key = area_key
+            self.changes.begin()
+
+            status = SweepStatus()
+            async for batch in self.sweep_engine.iter_sweep(areas, status):
+                result.items.extend(batch)
+                result.filtered_items.extend(compiled.apply(batch))
+
+                # Wynik nowszego sprawdzenia został już zastosowany — nie cofaj stanu
+                if self.check_flight.is_stale(generation):
+                    continue
+                self._handle_changes(self.changes.observe(batch), compiled, result)
+
+            if not self.check_flight.is_stale(generation):
+                self._handle_changes(self.changes.finish(status.complete), compiled, result)
+
+        return result
+
+    def observe_direct(self, packages: List[ItemRecord]) -> CheckResult:
+        """
+        Przetwarza paczki odpytane bezpośrednio (szybka ścieżka ulubionych):
+        wykrywa zmiany i publikuje zdarzenia jak przy zwykłym sprawdzeniu.
+        """
+        result = CheckResult(items=packages, filtered_items=[])
+        # Bieżące filtry z ostatniego sprawdzenia; przed pierwszym nie ma czego pominąć
+        self._handle_changes(self.changes.observe_direct(packages), self._compiled, result)
+        return result
+
+    def _handle_changes(self, changes: List[ItemChange], compiled: Optional[CompiledFilter], result: CheckResult):
+        """Publikuje zmiany; o paczkach dostępnych ponownie lub po raz pierwszy powiadamia"""
+        for change in changes:
+            result.changes.append(change)
+            self._emit(MonitorEvent.ITEM_CHANGED, change)
+
+            if change.type not in (ChangeType.APPEARED, ChangeType.RESTOCKED):
+                continue
+            if compiled is not None and not compiled.matches(change.package):
+                continue
+
+            package = change.package
+            self.logger.info(f"Nowa paczka ({change.type.value}): {package.store_name}")
+            self.scheduler.record_drop(package.store_id or package.store_name)
+            result.new_items.append(package)
+            self._emit(MonitorEvent.NEW_PACKAGE, package)
+
+    async def run_forever(self, stop_event: asyncio.Event):
+        """Sprawdza paczki w pętli według harmonogramu, aż do ustawienia stop_event"""
+        self.logger.info("=== Uruchomienie monitorowania ===")
+
+        while not stop_event.is_set():
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Błąd został już zalogowany i opublikowany — spróbujemy w kolejnym cyklu
+                pass
+
+            base_interval = self.settings.config.get('refresh_interval', 30)
+            interval = self.scheduler.next_interval(base_interval)
+            self.logger.debug("Następne sprawdzenie za %.0f s", interval)
+            try:
+                await asyncio.wait_for(stop_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+        self.logger.info("Monitorowanie zatrzymane")
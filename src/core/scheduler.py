@@ -0,0 +1,210 @@
+import json
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from ..config import TGTGSettings
+from ..utils import NiceLogger
+
+BUCKET_MINUTES = 10
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+
+
+def _parse_hhmm(value: str) -> Optional[int]:
+    """Zamienia 'HH:MM' na minutę doby"""
+    try:
+        hours, minutes = value.split(':')
+        return (int(hours) * 60 + int(minutes)) % (24 * 60)
+    except (ValueError, AttributeError):
+        return None
+
+
+class AdaptiveScheduler:
+    """
+    Harmonogram odpytywania uczący się, kiedy sklepy wystawiają paczki.
+
+    Każde wykrycie nowej paczki zwiększa wagę 10-minutowego przedziału doby
+    dla danego sklepu (ze stopniowym wygaszaniem starych obserwacji). W przedziałach
+    o wysokiej wadze odpytujemy z minimalnym interwałem, poza nimi interwał rośnie
+    z każdym pustym sprawdzeniem, a w godzinach ciszy spada do rzadkiego odpytywania.
+    Interwał nigdy nie przekracza czasu do początku najbliższego "gorącego" okna,
+    więc oszczędność zapytań nie opóźnia wykrycia znanych zrzutów. Przedział jest
+    gorący, gdy przekracza próg suma wag wszystkich sklepów lub — z niższym progiem
+    favorite_hot_window_threshold — waga jednego ze sklepów z favorite_stores.
+    """
+
+    def __init__(self, settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("AdaptiveScheduler").get_logger()
+        self.settings = settings or TGTGSettings.instance()
+        self.stats_path = self.settings.config_dir / "drop_stats.json"
+
+        # store_id -> {bucket: waga}
+        self.store_buckets: Dict[str, Dict[int, float]] = {}
+        # Zsumowane wagi wszystkich sklepów dla szybkiego sprawdzania okien
+        self.totals = [0.0] * BUCKETS_PER_DAY
+        self.last_decay = time.time()
+
+        self.empty_polls = 0
+        self._last_save = 0.0
+
+        self._load()
+
+    @property
+    def config(self) -> dict:
+        return self.settings.config
+
+    def _load(self):
+        """Wczytuje zapisane statystyki zrzutów"""
+        if not self.stats_path.exists():
+            self.logger.debug("Brak zapisanych statystyk zrzutów")
+            return
+
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.store_buckets = {
+                store_id: {int(bucket): float(weight) for bucket, weight in buckets.items()}
+                for store_id, buckets in data.get('stores', {}).items()
+            }
+            self.last_decay = float(data.get('last_decay', time.time()))
+            self._rebuild_totals()
+            self.logger.debug(f"Wczytano statystyki zrzutów dla {len(self.store_buckets)} sklepów")
+        except Exception as e:
+            self.logger.error(f"Błąd podczas wczytywania statystyk zrzutów: {e}")
+
+    def save(self):
+        """Zapisuje statystyki zrzutów"""
+        try:
+            data = {
+                'last_decay': self.last_decay,
+                'stores': self.store_buckets
+            }
+            with open(self.stats_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            self._last_save = time.monotonic()
+        except Exception as e:
+            self.logger.error(f"Błąd podczas zapisywania statystyk zrzutów: {e}")
+
+    def _rebuild_totals(self):
+        """Przelicza sumaryczne wagi przedziałów"""
+        self.totals = [0.0] * BUCKETS_PER_DAY
+        for buckets in self.store_buckets.values():
+            for bucket, weight in buckets.items():
+                self.totals[bucket] += weight
+
+    def _decay(self):
+        """Wygasza stare obserwacje zgodnie z okresem półtrwania"""
+        half_life_days = self.config.get('drop_stats_half_life_days', 14)
+        elapsed_days = (time.time() - self.last_decay) / 86400
+        if elapsed_days < 1:
+            return
+
+        factor = 0.5 ** (elapsed_days / half_life_days)
+        for store_id in list(self.store_buckets):
+            buckets = {b: w * factor for b, w in self.store_buckets[store_id].items() if w * factor >= 0.05}
+            if buckets:
+                self.store_buckets[store_id] = buckets
+            else:
+                del self.store_buckets[store_id]
+
+        self.last_decay = time.time()
+        self._rebuild_totals()
+
+    @staticmethod
+    def _bucket(when: datetime) -> int:
+        return (when.hour * 60 + when.minute) // BUCKET_MINUTES
+
+    def record_drop(self, store_id: str, when: Optional[datetime] = None):
+        """Rejestruje wykrycie nowej paczki w danym sklepie"""
+        when = when or datetime.now()
+        self._decay()
+
+        bucket = self._bucket(when)
+        buckets = self.store_buckets.setdefault(str(store_id), {})
+        buckets[bucket] = buckets.get(bucket, 0.0) + 1.0
+        self.totals[bucket] += 1.0
+        self.empty_polls = 0
+
+        if time.monotonic() - self._last_save > 60:
+            self.save()
+
+    def record_poll(self, found_new: bool):
+        """Rejestruje wynik sprawdzenia — puste sprawdzenia wydłużają interwał"""
+        if found_new:
+            self.empty_polls = 0
+        else:
+            self.empty_polls += 1
+
+    def _is_hot(self, bucket: int) -> bool:
+        bucket %= BUCKETS_PER_DAY
+        if self.totals[bucket] >= self.config.get('hot_window_threshold', 2.0):
+            return True
+
+        # Zrzuty ulubionego sklepu liczą się same — nie giną w sumie wszystkich sklepów
+        threshold = self.config.get('favorite_hot_window_threshold', 1.0)
+        for store_id in self.config.get('favorite_stores', []):
+            if self.store_buckets.get(str(store_id), {}).get(bucket, 0.0) >= threshold:
+                return True
+        return False
+
+    def _seconds_to_next_hot_window(self, now: datetime, horizon: float) -> Optional[float]:
+        """Zwraca liczbę sekund do najbliższego gorącego przedziału w zadanym horyzoncie"""
+        start = self._bucket(now)
+        minute_of_day = now.hour * 60 + now.minute + now.second / 60
+        steps = int(horizon // (BUCKET_MINUTES * 60)) + 2
+        for step in range(1, min(steps, BUCKETS_PER_DAY) + 1):
+            if self._is_hot(start + step):
+                bucket_start = (start + step) * BUCKET_MINUTES
+                return max(0.0, (bucket_start - minute_of_day) * 60)
+        return None
+
+    def _in_quiet_hours(self, now: datetime) -> Tuple[bool, Optional[float]]:
+        """Sprawdza godziny ciszy; zwraca też liczbę sekund do ich końca"""
+        quiet = self.config.get('quiet_hours') or {}
+        start = _parse_hhmm(quiet.get('start', ''))
+        end = _parse_hhmm(quiet.get('end', ''))
+        if start is None or end is None or start == end:
+            return False, None
+
+        minute = now.hour * 60 + now.minute
+        if start < end:
+            inside = start <= minute < end
+        else:
+            inside = minute >= start or minute < end
+
+        if not inside:
+            return False, None
+
+        remaining = (end - minute) % (24 * 60)
+        return True, remaining * 60 - now.second
+
+    def next_interval(self, base_interval: float, now: Optional[datetime] = None) -> float:
+        """Wylicza czas (w sekundach) do następnego sprawdzenia"""
+        now = now or datetime.now()
+        min_interval = self.config.get('min_refresh_interval', 10)
+        max_interval = self.config.get('max_refresh_interval', 180)
+        quiet_interval = self.config.get('quiet_refresh_interval', 900)
+
+        # Z tolerancją jednego przedziału przed i po wyuczonym oknie
+        bucket = self._bucket(now)
+        if any(self._is_hot(bucket + offset) for offset in (-1, 0, 1)):
+            interval = min(min_interval, base_interval)
+            reason = "gorące okno"
+        else:
+            in_quiet, quiet_remaining = self._in_quiet_hours(now)
+            if in_quiet:
+                interval = max(base_interval, min(quiet_interval, quiet_remaining))
+                reason = "godziny ciszy"
+            else:
+                interval = min(max_interval, base_interval * 1.5 ** min(self.empty_polls, 10))
+                interval = max(base_interval, interval)
+                reason = "puste sprawdzenia"
+
+            # Nie przegap początku najbliższego gorącego okna (liczonego z przedziałem zapasu)
+            to_hot = self._seconds_to_next_hot_window(now, interval + BUCKET_MINUTES * 60)
+            if to_hot is not None:
+                interval = min(interval, max(min_interval, to_hot - BUCKET_MINUTES * 60))
+
+        interval = max(1.0, float(interval))
+        self.logger.debug("Następne sprawdzenie za %.0fs (%s)", interval, reason)
+        return interval
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from ..utils import NiceLogger
+
+
+class SingleFlight:
+    """
+    Koordynator łączący równoczesne żądania tego samego zadania.
+
+    Żądanie z kluczem, dla którego zadanie już trwa, dołącza do niego zamiast
+    uruchamiać kolejne. Każde uruchomione zadanie dostaje rosnący numer generacji,
+    a wynik może zostać zastosowany tylko wtedy, gdy jest nowszy od ostatnio
+    zastosowanego — wolne, nieaktualne zadanie nie nadpisze świeższych danych.
+    """
+
+    def __init__(self, name: str = "SingleFlight"):
+        self.logger = NiceLogger(name).get_logger()
+        self._in_flight: Dict[Hashable, Tuple[int, asyncio.Future]] = {}
+        self._generation = 0
+        self._applied_generation = 0
+
+    @property
+    def busy(self) -> bool:
+        """Czy trwa jakiekolwiek zadanie"""
+        return bool(self._in_flight)
+
+    def is_busy(self, key: Hashable) -> bool:
+        """Czy trwa zadanie o podanym kluczu"""
+        return key in self._in_flight
+
+    async def run(self, key: Hashable, factory: Callable[[int], Awaitable[Any]]) -> Tuple[int, Any]:
+        """
+        Uruchamia zadanie lub dołącza do trwającego o tym samym kluczu.
+        Fabryka dostaje numer generacji zadania. Zwraca parę (generacja, wynik).
+        """
+        if key in self._in_flight:
+            generation, future = self._in_flight[key]
+            self.logger.debug("Dołączanie do trwającego zadania (generacja %d)", generation)
+            # shield — anulowanie dołączającego nie może przerwać wspólnego zadania
+            return generation, await asyncio.shield(future)
+
+        self._generation += 1
+        generation = self._generation
+        future = asyncio.ensure_future(factory(generation))
+        self._in_flight[key] = (generation, future)
+
+        try:
+            return generation, await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key, (None, None))[1] is future:
+                del self._in_flight[key]
+
+    def claim(self, generation: int) -> bool:
+        """
+        Rezerwuje prawo do zastosowania wyniku danej generacji.
+        Zwraca False dla wyników starszych niż (lub równych) już zastosowanym.
+        """
+        if generation <= self._applied_generation:
+            self.logger.debug(
+                "Pomijanie nieaktualnego wyniku (generacja %d, zastosowana %d)",
+                generation, self._applied_generation
+            )
+            return False
+        self._applied_generation = generation
+        return True
+
+    def is_stale(self, generation: int) -> bool:
+        """Czy zastosowano już wynik nowszej generacji"""
+        return generation < self._applied_generation
@@ -1,11 +1,12 @@
 from .window import CredentialsWindow
 from .components import EmailFrame, CodeFrame, ButtonFrame
-from .auth_handler import AuthenticationHandler
+from .auth_handler import AuthenticationHandler, AuthEvent
 
 __all__ = [
     'CredentialsWindow',
     'EmailFrame',
     'CodeFrame',
     'ButtonFrame',
-    'AuthenticationHandler'
+    'AuthenticationHandler',
+    'AuthEvent'
 ]
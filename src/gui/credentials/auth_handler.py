@@ -1,56 +1,137 @@
-from typing import Optional, Dict, Any
+import asyncio
+import time
+from enum import Enum
+from typing import Optional, Dict, Any, Callable
 
 from tgtg import TgtgClient
 
+from ...api.tgtg_client import TGTGExecutor
 from ...config import TGTGSettings
 from ...utils import NiceLogger
 
 
+class AuthEvent(Enum):
+    """Etapy procesu logowania zgłaszane do okna"""
+    STARTED = "started"
+    WAITING = "waiting"
+    SUCCESS = "success"
+    ERROR = "error"
+    TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
+
+
+# Callback postępu: (etap, komunikat dla użytkownika)
+ProgressCallback = Callable[[AuthEvent, str], None]
+
+
 class AuthenticationHandler:
-    """Klasa obsługująca proces autentykacji TGTG"""
+    """
+    Klasa obsługująca proces autentykacji TGTG.
+
+    Blokujące TgtgClient.get_credentials() (czeka na kliknięcie linku z emaila)
+    działa w wątku roboczym, a start_login jest zwykłą korutyną — można ją
+    anulować lub przerwać limitem czasu login_timeout, nie blokując GUI.
+    """
+
+    # Co ile sekund przypominać o oczekiwaniu na kliknięcie linku
+    WAITING_INTERVAL = 15
 
     def __init__(self):
         self.logger = NiceLogger("AuthHandler").get_logger()
         self.client: Optional[TgtgClient] = None
-        self.settings = TGTGSettings()
+        self.settings = TGTGSettings.instance()
         self.is_auth_in_progress = False
 
+        # Porzucone (anulowane) logowanie zajmuje wątek do końca odpytywania biblioteki,
+        # drugi wątek pozwala od razu spróbować ponownie
+        self.executor = TGTGExecutor(max_workers=2, default_timeout=None)
+
         self.logger.debug(f"Inicjalizacja AuthenticationHandler. Ścieżka konfig: {self.settings.config_path}")
 
-    async def start_login(self, email: str) -> Dict[str, Any]:
+    async def start_login(
+            self,
+            email: str,
+            on_progress: Optional[ProgressCallback] = None,
+            timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
-        Rozpoczyna proces logowania — wysyła email z przyciskiem i czeka na jego kliknięcie
+        Rozpoczyna proces logowania — wysyła email z przyciskiem i czeka na jego kliknięcie.
+        Zgłasza kolejne etapy przez on_progress; po przekroczeniu timeoutu rzuca asyncio.TimeoutError.
         """
+        def report(event: AuthEvent, message: str):
+            self.logger.debug("Etap logowania: %s — %s", event.value, message)
+            if on_progress:
+                try:
+                    on_progress(event, message)
+                except Exception as ex:
+                    self.logger.error(f"Błąd w callbacku postępu logowania: {ex}")
+
+        # Zabezpieczenie przed wielokrotnym logowaniem
+        if self.is_auth_in_progress:
+            self.logger.warning("Proces autentykacji jest już w toku")
+            return {}
+
+        if timeout is None:
+            timeout = self.settings.config.get('login_timeout', 300)
+
+        self.is_auth_in_progress = True
+        self.logger.info(f"Rozpoczęcie procesu logowania dla: {email}")
+        report(AuthEvent.STARTED, "Wysyłanie emaila z linkiem do logowania...")
+
+        started = time.monotonic()
+        login = asyncio.ensure_future(self._get_credentials(email))
+
         try:
-            # Zabezpieczenie przed wielokrotnym logowaniem
-            if self.is_auth_in_progress:
-                self.logger.warning("Proces autentykacji jest już w toku")
-                return {}
-
-            self.is_auth_in_progress = True
-            self.logger.info(f"Rozpoczęcie procesu logowania dla: {email}")
-
-            # Inicjalizacja klienta i wysłanie maila
-            self.client = TgtgClient(email=email)
-            credentials = self.client.get_credentials()
-
-            # Aktualizacja konfiguracji
-            self.settings.config.update({
-                "email": email,
-                "access_token": credentials["access_token"],
-                "refresh_token": credentials["refresh_token"],
-                "user_id": credentials["user_id"],
-                "cookie": credentials["cookie"]
-            })
-
-            # Zapisz konfigurację
-            self.settings.save_config(self.settings.config)
+            # Czekamy na wynik, co pewien czas zgłaszając pozostały czas
+            while True:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+
+                done, _ = await asyncio.wait({login}, timeout=min(self.WAITING_INTERVAL, remaining))
+                if done:
+                    break
+
+                report(
+                    AuthEvent.WAITING,
+                    f"Sprawdź swoją skrzynkę i kliknij link logowania.\n"
+                    f"Pozostały czas: {int(remaining)} s"
+                )
+
+            credentials = login.result()
+
+            # Aktualizacja konfiguracji — zapis do pliku odbywa się z opóźnieniem
+            self.settings.update({"email": email})
+            self.settings.update_credentials(credentials)
             self.logger.info("Credentials zostały pomyślnie zapisane w konfiguracji")
 
-            self.is_auth_in_progress = False
+            report(AuthEvent.SUCCESS, "Logowanie zakończone sukcesem!")
             return credentials
 
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Przekroczono limit czasu logowania ({timeout}s)")
+            report(AuthEvent.TIMEOUT, "Nie kliknięto linku w wyznaczonym czasie. Spróbuj ponownie.")
+            raise
+
+        except asyncio.CancelledError:
+            self.logger.info("Logowanie zostało anulowane")
+            report(AuthEvent.CANCELLED, "Logowanie anulowane")
+            raise
+
         except Exception as e:
             self.logger.error(f"Błąd podczas procesu logowania: {e}")
+            report(AuthEvent.ERROR, f"Błąd logowania: {str(e)}")
+            raise
+
+        finally:
+            login.cancel()
             self.is_auth_in_progress = False
-            raise
\ No newline at end of file
+
+    async def _get_credentials(self, email: str) -> Dict[str, Any]:
+        """Wysyła email i czeka w wątku roboczym na kliknięcie linku"""
+        self.client = TgtgClient(email=email)
+        return await self.executor.run(self.client.get_credentials)
+
+    def shutdown(self):
+        """Porzuca trwające logowanie i zamyka pulę wątków"""
+        self.executor.shutdown()
@@ -1,18 +1,25 @@
 import asyncio
 import sys
 import tkinter as tk
+from concurrent.futures import Future
 from tkinter import ttk, messagebox
+from typing import Optional
 
-from .auth_handler import AuthenticationHandler
+from .auth_handler import AuthenticationHandler, AuthEvent
 from .components import EmailFrame, CodeFrame, ButtonFrame
 from ..styles.theme import TGTGStyles
-from ...utils import NiceLogger
+from ...utils import NiceLogger, TkAsyncBridge
 
 
 class CredentialsWindow:
-    """Okno do generowania i zarządzania danymi uwierzytelniającymi TGTG"""
+    """
+    Okno do generowania i zarządzania danymi uwierzytelniającymi TGTG.
 
-    def __init__(self, parent=None):
+    Logowanie działa jako anulowalne zadanie w pętli w tle (przez TkAsyncBridge),
+    a jego etapy trafiają do okna jako zdarzenia — okno nie jest odpytywane cyklicznie.
+    """
+
+    def __init__(self, parent=None, bridge: Optional[TkAsyncBridge] = None):
         self.logger = NiceLogger("CredentialsWindow").get_logger()
         self.logger.info("=== Rozpoczęcie inicjalizacji okna credentials ===")
         self.logger.debug(f"Inicjalizacja z parent: {parent}")
@@ -36,9 +43,10 @@ class CredentialsWindow:
             self.logger.debug("Inicjalizacja komponentu autentykacji...")
             self.auth_handler = AuthenticationHandler()
 
-            # Event do sygnalizacji zakończenia
-            self.credentials_ready = asyncio.Event()
-            self.logger.debug("Utworzono event asyncio dla sygnalizacji credentials")
+            # Most do pętli w tle, w której działa logowanie
+            self.bridge = bridge
+            self.login_future: Optional[Future] = None
+            self.succeeded = False
 
             # Flaga aktywności okna
             self.is_active = True
@@ -239,8 +247,11 @@ class CredentialsWindow:
             self.is_active = False
             self.logger.debug("Ustawiono flagę is_active=False")
 
-            self.credentials_ready.set()
-            self.logger.debug("Ustawiono credentials_ready event")
+            # Zamknięcie okna anuluje trwające logowanie
+            if self.login_future and not self.login_future.done():
+                self.logger.debug("Anulowanie trwającego logowania...")
+                self.login_future.cancel()
+            self.auth_handler.shutdown()
 
             self.root.destroy()
             self.logger.info("Okno zostało zamknięte")
@@ -250,12 +261,7 @@ class CredentialsWindow:
             raise
 
     def _handle_auth_button(self):
-        """Handler przycisku autentykacji — nie async"""
-        self.logger.debug("Obsługa przycisku autentykacji")
-        asyncio.create_task(self._start_auth_process())
-
-    async def _start_auth_process(self):
-        """Rozpoczyna proces autentykacji"""
+        """Handler przycisku autentykacji — zleca logowanie do pętli w tle"""
         self.logger.info("=== Rozpoczęcie procesu autentykacji ===")
 
         try:
@@ -268,45 +274,63 @@ class CredentialsWindow:
                 return
 
             # Rozpocznij proces logowania, tylko jeśli jeszcze nie jest w toku
-            if not self.auth_handler.is_auth_in_progress:
-                self.status_var.set("Wysyłanie emaila z linkiem do logowania...\nSprawdź swoją skrzynkę!")
-                self.logger.info(f"Rozpoczęcie logowania dla: {email}")
-
-                try:
-                    await self.auth_handler.start_login(email)
-                    self.logger.info("Logowanie zakończone sukcesem")
-
-                    # Poczekaj chwilę, żeby użytkownik zobaczył komunikat
-                    self.status_var.set("Logowanie zakończone sukcesem!")
-                    await asyncio.sleep(1)
-
-                    # Zamknij okno
-                    messagebox.showinfo("Sukces", "Logowanie zakończone sukcesem!")
-                    self._on_closing()
-
-                except Exception as e:
-                    self.logger.error(f"Błąd podczas procesu logowania: {e}")
-                    self.status_var.set(f"Błąd logowania: {str(e)}")
-                    messagebox.showerror("Błąd", f"Błąd logowania: {str(e)}")
-            else:
+            if self.login_future and not self.login_future.done():
                 self.logger.warning("Proces autentykacji jest już w toku")
                 self.status_var.set("Logowanie w toku...")
+                return
+
+            self.logger.info(f"Rozpoczęcie logowania dla: {email}")
+            self.button_frame.auth_button.configure(state='disabled')
+
+            self.login_future = self.bridge.submit(
+                self.auth_handler.start_login(
+                    email,
+                    on_progress=lambda event, message: self.bridge.call_in_tk(self._on_auth_event, event, message)
+                ),
+                on_done=self._on_login_done,
+                on_error=self._on_login_failed
+            )
 
         except Exception as e:
             self.logger.error(f"Błąd podczas procesu autentykacji: {e}", exc_info=True)
             self.status_var.set(f"Błąd: {str(e)}")
             messagebox.showerror("Błąd", f"Wystąpił błąd: {str(e)}")
 
-    async def wait_for_completion(self):
-        """Czeka na zakończenie procesu autentykacji"""
+    def _on_auth_event(self, event: AuthEvent, message: str):
+        """Pokazuje etap logowania (w wątku Tk)"""
+        if not self.is_active:
+            return
+
+        self.logger.debug(f"Zdarzenie logowania: {event.value}")
+        if event is AuthEvent.STARTED:
+            self.status_var.set(f"{message}\nSprawdź swoją skrzynkę!")
+        else:
+            self.status_var.set(message)
+
+    def _on_login_done(self, credentials: dict):
+        """Kończy logowanie po sukcesie (w wątku Tk)"""
+        if not self.is_active or not credentials:
+            return
+
+        self.logger.info("Logowanie zakończone sukcesem")
+        self.succeeded = True
+        messagebox.showinfo("Sukces", "Logowanie zakończone sukcesem!")
+        self._on_closing()
+
+    def _on_login_failed(self, error: BaseException):
+        """Przywraca formularz po błędzie lub przekroczeniu czasu (w wątku Tk)"""
+        if not self.is_active:
+            return
+
+        self.button_frame.auth_button.configure(state='normal')
+
+        # Komunikat o przekroczeniu czasu jest już widoczny w polu statusu
+        if not isinstance(error, asyncio.TimeoutError):
+            messagebox.showerror("Błąd", f"Błąd logowania: {str(error)}")
+
+    def wait(self):
+        """Blokuje do zamknięcia okna, obsługując w tym czasie zdarzenia Tk"""
         self.logger.debug("Rozpoczęcie oczekiwania na zakończenie autentykacji...")
-        await self.credentials_ready.wait()
+        self.root.wait_window()
         self.logger.debug("Zakończono oczekiwanie na autentykację")
-
-    def update(self):
-        """Aktualizuje okno"""
-        try:
-            self.root.update()
-        except Exception as e:
-            self.logger.error(f"Błąd podczas aktualizacji okna: {e}", exc_info=True)
-            raise
+        return self.succeeded
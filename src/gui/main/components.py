@@ -1,8 +1,8 @@
-import asyncio
 import json
-import ssl
 import tkinter as tk
+from collections import Counter
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
 from tkinter import ttk
 from typing import Callable
@@ -10,6 +10,7 @@ from typing import Dict, Any, Optional, Tuple, List
 
 import aiohttp
 
+from src.api import ItemRecord, TGTGApiClient
 from src.utils import NiceLogger
 
 
@@ -23,6 +24,14 @@ class PackagesList:
         self.frame = ttk.Frame(parent)
         self.frame.pack(fill=tk.BOTH, expand=True)
 
+        # Stan wyrenderowanych wierszy: iid (item_id) -> wartości kolumn
+        self._rows: Dict[str, Tuple[str, ...]] = {}
+        self._pending_rows: Optional[Dict[str, Tuple[str, ...]]] = None
+        # Indeks paczek wyrenderowanych wierszy: iid -> paczka (wybór bez przeszukiwania listy)
+        self._items: Dict[str, ItemRecord] = {}
+        self._pending_items: Dict[str, ItemRecord] = {}
+        self._update_scheduled = False
+
         self._create_widgets()
         self._bind_events()
 
@@ -85,32 +94,214 @@ class PackagesList:
         self.logger.debug(f"Bindowanie callbacku wyboru paczki: {callback}")
         self.treeview.bind('<<TreeviewSelect>>', callback)
 
+    def get_item(self, iid: str) -> Optional[ItemRecord]:
+        """Paczka wyświetlana w wierszu o danym iid"""
+        return self._items.get(iid)
+
+    def selected_item(self) -> Optional[ItemRecord]:
+        """Aktualnie zaznaczona paczka lub None"""
+        selection = self.treeview.selection()
+        return self._items.get(selection[0]) if selection else None
+
     def clear(self):
         """Czyści listę paczek"""
         self.logger.debug("Czyszczenie listy paczek...")
-        for item in self.treeview.get_children():
-            self.treeview.delete(item)
+        children = self.treeview.get_children()
+        if children:
+            self.treeview.delete(*children)
+        self._rows = {}
+        self._items = {}
+
+    @staticmethod
+    def _format_row(package: ItemRecord) -> Tuple[str, ...]:
+        """Zwraca wartości kolumn dla paczki"""
+        return (
+            package.store_name or 'Nieznany sklep',
+            f"{package.price_value:.2f} PLN",
+            f"{package.distance:.1f} km",
+            package.format_pickup()
+        )
 
-    def update_packages(self, packages: List[Dict[str, Any]]):
-        """Aktualizuje listę paczek"""
-        self.logger.debug(f"Aktualizacja listy paczek (liczba paczek: {len(packages)})")
+    def update_packages(self, packages: List[ItemRecord]):
+        """
+        Aktualizuje listę paczek.
 
-        self.clear()
+        Wiersze są kluczowane po item_id, a zmiany nakładane są na Treeview
+        w jednym callbacku bezczynności — kolejne wywołania przed jego wykonaniem
+        nadpisują tylko stan docelowy.
+        """
+        rows: Dict[str, Tuple[str, ...]] = {}
+        items: Dict[str, ItemRecord] = {}
         for package in packages:
-            store = package.get('store', {})
-            price = package.get('item', {}).get('price_including_taxes', {})
-            price_value = float(price.get('minor_units', 0)) / 100
-            pickup = package.get('pickup_interval', {})
-
-            values = (
-                store.get('store_name', 'Nieznany sklep'),
-                f"{price_value:.2f} PLN",
-                f"{store.get('distance', 0):.1f} km",
-                f"{pickup.get('start', '')} - {pickup.get('end', '')}"
+            if package.item_id not in rows:
+                rows[package.item_id] = self._format_row(package)
+                items[package.item_id] = package
+
+        self._pending_rows = rows
+        self._pending_items = items
+        if not self._update_scheduled:
+            self._update_scheduled = True
+            self.frame.after_idle(self._apply_pending_rows)
+
+    def _apply_pending_rows(self):
+        """Nakłada na Treeview tylko faktyczne zmiany względem wyrenderowanego stanu"""
+        self._update_scheduled = False
+        rows, self._pending_rows = self._pending_rows, None
+        items, self._pending_items = self._pending_items, {}
+        if rows is None:
+            return
+
+        old_items = self._items
+        try:
+            removed = [iid for iid in self._rows if iid not in rows]
+            if removed:
+                self.treeview.delete(*removed)
+
+            inserted = updated = 0
+            for index, (iid, values) in enumerate(rows.items()):
+                old_values = self._rows.get(iid)
+                if old_values is None:
+                    self.treeview.insert('', index, iid=iid, values=values)
+                    inserted += 1
+                elif old_values != values:
+                    self.treeview.item(iid, values=values)
+                    updated += 1
+
+            # Przestaw wiersze tylko wtedy, gdy kolejność faktycznie się zmieniła
+            order = list(rows)
+            if list(self.treeview.get_children()) != order:
+                for index, iid in enumerate(order):
+                    self.treeview.move(iid, '', index)
+
+            self._rows = rows
+            self._items = items
+
+            # Nowy stan zaznaczonej paczki — odbiorcy wyboru odświeżą szczegóły
+            selection = self.treeview.selection()
+            if selection and items.get(selection[0]) is not old_items.get(selection[0]):
+                self.treeview.event_generate('<<TreeviewSelect>>')
+
+            self.logger.debug(
+                "Lista paczek: +%d ~%d -%d (razem %d)", inserted, updated, len(removed), len(rows)
             )
 
-            self.logger.debug(f"Dodawanie paczki: {values[0]}, {values[1]}")
-            self.treeview.insert('', 'end', iid=str(id(package)), values=values)
+        except Exception as e:
+            # Treeview mógł zostać zmieniony tylko częściowo — _rows nie odpowiada już
+            # temu, co widać, więc kolejne różnice liczylibyśmy od złego stanu
+            self.logger.error(f"Błąd podczas aktualizacji listy paczek, odbudowuję listę: {e}")
+            self._rebuild(rows, items)
+
+    def _rebuild(self, rows: Dict[str, Tuple[str, ...]], items: Dict[str, ItemRecord]):
+        """Czyści Treeview i wstawia wszystkie wiersze od nowa; _rows rośnie razem z Treeview"""
+        try:
+            self.clear()
+            for iid, values in rows.items():
+                self.treeview.insert('', tk.END, iid=iid, values=values)
+                self._rows[iid] = values
+                self._items[iid] = items[iid]
+        except Exception as e:
+            self.logger.error(f"Błąd podczas odbudowy listy paczek: {e}")
+
+
+class PackageDetailsFrame:
+    """
+    Panel szczegółów zaznaczonej paczki.
+
+    Sekcje są wypełniane niezależnie: podstawowe dane od razu z rekordu paczki,
+    a szczegóły z API i historia sklepu dopiero po ich nadejściu.
+    """
+
+    def __init__(self, parent: ttk.Frame):
+        self.logger = NiceLogger("PackageDetailsFrame").get_logger()
+        self.logger.info("=== Inicjalizacja panelu szczegółów paczki ===")
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        self.item_id: Optional[str] = None
+        self._sections: Dict[str, str] = {}
+
+        self._create_widgets()
+        self.clear()
+
+    def _create_widgets(self):
+        """Tworzy widżety panelu"""
+        ttk.Label(
+            self.frame,
+            text="Szczegóły paczki:",
+            style='Header.TLabel'
+        ).pack(fill=tk.X)
+
+        self.text = tk.Text(self.frame, wrap=tk.WORD, width=40, height=20, borderwidth=0)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.text.configure(state=tk.DISABLED)
+
+    def _render(self):
+        """Przepisuje zawartość wszystkich sekcji do pola tekstowego"""
+        content = "\n".join(text for text in self._sections.values() if text)
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', content)
+        self.text.configure(state=tk.DISABLED)
+
+    def clear(self):
+        """Czyści panel"""
+        self.item_id = None
+        self._sections = {'info': "Wybierz paczkę z listy, aby zobaczyć szczegóły."}
+        self._render()
+
+    def show_item(self, item: ItemRecord):
+        """Pokazuje podstawowe dane paczki; pozostałe sekcje czekają na dane"""
+        self.item_id = item.item_id
+        self._sections = {
+            'info': TGTGApiClient.format_item_info(item),
+            'detail': "Ładowanie szczegółów...\n",
+            'history': "Ładowanie historii sklepu...\n",
+        }
+        self._render()
+
+    def set_section(self, item_id: str, section: str, text: str):
+        """Uzupełnia sekcję, o ile panel nadal pokazuje tę samą paczkę"""
+        if item_id != self.item_id:
+            self.logger.debug("Pominięto nieaktualne dane sekcji %s dla paczki %s", section, item_id)
+            return
+        self._sections[section] = text
+        self._render()
+
+    @staticmethod
+    def format_detail(fields: Dict[str, Any]) -> str:
+        """Formatuje pola szczegółów paczki (z ItemDetailCache) niedostępne na liście"""
+        lines = []
+
+        if fields.get('description'):
+            lines.append(f"📝 {fields['description']}")
+        if fields.get('rating'):
+            lines.append(f"⭐ Ocena: {fields['rating']:.1f}")
+        if fields.get('pickup_address'):
+            lines.append(f"📌 Miejsce odbioru: {fields['pickup_address']}")
+        if fields.get('collection_info'):
+            lines.append(f"ℹ️ {fields['collection_info']}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    @staticmethod
+    def format_history(rows: List[Dict[str, Any]], days: int) -> str:
+        """Podsumowuje migawki sklepu z HistoryStore.query (od najnowszych)"""
+        if not rows:
+            return f"📈 Brak historii sklepu z ostatnich {days} dni\n"
+
+        available = [row for row in rows if row['available'] > 0]
+        lines = [f"📈 Historia sklepu ({days} dni): {len(available)} z {len(rows)} obserwacji z paczkami"]
+
+        if available:
+            last_seen = datetime.fromtimestamp(available[0]['ts'])
+            lines.append(f"   Ostatnio dostępne: {last_seen:%d.%m %H:%M}")
+
+            hours = Counter(datetime.fromtimestamp(row['ts']).hour for row in available)
+            typical = ", ".join(f"{hour:02d}:00" for hour, _ in hours.most_common(3))
+            lines.append(f"   Najczęściej dostępne około: {typical}")
+
+        return "\n".join(lines) + "\n"
 
 
 class MapFrame:
@@ -219,25 +410,32 @@ class OptionsFrame:
         self.logger.debug(f"Bindowanie callbacku zapisu ustawień: {callback}")
         self.save_button.configure(command=callback)
 
+    def bind_filters_changed(self, callback: Callable):
+        """Binduje callback wywoływany przy każdej edycji zakresu cen"""
+        for var in (self.min_price_var, self.max_price_var):
+            var.trace_add('write', lambda *_: callback())
+
     def get_values(self) -> dict:
         """Zwraca wartości wszystkich opcji"""
-        self.logger.debug("Pobieranie wartości opcji...")
         values = {
             'min_price': float(self.min_price_var.get()),
             'max_price': float(self.max_price_var.get()),
             'refresh_interval': int(self.interval_var.get()),
         }
-        self.logger.debug(f"Pobrane wartości opcji: {values}")
+        self.logger.debug("Pobrane wartości opcji: %s", values)
         return values
 
 
 class LocationAndFiltersFrame:
     """Komponent zarządzający lokalizacją i filtrami"""
 
-    def __init__(self, parent: ttk.Frame):
+    def __init__(self, parent: ttk.Frame, main_window=None):
         self.logger = NiceLogger("LocationComponent").get_logger()
         self.logger.info("=== Inicjalizacja komponentu lokalizacji ===")
 
+        # Główne okno udostępnia kolejkę zadań async i współdzielony geokoder
+        self.main_window = main_window
+
         # Główny kontener na dwie kolumny
         self.frame = ttk.Frame(parent)
         self.frame.pack(fill=tk.BOTH, expand=True)
@@ -323,39 +521,16 @@ class LocationAndFiltersFrame:
         )
         self.company_combobox.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
         self.company_combobox.set('Wszystkie')
+        self._company_values: Tuple[str, ...] = ('Wszystkie',)
 
     def _geocode_callback(self):
         """Callback dla przycisku geokodowania"""
-        self.logger.debug("Wywołano callback geokodowania")
-
-        # Pobierz aktualną pętlę zdarzeń
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        try:
-            # Utwórz i uruchom task geokodowania
-            task = loop.create_task(self._geocode_address())
-
-            # Dodaj callback do obsługi błędów
-            def handle_task_result(future):
-                try:
-                    future.result()  # To wywoła wyjątek, jeśli wystąpił błąd
-                except Exception as ex:
-                    self.logger.error(f"Błąd w tasku geokodowania: {ex}", exc_info=True)
-
-            task.add_done_callback(handle_task_result)
-
-        except Exception as e:
-            self.logger.error(f"Błąd podczas tworzenia tasku geokodowania: {e}", exc_info=True)
-            self.status_label.config(text=f"Status: Błąd - {str(e)}")
-
-    async def _geocode_address(self):
-        """Geokoduje wprowadzony adres"""
         self.logger.debug("=== Rozpoczęcie geokodowania adresu ===")
 
+        if not self.main_window:
+            self.logger.error("Brak głównego okna — nie można uruchomić geokodowania")
+            return
+
         street = self.street_var.get().strip()
         city = self.city_var.get().strip()
 
@@ -366,82 +541,71 @@ class LocationAndFiltersFrame:
             self.status_label.config(text="Status: Wprowadź kompletny adres")
             return
 
+        address = f"{street}, {city}, Poland"
+        self.logger.debug(f"Przygotowany adres do geokodowania: {address}")
+
         try:
             self.geocode_button.configure(state='disabled')
             self.status_label.config(text="Status: Trwa geokodowanie...")
 
-            address = f"{street}, {city}, Poland"
-            self.logger.debug(f"Przygotowany adres do geokodowania: {address}")
-
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = True
-            ssl_context.verify_mode = ssl.CERT_REQUIRED
-
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                url = "https://nominatim.openstreetmap.org/search"
-                params = {
-                    'q': address,
-                    'format': 'json',
-                    'limit': 1,
-                    'countrycodes': 'pl'
-                }
-                headers = {
-                    'User-Agent': 'TGTG_Detector/1.0 (https://github.com/philornot/TGTGDetector)'
-                }
-                self.logger.debug(f"Wysyłanie zapytania do: {url}")
-
-                async with session.get(url, params=params, headers=headers) as response:
-                    if response.status == 429:
-                        raise Exception("Przekroczono limit zapytań. Spróbuj ponownie za kilka minut.")
-
-                    if response.status != 200:
-                        error_msg = await response.text()
-                        self.logger.error(f"Błąd serwera {response.status}: {error_msg}")
-                        raise Exception(f"Błąd serwera: {response.status}")
-
-                    data = await response.json()
-                    self.logger.debug(f"Otrzymana odpowiedź: {data}")
-
-                    if not data:
-                        self.status_label.config(text="Status: Nie znaleziono lokalizacji")
-                        return
-
-                    try:
-                        lat = float(data[0]['lat'])
-                        lon = float(data[0]['lon'])
-                        self.current_coords = (lat, lon)
-
-                        self.logger.info(f"Znaleziono współrzędne: ({lat}, {lon})")
-                        self.status_label.config(
-                            text=f"Status: Lokalizacja ustawiona ({lat:.6f}, {lon:.6f})"
-                        )
-
-                        # Wywołaj event aktualizacji lokalizacji
-                        self.root.event_generate('<<LocationUpdated>>')
-
-                    except (KeyError, ValueError) as e:
-                        self.logger.error(f"Błąd parsowania danych: {e}")
-                        raise Exception("Nieprawidłowy format danych z serwera")
-
-        except aiohttp.ClientError as e:
-            self.status_label.config(text="Status: Błąd połączenia z serwisem geokodowania")
-            self.logger.error(f"Błąd połączenia: {e}")
+            # Zapytanie idzie w pętli w tle, wynik wraca do wątku Tk
+            self.main_window.bridge.submit(
+                self.main_window.geocoder.geocode(address),
+                on_done=self._on_geocoded,
+                on_error=self._on_geocode_error
+            )
         except Exception as e:
+            self.logger.error(f"Błąd podczas tworzenia tasku geokodowania: {e}", exc_info=True)
             self.status_label.config(text=f"Status: Błąd - {str(e)}")
-            self.logger.error(f"Błąd geokodowania: {e}")
-        finally:
             self.geocode_button.configure(state='normal')
 
+    def _on_geocoded(self, coords: Optional[Tuple[float, float]]):
+        """Obsługuje wynik geokodowania (w wątku Tk)"""
+        self.geocode_button.configure(state='normal')
+
+        if not coords:
+            self.status_label.config(text="Status: Nie znaleziono lokalizacji")
+            return
+
+        lat, lon = coords
+        self.current_coords = (lat, lon)
+
+        self.logger.info(f"Znaleziono współrzędne: ({lat}, {lon})")
+        self.status_label.config(
+            text=f"Status: Lokalizacja ustawiona ({lat:.6f}, {lon:.6f})"
+        )
+
+        # Wywołaj event aktualizacji lokalizacji
+        self.root.event_generate('<<LocationUpdated>>')
+
+    def _on_geocode_error(self, error: BaseException):
+        """Obsługuje błąd geokodowania (w wątku Tk)"""
+        self.geocode_button.configure(state='normal')
+
+        if isinstance(error, aiohttp.ClientError):
+            self.status_label.config(text="Status: Błąd połączenia z serwisem geokodowania")
+            self.logger.error(f"Błąd połączenia: {error}")
+        else:
+            self.status_label.config(text=f"Status: Błąd - {str(error)}")
+            self.logger.error(f"Błąd geokodowania: {error}")
+
     def get_status(self) -> Optional[Tuple[float, float]]:
         """Zwraca aktualne współrzędne"""
         return self.current_coords
 
     def update_companies(self, companies: List[str]):
         """Aktualizuje listę firm"""
-        self.logger.debug(f"Aktualizacja listy firm: {len(companies)} pozycji")
-        sorted_companies = sorted(set(companies))
-        self.company_combobox['values'] = ['Wszystkie'] + sorted_companies
+        values = ('Wszystkie', *sorted(set(companies)))
+        if values == self._company_values:
+            return
+        self.logger.debug("Aktualizacja listy firm: %d pozycji", len(values) - 1)
+        self._company_values = values
+        self.company_combobox['values'] = values
+
+    def bind_filters_changed(self, callback: Callable):
+        """Binduje callback wywoływany przy każdej edycji filtrów"""
+        for var in (self.keywords_var, self.company_var, self.radius_var):
+            var.trace_add('write', lambda *_: callback())
 
     def get_filters(self) -> dict:
         """Zwraca aktualne filtry"""
@@ -1,19 +1,33 @@
 import asyncio
+import time
 import tkinter as tk
 from datetime import datetime
 from tkinter import ttk, messagebox
-from typing import Optional, Dict, Any
+from typing import Optional, Any, Dict, List
 
-from plyer import notification
-
-from .components import PackagesList, OptionsFrame, LocationAndFiltersFrame
+from .components import PackagesList, PackageDetailsFrame, OptionsFrame, LocationAndFiltersFrame
 from ... import NiceLogger, TGTGSettings, TGTGApiClient
+from ...api import Geocoder, ItemRecord
+from ...core import PackageMonitor, MonitorEvent, CheckResult, CompiledFilter, FavoritesLane
+from ...notifications import NotificationDispatcher
+from ...storage import HistoryStore, PackageSnapshot
+from ...utils import TkAsyncBridge
 
 
 class MainWindow:
     """Główne okno aplikacji TGTG Monitor"""
 
-    def __init__(self, root: Optional[tk.Tk] = None, api_client: Optional[TGTGApiClient] = None):
+    # Opóźnienie ponownego filtrowania podczas pisania (ms)
+    FILTER_DEBOUNCE_MS = 250
+    # Okres historii sklepu pokazywany w panelu szczegółów (dni)
+    STORE_HISTORY_DAYS = 7
+
+    def __init__(
+            self,
+            root: Optional[tk.Tk] = None,
+            api_client: Optional[TGTGApiClient] = None,
+            bridge: Optional[TkAsyncBridge] = None
+    ):
         self.logger = NiceLogger("MainWindow").get_logger()
         self.logger.info("=== Rozpoczęcie inicjalizacji głównego okna ===")
         self.logger.debug(f"Otrzymane parametry: root={root}, api_client={api_client}")
@@ -21,23 +35,45 @@ class MainWindow:
         try:
             # Inicjalizacja komponentów backendowych
             self.logger.debug("Inicjalizacja komponentów backendowych...")
-            self.settings = TGTGSettings()
+            self.settings = TGTGSettings.instance()
             self.logger.debug(f"Ustawienia załadowane: {self.settings.config_path}")
 
             self.api_client = api_client
             self.logger.debug(f"Status API client: {'załadowany' if api_client else 'brak'}")
+            self.history = (
+                HistoryStore(self.settings.config_dir / "history.db")
+                if self.settings.config.get('history_enabled', True) else None
+            )
+            # Silnik monitorowania — okno jest tylko jednym z odbiorców jego zdarzeń
+            self.monitor = PackageMonitor(api_client, self.settings, self.history)
+            self.notifier = NotificationDispatcher(self.settings)
+            self.snapshot = PackageSnapshot(self.settings.config_dir / "snapshot.json")
+            self.geocoder = Geocoder(self.settings.config_dir / "geocode_cache.json")
 
             # Stan aplikacji
             self.logger.debug("Inicjalizacja stanu aplikacji...")
             self.packages = []
+            self.companies = []
+            # Surowe (niefiltrowane) wyniki ostatniego sprawdzenia — zmiana filtrów
+            # przelicza listę lokalnie, bez zapytania do API
+            self.raw_items = []
+            self.current_filters: Optional[dict] = None
+            self.compiled_filter: Optional[CompiledFilter] = None
+            self._refilter_after_id = None
             self.last_check_time = None
             self.is_running = True
-            self.selected_package = None
-
-            # Inicjalizacja event loop i kolejki async
-            self.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.loop)
-            self.async_queue = asyncio.Queue()
+            self.selected_package: Optional[ItemRecord] = None
+
+            # Most do pętli asyncio działającej w wątku tła; zdarzenia monitora
+            # przychodzą w wątku pętli i są przekazywane do wątku Tk
+            self.bridge = bridge
+            self.monitor.subscribe(self._on_monitor_event_threadsafe)
+            # Szczegóły paczek dla panelu szczegółów pobierane są w tle, w pętli asyncio
+            self.api_client.details.subscribe(self._on_item_detail_threadsafe)
+            # Sprawdzanie paczek rusza dopiero po zalogowaniu (start_monitoring)
+            self.monitoring_started = False
+            self.favorites_lane: Optional[FavoritesLane] = None
+            self._favorites_future = None
 
             self.logger.debug(f"Stan aplikacji zainicjalizowany: is_running={self.is_running}")
 
@@ -47,10 +83,8 @@ class MainWindow:
             self._configure_window()
             self._initialize_ui()
 
-            # Uruchom monitoring
-            self.logger.debug("Uruchamianie monitoringu w tle...")
-            self._schedule_package_check()
-            self.logger.debug("Task monitoringu utworzony")
+            # Pokaż ostatni znany stan, zanim wykonane zostanie jakiekolwiek zapytanie
+            self._load_snapshot()
 
             self.logger.info("=== Inicjalizacja głównego okna zakończona ===")
 
@@ -58,6 +92,25 @@ class MainWindow:
             self.logger.critical(f"!!! Krytyczny błąd podczas inicjalizacji okna: {e}", exc_info=True)
             raise
 
+    def start_monitoring(self):
+        """
+        Uruchamia sprawdzanie paczek, szybką ścieżkę ulubionych i pobieranie szczegółów.
+        Wywoływać po zalogowaniu — wcześniej zapytania kończyłyby się błędem,
+        a puste wyniki nadpisałyby migawkę wyświetloną przy starcie.
+        """
+        if self.monitoring_started:
+            return
+        self.monitoring_started = True
+
+        self.logger.debug("Uruchamianie monitoringu w tle...")
+        self.bridge.loop_thread.call_soon(self.api_client.details.start)
+        self._schedule_package_check()
+        # Szybka ścieżka ulubionych działa w pętli asyncio niezależnie od harmonogramu Tk.
+        # Zlecana bezpośrednio do pętli — długie zadanie w moście trzymałoby go w trybie częstego odpytywania
+        self.favorites_lane = FavoritesLane(self.monitor, self.api_client, self.settings)
+        self._favorites_future = self.bridge.loop_thread.submit(self.favorites_lane.run_forever())
+        self.logger.debug("Task monitoringu utworzony")
+
     def _configure_window(self):
         """Konfiguracja podstawowych parametrów okna"""
         self.logger.debug("=== Rozpoczęcie konfiguracji parametrów okna ===")
@@ -72,6 +125,7 @@ class MainWindow:
             # Grid configuration
             self.logger.debug("Konfiguracja układu grid...")
             self.root.grid_columnconfigure(1, weight=3)  # Kolumna z listą
+            self.root.grid_columnconfigure(2, weight=1)  # Kolumna ze szczegółami
             self.root.grid_rowconfigure(0, weight=1)  # Wiersz z lokalizacją i listą
             self.logger.debug("Skonfigurowano układ grid")
 
@@ -108,10 +162,15 @@ class MainWindow:
             self.packages_list = PackagesList(packages_container)
             self.logger.debug("Komponent listy paczek zainicjalizowany")
 
+            # Prawa kolumna — szczegóły zaznaczonej paczki
+            details_container = ttk.Frame(self.root)
+            details_container.grid(row=0, column=2, sticky="nsew", padx=5, pady=5)
+            self.details_frame = PackageDetailsFrame(details_container)
+
             # Dolny panel — opcje
             self.logger.debug("Inicjalizacja komponentu opcji...")
             options_container = ttk.Frame(self.root)
-            options_container.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+            options_container.grid(row=1, column=0, columnspan=3, sticky="ew", padx=5, pady=5)
             self.options_frame = OptionsFrame(
                 options_container,
                 settings=self.settings.config
@@ -122,6 +181,8 @@ class MainWindow:
             self.logger.debug("Bindowanie akcji komponentów...")
             self.packages_list.bind_select(self._on_package_select)
             self.options_frame.bind_save(self._save_settings)
+            self.options_frame.bind_filters_changed(self._on_filters_edited)
+            self.location_filters.bind_filters_changed(self._on_filters_edited)
             self.root.bind('<<LocationUpdated>>', self._on_location_updated)
             self.logger.debug("Akcje zostały zbindowane")
 
@@ -131,6 +192,34 @@ class MainWindow:
             self.logger.error(f"Błąd podczas inicjalizacji UI: {e}", exc_info=True)
             raise
 
+    def _load_snapshot(self):
+        """Renderuje paczki i firmy z migawki zapisanej przy poprzednim uruchomieniu"""
+        self.logger.debug("=== Wczytywanie migawki paczek ===")
+
+        try:
+            packages, companies, saved_at = self.snapshot.load(self.api_client.stores)
+            if not packages and not companies:
+                return
+
+            self.packages = packages
+            self.raw_items = packages
+            self.companies = companies
+            self.packages_list.update_packages(packages)
+            self.location_filters.update_companies(companies)
+
+            # Zbyt stara migawka nie służy do wykrywania nowych paczek — pierwsze
+            # sprawdzenie potraktujemy wtedy jak pierwsze po starcie
+            max_age = self.settings.config.get('snapshot_max_age', 3600)
+            is_fresh = saved_at is not None and (datetime.now().timestamp() - saved_at) <= max_age
+            self.monitor.set_baseline(packages, companies, fresh=is_fresh)
+            self.logger.info(
+                f"Wyrenderowano migawkę: {len(packages)} paczek "
+                f"({'aktualna' if is_fresh else 'nieaktualna'})"
+            )
+
+        except Exception as e:
+            self.logger.error(f"Błąd podczas wczytywania migawki: {e}")
+
     def _center_window(self):
         """Centruje okno na ekranie"""
         self.logger.debug("=== Rozpoczęcie centrowania okna ===")
@@ -156,65 +245,129 @@ class MainWindow:
             self.logger.error(f"Błąd podczas centrowania okna: {e}", exc_info=True)
             raise
 
-    def _process_async_queue(self):
-        """Przetwarza zadania asynchroniczne w kolejce"""
-        try:
-            while True:
-                try:
-                    coro = self.async_queue.get_nowait()
-                    future = asyncio.run_coroutine_threadsafe(coro, self.loop)
-                    future.add_done_callback(self._handle_async_result)
-                except asyncio.QueueEmpty:
-                    break
-                except Exception as e:
-                    self.logger.error(f"Błąd przetwarzania kolejki async: {e}")
-
-            if self.is_running:
-                self.root.after(100, self._process_async_queue)
-
-        except Exception as e:
-            self.logger.error(f"Błąd w _process_async_queue: {e}")
-            if self.is_running:
-                self.root.after(100, self._process_async_queue)
-
-    def _handle_async_result(self, future):
-        """Obsługuje wyniki zadań asynchronicznych"""
-        try:
-            result = future.result()
-            if result is not None:
-                self.logger.debug(f"Zadanie asynchroniczne zakończone z wynikiem: {result}")
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            self.logger.error(f"Błąd w zadaniu asynchronicznym: {e}")
-
     def _schedule_package_check(self):
         """Planuje sprawdzanie paczek"""
         if self.is_running:
-            self.async_queue.put_nowait(self._check_packages())
-            interval = self.options_frame.get_values().get('refresh_interval', 30)
-            self.root.after(interval * 1000, self._schedule_package_check)
+            if self.monitor.check_flight.busy:
+                self.logger.debug("Poprzednie sprawdzanie jeszcze trwa, pomijam cykl")
+            else:
+                self._request_check()
+            try:
+                base_interval = self.options_frame.get_values().get('refresh_interval', 30)
+            except ValueError:
+                # Wartość w trakcie wpisywania — harmonogram nie może się przez to zatrzymać
+                base_interval = self.settings.config.get('refresh_interval', 30)
+            interval = self.monitor.scheduler.next_interval(base_interval)
+            self.root.after(int(interval * 1000), self._schedule_package_check)
 
     def _on_location_updated(self, _):
         """Obsługa zmiany lokalizacji"""
         self.logger.info("Lokalizacja została zaktualizowana, odświeżam listę paczek...")
-        self.async_queue.put_nowait(self._check_packages())
+        self.current_filters = None
+        self._request_check()
+
+    def _read_filters(self) -> dict:
+        """Czyta filtry z widgetów Tk; rzuca ValueError dla niepoprawnych wartości"""
+        return {**self.location_filters.get_filters(), **self.options_frame.get_values()}
+
+    def _on_filters_edited(self):
+        """Planuje ponowne filtrowanie — seria zmian podczas pisania daje jedno przeliczenie"""
+        if self._refilter_after_id is not None:
+            self.root.after_cancel(self._refilter_after_id)
+        self._refilter_after_id = self.root.after(self.FILTER_DEBOUNCE_MS, self._refilter)
+
+    def _refilter(self):
+        """Filtruje lokalnie surowe wyniki ostatniego sprawdzenia"""
+        self._refilter_after_id = None
+        try:
+            filters = self._read_filters()
+        except ValueError:
+            # Wartość w trakcie wpisywania (np. pusta cena) — zostaw poprzednie filtry
+            return
+
+        self._set_filters(filters)
+        self.packages = self.compiled_filter.apply(self.raw_items)
+        self.packages_list.update_packages(self.packages)
+        self.logger.debug("Ponowne filtrowanie: %d z %d paczek", len(self.packages), len(self.raw_items))
+
+    def _set_filters(self, filters: dict):
+        """
+        Ustawia bieżące filtry okna i przekazuje je monitorowi — powiadomienia
+        i szybka ścieżka ulubionych korzystają z tych samych skompilowanych filtrów
+        """
+        self.current_filters = filters
+        self.compiled_filter = CompiledFilter.from_dict(filters, self.settings.config.get('blacklist', []))
+        self.bridge.loop_thread.call_soon(self.monitor.compile_filters, filters)
 
     def _on_package_select(self, _):
         """Obsługa wyboru paczki z listy"""
         self.logger.debug("=== Obsługa wyboru paczki ===")
 
         try:
-            selection = self.packages_list.treeview.selection()
-            if selection:
-                item_id = selection[0]
-                self.selected_package = next(
-                    (p for p in self.packages if str(id(p)) == item_id),
-                    None
-                )
+            package = self.packages_list.selected_item()
+            if package is None:
+                # Zaznaczony wiersz zniknął z listy
+                self.selected_package = None
+                self.details_frame.clear()
+                return
+            if self.selected_package is not None and self.selected_package.item_id == package.item_id:
+                # Ta sama paczka z nowym stanem — odśwież tylko podstawowe dane
+                self.selected_package = package
+                self.details_frame.set_section(package.item_id, 'info', TGTGApiClient.format_item_info(package))
+                return
+
+            self.selected_package = package
+            self.details_frame.show_item(package)
+            self._load_item_detail(package)
+            self._load_store_history(package)
         except Exception as e:
             self.logger.error(f"Błąd podczas obsługi wyboru paczki: {e}")
 
+    def _load_item_detail(self, package: ItemRecord):
+        """
+        Pokazuje szczegóły paczki z pamięci podręcznej. Brakujące lub przeterminowane
+        pola są pobierane w tle — panel uzupełni _on_item_detail.
+        """
+        item_id = package.item_id
+        details = self.api_client.details
+        fields, fresh = details.get(item_id)
+        if fields:
+            self.details_frame.set_section(item_id, 'detail', self.details_frame.format_detail(fields))
+        elif not fresh and not details.is_pending(item_id):
+            # Niedawna próba pobrania się nie powiodła — nie ponawiamy od razu
+            self.details_frame.set_section(item_id, 'detail', "Szczegóły niedostępne\n")
+
+    def _on_item_detail_threadsafe(self, item_id: str, fields: Optional[Dict[str, Any]]):
+        """Odbiera pobrane szczegóły w wątku pętli asyncio i przekazuje je do wątku Tk"""
+        self.bridge.call_in_tk(self._on_item_detail, item_id, fields)
+
+    def _on_item_detail(self, item_id: str, fields: Optional[Dict[str, Any]]):
+        """Uzupełnia panel szczegółów, jeśli dotyczą zaznaczonej paczki"""
+        text = self.details_frame.format_detail(fields) if fields is not None else "Szczegóły niedostępne\n"
+        self.details_frame.set_section(item_id, 'detail', text)
+
+    def _load_store_history(self, package: ItemRecord):
+        """Czyta historię sklepu w wątku roboczym, by zapytanie do bazy nie blokowało GUI"""
+        item_id = package.item_id
+        if not self.history:
+            self.details_frame.set_section(item_id, 'history', "")
+            return
+
+        days = self.STORE_HISTORY_DAYS
+        query = asyncio.to_thread(
+            self.history.query,
+            store_id=package.store_id,
+            since=time.time() - days * 86400,
+            limit=5000
+        )
+        self.bridge.submit(
+            query,
+            on_done=lambda rows: self.details_frame.set_section(
+                item_id, 'history', self.details_frame.format_history(rows, days)
+            ),
+            on_error=lambda e: self.logger.warning(f"Błąd podczas odczytu historii sklepu: {e}")
+        )
+
     def _save_settings(self):
         """Zapisuje ustawienia"""
         self.logger.info("=== Rozpoczęcie zapisywania ustawień ===")
@@ -224,14 +377,21 @@ class MainWindow:
             options_values = self.options_frame.get_values()
             filter_values = self.location_filters.get_filters()
 
-            # Połącz wartości
-            values = {**options_values, **filter_values}
+            # Lokalizacja i filtry trafiają do swoich sekcji — tryb bez GUI czyta je z config.json
+            location = self.settings.get_location()
+            location.street = self.location_filters.street_var.get().strip() or location.street
+            location.city = self.location_filters.city_var.get().strip() or location.city
+            location.coordinates = filter_values['coordinates'] or location.coordinates
+            location.radius = filter_values['radius']
+
+            filters = self.settings.get_filters()
+            filters.keywords = filter_values['keywords']
+            filters.company = filter_values['company']
 
-            # Aktualizuj konfigurację
-            self.settings.config.update(values)
+            values = {**options_values, 'location': location.to_dict(), 'filters': filters.to_dict()}
 
-            # Zapisz do pliku
-            self.settings.save_config(self.settings.config)
+            # Aktualizuj konfigurację — zapis do pliku odbywa się z opóźnieniem
+            self.settings.update(values)
 
             messagebox.showinfo("Sukces", "Ustawienia zostały zapisane")
             self.logger.info("Ustawienia zostały pomyślnie zapisane")
@@ -243,108 +403,69 @@ class MainWindow:
             self.logger.error(f"Błąd podczas zapisywania ustawień: {e}")
             messagebox.showerror("Błąd", f"Wystąpił błąd: {str(e)}")
 
-    def _send_notification(self, package: Dict[str, Any]):
-        """Wysyła powiadomienie o nowej paczce"""
-        try:
-            store = package.get('store', {})
-            price = package.get('item', {}).get('price_including_taxes', {})
-            price_value = float(price.get('minor_units', 0)) / 100
-
-            store_name = store.get('store_name', 'Nieznany sklep')
-            self.logger.debug(f"Przygotowanie powiadomienia dla: {store_name}")
-
-            notification.notify(
-                title='Nowa paczka TGTG!',
-                message=f"{store_name}\nCena: {price_value:.2f} PLN",
-                app_name='TGTG Monitor',
-                timeout=10
-            )
-
-        except Exception as e:
-            self.logger.error(f"Błąd podczas wysyłania powiadomienia: {e}")
-
-    async def _check_packages(self):
-        """Sprawdza dostępne paczki"""
-        self.logger.debug("=== Rozpoczęcie sprawdzania paczek ===")
-
+    def _request_check(self):
+        """Zleca sprawdzenie paczek do pętli w tle (wywoływane w wątku Tk)"""
+        if not self.monitoring_started:
+            # Przed zalogowaniem — pierwsze sprawdzenie zleci start_monitoring
+            return
         try:
-            # Sprawdź, czy mamy lokalizację
-            filters = self.location_filters.get_filters()
+            # Widgety Tk można czytać tylko w wątku Tk — zbierz parametry przed zleceniem;
+            # filtry są czytane ponownie tylko po ich edycji
+            if self.current_filters is None:
+                self._set_filters(self._read_filters())
+            filters = self.current_filters
             if not filters['coordinates']:
                 self.logger.warning("Brak ustawionej lokalizacji!")
                 return
 
-            lat, lon = filters['coordinates']
-            radius = filters['radius']
-
-            # Pobierz paczki
-            items = await self.api_client.get_items(
-                lat=lat,
-                lng=lon,
-                radius=radius
-            )
+            # Wynik przychodzi zdarzeniem CHECK_COMPLETED; błędy są logowane przez monitor
+            self.bridge.submit(self.monitor.check(filters), on_error=lambda e: None)
 
+        except Exception as e:
+            self.logger.error(f"Błąd podczas zlecania sprawdzania paczek: {e}")
+
+    def _on_monitor_event_threadsafe(self, event: MonitorEvent, payload: Any):
+        """Obsługuje zdarzenie monitora w pętli w tle; zmiany GUI przekazuje do wątku Tk"""
+        if event is MonitorEvent.NEW_PACKAGE:
+            # Powiadomienia tylko trafiają do kolejek kanałów — nie blokują pętli ani Tk
+            self.notifier.notify_package(payload)
+        elif event is MonitorEvent.CHECK_COMPLETED:
+            self.bridge.call_in_tk(self._apply_check_result, payload)
+
+    def _apply_check_result(self, result: CheckResult):
+        """Nakłada wynik sprawdzenia na GUI"""
+        try:
             # Aktualizuj listę firm
-            companies = {item['store']['store_name'] for item in items}
-            self.location_filters.update_companies(list(companies))
-
-            # Zastosuj filtry
-            filtered_items = self._apply_filters(items, filters)
-
-            # Sprawdź nowe paczki
-            if self.packages:  # Jeśli nie jest to pierwsze sprawdzenie
-                self._check_new_packages(filtered_items)
-
-            # Aktualizuj listę i GUI
-            self.packages = filtered_items
-            self.packages_list.update_packages(filtered_items)
+            self.companies = result.companies
+            self.location_filters.update_companies(self.companies)
+
+            # Aktualizuj listę i GUI — filtry mogły zmienić się w trakcie sprawdzenia,
+            # więc wynik filtrujemy bieżącymi zamiast nadpisywać listę przefiltrowaną lokalnie
+            self.raw_items = result.items
+            if self.compiled_filter is not None:
+                self.packages = self.compiled_filter.apply(result.items)
+            else:
+                self.packages = result.filtered_items
+            self.packages_list.update_packages(self.packages)
+            self._persist_check_result(self.packages, self.companies)
 
             # Aktualizuj czas ostatniego sprawdzenia
-            self.last_check_time = datetime.now()
+            self.last_check_time = self.monitor.last_check_time
 
         except Exception as e:
-            self.logger.error(f"Błąd podczas sprawdzania paczek: {e}")
-
-    def _apply_filters(self, items: list, filters: dict) -> list:
-        """Aplikuje filtry do listy paczek"""
-        filtered_items = items
-
-        # Filtr słów kluczowych
-        if filters['keywords']:
-            keywords = filters['keywords'].lower().split()
-            filtered_items = [
-                item for item in filtered_items
-                if any(keyword in item['store']['store_name'].lower() for keyword in keywords)
-            ]
-
-        # Filtr firmy
-        if filters['company']:
-            filtered_items = [
-                item for item in filtered_items
-                if item['store']['store_name'] == filters['company']
-            ]
-
-        # Filtr ceny
-        values = self.options_frame.get_values()
-        min_price = values['min_price']
-        max_price = values['max_price']
-
-        filtered_items = [
-            item for item in filtered_items
-            if min_price <= (float(item['item']['price_including_taxes']['minor_units']) / 100) <= max_price
-        ]
-
-        return filtered_items
-
-    def _check_new_packages(self, new_items: list):
-        """Sprawdza i powiadamia o nowych paczkach"""
-        old_ids = {p['item']['item_id'] for p in self.packages}
-
-        for package in new_items:
-            if package['item']['item_id'] not in old_ids:
-                store_name = package['store']['store_name']
-                self.logger.info(f"Znaleziono nową paczkę: {store_name}")
-                self._send_notification(package)
+            self.logger.error(f"Błąd podczas aktualizacji listy paczek: {e}")
+
+    def _persist_check_result(self, packages: List[ItemRecord], companies: List[str]):
+        """Zapisuje migawkę i katalog sklepów w wątku roboczym, by zapis na dysk nie blokował GUI"""
+        def persist():
+            self.snapshot.save_throttled(packages, companies)
+            # Zapis tylko po pojawieniu się nowych lub zmienionych sklepów
+            self.api_client.stores.save()
+
+        self.bridge.submit(
+            asyncio.to_thread(persist),
+            on_error=lambda e: self.logger.warning(f"Błąd podczas zapisu migawki: {e}")
+        )
 
     def _on_closing(self):
         """Obsługa zamknięcia okna"""
@@ -354,13 +475,21 @@ class MainWindow:
             self.is_running = False
 
             if messagebox.askokcancel("Zamykanie", "Czy na pewno chcesz zamknąć aplikację?"):
-                # Anuluj wszystkie oczekujące taski
-                for task in asyncio.all_tasks(self.loop):
-                    task.cancel()
-
-                # Zatrzymaj i zamknij event loop
-                self.loop.stop()
-                self.loop.close()
+                self.monitor.scheduler.save()
+                self.snapshot.save(self.packages, self.companies)
+                self.settings.flush()
+                if self.history:
+                    self.history.close()
+
+                # Zamknij sesje w ich pętli; pętlę zatrzymuje TGTGDetector
+                if self._favorites_future is not None:
+                    self._favorites_future.cancel()
+                self.bridge.stop()
+                for closer in (self.geocoder.close, self.notifier.close):
+                    try:
+                        self.bridge.loop_thread.run_sync(closer(), timeout=3)
+                    except Exception as e:
+                        self.logger.warning(f"Nie udało się zamknąć zasobu: {e}")
 
                 self.root.quit()
                 self.logger.info("Aplikacja została zamknięta")
@@ -379,8 +508,8 @@ class MainWindow:
                 self.logger.debug("Okno nie jest widoczne, pokazuję...")
                 self.root.deiconify()
 
-            # Uruchom przetwarzanie kolejki async
-            self._process_async_queue()
+            # Uruchom odbieranie wyników z pętli w tle
+            self.bridge.start()
 
             self.logger.debug("Uruchamiam główną pętlę...")
             self.root.mainloop()
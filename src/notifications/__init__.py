@@ -0,0 +1,19 @@
+from .channels import (
+    Notification, NotificationChannel, ConsoleChannel, DesktopChannel,
+    WebhookChannel, FileChannel, SocketChannel
+)
+from .coalescer import NotificationCoalescer
+from .dispatcher import NotificationDispatcher, ChannelWorker
+
+__all__ = [
+    'Notification',
+    'NotificationChannel',
+    'ConsoleChannel',
+    'DesktopChannel',
+    'WebhookChannel',
+    'FileChannel',
+    'SocketChannel',
+    'NotificationCoalescer',
+    'NotificationDispatcher',
+    'ChannelWorker'
+]
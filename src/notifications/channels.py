@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from ..api import ItemRecord
+from ..utils import NiceLogger
+
+
+@dataclass
+class Notification:
+    """Pojedyncze powiadomienie przekazywane do kanałów"""
+    title: str
+    message: str
+    package: Optional[ItemRecord] = None
+    # Paczki zebrane w jednym powiadomieniu zbiorczym
+    packages: List[ItemRecord] = field(default_factory=list)
+    # Powiadomienia priorytetowe (ulubione sklepy) omijają kolejkę i limit częstotliwości
+    priority: bool = False
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "title": self.title,
+            "message": self.message,
+            "created_at": self.created_at,
+        }
+        if self.package:
+            data["item_id"] = self.package.item_id
+            data["store_id"] = self.package.store_id
+            data["store_name"] = self.package.store_name
+        if self.packages:
+            data["items"] = [
+                {
+                    "item_id": package.item_id,
+                    "store_id": package.store_id,
+                    "store_name": package.store_name,
+                }
+                for package in self.packages
+            ]
+        data["priority"] = self.priority
+        return data
+
+
+class NotificationChannel:
+    """
+    Bazowa klasa kanału powiadomień.
+
+    Kanał tylko dostarcza pojedyncze powiadomienie — kolejkowaniem, ponawianiem
+    i limitem częstotliwości zajmuje się dispatcher.
+    """
+
+    name = "base"
+    # Minimalny odstęp między powiadomieniami w sekundach (0 — bez limitu)
+    default_min_interval = 0.0
+
+    def __init__(self):
+        self.logger = NiceLogger(f"Notify_{self.name}").get_logger()
+
+    async def send(self, notification: Notification):
+        raise NotImplementedError
+
+    async def close(self):
+        """Zwalnia zasoby kanału"""
+
+
+class ConsoleChannel(NotificationChannel):
+    """Powiadomienia w logach aplikacji"""
+
+    name = "console"
+
+    async def send(self, notification: Notification):
+        self.logger.info(f"{notification.title}\n{notification.message}")
+
+
+class DesktopChannel(NotificationChannel):
+    """Powiadomienia systemowe pulpitu (plyer) — wywoływane w wątku roboczym"""
+
+    name = "desktop"
+    default_min_interval = 2.0
+
+    def __init__(self):
+        super().__init__()
+        # plyer jest importowany dopiero tutaj — tryb bez GUI może go nie mieć
+        from plyer import notification
+        self._notification = notification
+
+    async def send(self, notification: Notification):
+        await asyncio.to_thread(
+            self._notification.notify,
+            title=notification.title,
+            message=notification.message,
+            app_name='TGTG Monitor',
+            timeout=10
+        )
+
+
+class WebhookChannel(NotificationChannel):
+    """Powiadomienia wysyłane jako JSON (POST) na zadany adres"""
+
+    name = "webhook"
+    default_min_interval = 1.0
+
+    def __init__(self, url: str):
+        super().__init__()
+        if not url:
+            raise ValueError("Brak adresu webhooka (notification_webhook_url)")
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def send(self, notification: Notification):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+        async with self._session.post(self.url, json=notification.to_dict()) as response:
+            if response.status >= 400:
+                raise RuntimeError(f"Webhook zwrócił status {response.status}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class FileChannel(NotificationChannel):
+    """Powiadomienia dopisywane do pliku jako JSON Lines"""
+
+    name = "file"
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _append(self, line: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    async def send(self, notification: Notification):
+        line = json.dumps(notification.to_dict(), ensure_ascii=False)
+        await asyncio.to_thread(self._append, line)
+
+
+class SocketChannel(NotificationChannel):
+    """Powiadomienia wysyłane jako linie JSON na lokalne gniazdo TCP (host:port)"""
+
+    name = "socket"
+
+    def __init__(self, address: str):
+        super().__init__()
+        host, _, port = (address or '').rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f"Nieprawidłowy adres gniazda (notification_socket): '{address}'")
+        self.host = host
+        self.port = int(port)
+
+    async def send(self, notification: Notification):
+        _, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write((json.dumps(notification.to_dict(), ensure_ascii=False) + '\n').encode('utf-8'))
+            await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
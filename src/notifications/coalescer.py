@@ -0,0 +1,90 @@
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from .channels import Notification
+from ..api import ItemRecord
+from ..config import TGTGSettings
+from ..utils import NiceLogger
+
+
+class NotificationCoalescer:
+    """
+    Łączy serie nowych paczek w jedno powiadomienie zbiorcze.
+
+    Paczki zebrane w oknie notification_digest_window sekund są grupowane po sklepie
+    lub obszarze (miasto z adresu) i wysyłane jako jeden digest. Paczki ze sklepów
+    z favorite_stores omijają okno i trafiają od razu na priorytetową ścieżkę.
+    Musi być używany w wątku pętli asyncio.
+    """
+
+    MAX_DIGEST_LINES = 8
+
+    def __init__(self, emit: Callable[[Notification], None], settings: Optional[TGTGSettings] = None):
+        self.logger = NiceLogger("NotificationCoalescer").get_logger()
+        self.settings = settings or TGTGSettings.instance()
+        self._emit = emit
+        self._pending: List[ItemRecord] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def _single(package: ItemRecord, priority: bool = False) -> Notification:
+        return Notification(
+            title='Ulubiony sklep — nowa paczka TGTG!' if priority else 'Nowa paczka TGTG!',
+            message=f"{package.store_name or 'Nieznany sklep'}\nCena: {package.price_value:.2f} PLN",
+            package=package,
+            priority=priority
+        )
+
+    def _group_key(self, package: ItemRecord) -> str:
+        if self.settings.config.get('notification_digest_group', 'store') == 'area':
+            return package.city or 'Inne'
+        return package.store_name or 'Nieznany sklep'
+
+    def add(self, package: ItemRecord):
+        """Przyjmuje nową paczkę — ulubione wysyła od razu, resztę zbiera w oknie"""
+        if package.store.favorite:
+            self.logger.debug("Paczka z ulubionego sklepu — ścieżka priorytetowa")
+            self._emit(self._single(package, priority=True))
+            return
+
+        window = float(self.settings.config.get('notification_digest_window', 5))
+        if window <= 0:
+            self._emit(self._single(package))
+            return
+
+        self._pending.append(package)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(window, self.flush)
+
+    def flush(self):
+        """Wysyła zebrane paczki jako jedno powiadomienie"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        packages, self._pending = self._pending, []
+        if not packages:
+            return
+        if len(packages) == 1:
+            self._emit(self._single(packages[0]))
+            return
+
+        groups: Dict[str, List[ItemRecord]] = {}
+        for package in packages:
+            groups.setdefault(self._group_key(package), []).append(package)
+
+        # Największe grupy na górze
+        ordered = sorted(groups.items(), key=lambda group: len(group[1]), reverse=True)
+        lines = [
+            f"{name}: {len(items)} × od {min(p.price_value for p in items):.2f} PLN"
+            for name, items in ordered[:self.MAX_DIGEST_LINES]
+        ]
+        if len(ordered) > self.MAX_DIGEST_LINES:
+            lines.append(f"…i {len(ordered) - self.MAX_DIGEST_LINES} więcej")
+
+        self.logger.debug("Digest: %d paczek w %d grupach", len(packages), len(groups))
+        self._emit(Notification(
+            title=f"Nowe paczki TGTG: {len(packages)}",
+            message="\n".join(lines),
+            packages=packages
+        ))
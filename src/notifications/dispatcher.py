@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+
+from .channels import (
+    Notification, NotificationChannel, ConsoleChannel, DesktopChannel,
+    WebhookChannel, FileChannel, SocketChannel
+)
+from .coalescer import NotificationCoalescer
+from ..api import ItemRecord
+from ..config import TGTGSettings
+from ..utils import NiceLogger
+
+
+class ChannelWorker:
+    """
+    Kolejki i worker jednego kanału.
+
+    Powiadomienia czekają w ograniczonych kolejkach — gdy kolejka jest pełna,
+    najstarsze jest porzucane, więc zgłaszający nigdy nie czeka. Worker wysyła je
+    po kolei, z ponawianiem (wykładnicze opóźnienie) i minimalnym odstępem między
+    wysyłkami. Powiadomienia priorytetowe mają osobną kolejkę, obsługiwaną przed
+    zwykłą i bez czekania na limit częstotliwości.
+    """
+
+    SEND_TIMEOUT = 15.0
+
+    def __init__(self, channel: NotificationChannel, queue_size: int, retries: int, min_interval: float):
+        self.logger = NiceLogger(f"NotifyWorker_{channel.name}").get_logger()
+        self.channel = channel
+        self.retries = max(0, int(retries))
+        self.min_interval = max(0.0, float(min_interval))
+        size = max(1, int(queue_size))
+        self._normal: Deque[Notification] = deque(maxlen=size)
+        self._priority: Deque[Notification] = deque(maxlen=size)
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._last_sent = 0.0
+        self._task = asyncio.ensure_future(self._run())
+
+    @property
+    def pending(self) -> int:
+        return len(self._normal) + len(self._priority)
+
+    def put(self, notification: Notification):
+        """Dodaje powiadomienie do kolejki bez czekania"""
+        queue = self._priority if notification.priority else self._normal
+        if len(queue) == queue.maxlen:
+            self.logger.warning(f"Kolejka kanału {self.channel.name} pełna — pominięto: {queue[0].title}")
+        queue.append(notification)
+        self._idle.clear()
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if self._priority:
+                notification = self._priority.popleft()
+            else:
+                wait = self.min_interval - (time.monotonic() - self._last_sent)
+                if wait > 0:
+                    # Czekamy na limit, ale powiadomienie priorytetowe przerywa oczekiwanie
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                notification = self._normal.popleft()
+
+            await self._deliver(notification)
+            self._last_sent = time.monotonic()
+
+    async def _deliver(self, notification: Notification):
+        for attempt in range(self.retries + 1):
+            try:
+                await asyncio.wait_for(self.channel.send(notification), self.SEND_TIMEOUT)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    self.logger.error(f"Nie udało się wysłać powiadomienia kanałem {self.channel.name}: {e}")
+                    return
+                delay = 2 ** attempt
+                self.logger.debug(
+                    "Błąd kanału %s (próba %d): %s — ponowienie za %ds",
+                    self.channel.name, attempt + 1, e, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def close(self, timeout: float = 2.0):
+        """Próbuje dosłać zaległe powiadomienia, po czym zatrzymuje workera"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Porzucono {self.pending} niewysłanych powiadomień ({self.channel.name})")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.channel.close()
+
+
+class NotificationDispatcher:
+    """
+    Rozsyła powiadomienia do kanałów wybranych w notification_methods.
+
+    notify() jedynie wrzuca powiadomienie do kolejek kanałów, więc nawet seria
+    kilkudziesięciu nowych paczek nie blokuje pętli sprawdzania ani wątku Tk.
+    Musi być wywoływane w wątku pętli asyncio, w której działają workery.
+    Zmiana notification_methods w ustawieniach przebudowuje kanały przy kolejnym powiadomieniu.
+    Kanały z exclude_methods są pomijane (np. pulpit w trybie bez GUI bez ekranu).
+    """
+
+    CHANNEL_SETTINGS = {
+        'notification_methods', 'notification_webhook_url', 'notification_file',
+        'notification_socket', 'notification_queue_size', 'notification_retries',
+        'notification_min_intervals'
+    }
+
+    def __init__(self, settings: Optional[TGTGSettings] = None, exclude_methods: Iterable[str] = ()):
+        self.logger = NiceLogger("NotificationDispatcher").get_logger()
+        self.settings = settings or TGTGSettings.instance()
+        self.exclude_methods = set(exclude_methods)
+        self._workers: Dict[str, ChannelWorker] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._needs_rebuild = True
+        self._retiring: Set[asyncio.Future] = set()
+        self.coalescer = NotificationCoalescer(self.notify, self.settings)
+        self.settings.subscribe(self._on_settings_changed)
+
+    def _on_settings_changed(self, changed: Set[str]):
+        if changed & self.CHANNEL_SETTINGS:
+            self._needs_rebuild = True
+
+    def _create_channel(self, method: str) -> NotificationChannel:
+        config = self.settings.config
+        if method == ConsoleChannel.name:
+            return ConsoleChannel()
+        if method == DesktopChannel.name:
+            return DesktopChannel()
+        if method == WebhookChannel.name:
+            return WebhookChannel(config.get('notification_webhook_url', ''))
+        if method == FileChannel.name:
+            path = config.get('notification_file') or (self.settings.config_dir / "notifications.jsonl")
+            return FileChannel(path)
+        if method == SocketChannel.name:
+            return SocketChannel(config.get('notification_socket', ''))
+        raise ValueError(f"Nieznany kanał powiadomień: '{method}'")
+
+    def _ensure_workers(self):
+        """Tworzy workery kanałów w bieżącej pętli (leniwie i po zmianie ustawień)"""
+        loop = asyncio.get_running_loop()
+        if not self._needs_rebuild and self._loop is loop:
+            return
+
+        # Stare workery dosyłają swoje kolejki w tle
+        for worker in self._workers.values():
+            task = asyncio.ensure_future(worker.close())
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+        self._workers = {}
+
+        config = self.settings.config
+        min_intervals = config.get('notification_min_intervals', {})
+        for method in dict.fromkeys(config.get('notification_methods', [])):
+            if method in self.exclude_methods:
+                self.logger.info(f"Pomijam kanał powiadomień '{method}' — niedostępny w tym trybie")
+                continue
+            try:
+                channel = self._create_channel(method)
+            except Exception as e:
+                self.logger.error(f"Nie można utworzyć kanału powiadomień '{method}': {e}")
+                continue
+
+            self._workers[method] = ChannelWorker(
+                channel,
+                queue_size=config.get('notification_queue_size', 100),
+                retries=config.get('notification_retries', 3),
+                min_interval=min_intervals.get(method, channel.default_min_interval)
+            )
+
+        self._loop = loop
+        self._needs_rebuild = False
+        self.logger.debug("Aktywne kanały powiadomień: %s", list(self._workers))
+
+    def notify(self, notification: Notification):
+        """Kolejkuje powiadomienie do wszystkich aktywnych kanałów (nie blokuje)"""
+        self._ensure_workers()
+        for worker in self._workers.values():
+            worker.put(notification)
+
+    def notify_package(self, package: ItemRecord):
+        """Przekazuje nową paczkę do łączenia w powiadomienia zbiorcze"""
+        self.logger.debug(f"Nowa paczka do powiadomienia: {package.store_name}")
+        self.coalescer.add(package)
+
+    async def close(self, timeout: float = 2.0):
+        """Dosyła zaległe powiadomienia (do timeout sekund) i zamyka kanały"""
+        self.settings.unsubscribe(self._on_settings_changed)
+        self.coalescer.flush()
+        workers = list(self._workers.values())
+        self._workers = {}
+        await asyncio.gather(
+            *(worker.close(timeout) for worker in workers),
+            *self._retiring,
+            return_exceptions=True
+        )
@@ -0,0 +1,4 @@
+from .history import HistoryStore
+from .snapshot import PackageSnapshot
+
+__all__ = ['HistoryStore', 'PackageSnapshot']
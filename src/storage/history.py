@@ -0,0 +1,197 @@
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from ..api import ItemRecord
+from ..utils import NiceLogger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    id INTEGER PRIMARY KEY,
+    store_id TEXT NOT NULL UNIQUE,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    ts INTEGER NOT NULL,
+    store INTEGER NOT NULL REFERENCES stores(id),
+    item_id TEXT NOT NULL,
+    available INTEGER NOT NULL,
+    price INTEGER,
+    pickup_start INTEGER,
+    pickup_end INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_store_ts ON snapshots(store, ts);
+CREATE INDEX IF NOT EXISTS ix_snapshots_item_ts ON snapshots(item_id, ts);
+CREATE INDEX IF NOT EXISTS ix_snapshots_ts ON snapshots(ts);
+"""
+
+# Wiersz kolejki zapisu: (ts, store_id, store_name, item_id, available, price, pickup_start, pickup_end)
+SnapshotRow = Tuple[int, str, str, str, int, Optional[int], Optional[int], Optional[int]]
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[int]:
+    """Zamienia granicę okna odbioru na znacznik unix"""
+    return int(value.timestamp()) if value else None
+
+
+class HistoryStore:
+    """
+    Historia wszystkich zaobserwowanych stanów paczek w lokalnej bazie SQLite.
+
+    Zapis odbywa się w osobnym wątku: record_snapshot tylko wrzuca wiersze do kolejki,
+    a wątek zapisujący łączy je w paczki i wstawia w jednej transakcji (executemany).
+    Baza działa w trybie WAL, więc zapytania mogą czytać równolegle z zapisem.
+    Sklepy są przechowywane raz w tabeli stores, a migawki odwołują się do nich po id.
+    """
+
+    BATCH_SIZE = 500
+    BATCH_WAIT = 0.5
+
+    def __init__(self, db_path: Path):
+        self.logger = NiceLogger("HistoryStore").get_logger()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger.debug(f"Baza historii: {self.db_path}")
+
+        self._queue: "queue.Queue[Optional[List[SnapshotRow]]]" = queue.Queue()
+        self._store_ids: Dict[str, int] = {}
+
+        # Połączenie do odczytu — używane z dowolnego wątku pod blokadą
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record_snapshot(self, items: Iterable[ItemRecord], observed_at: Optional[float] = None):
+        """Kolejkuje zapis stanu paczek z jednego sprawdzenia (nie blokuje)"""
+        ts = int(observed_at or time.time())
+        rows: List[SnapshotRow] = [
+            (
+                ts,
+                item.store_id,
+                item.store_name,
+                item.item_id,
+                item.items_available,
+                item.price,
+                _timestamp(item.pickup_start),
+                _timestamp(item.pickup_end)
+            )
+            for item in items
+        ]
+
+        if rows:
+            self._queue.put(rows)
+
+    def _writer_loop(self):
+        """Wątek zapisujący — łączy kolejne migawki w transakcje"""
+        conn = self._connect()
+        running = True
+
+        while running:
+            batch = self._queue.get()
+            if batch is None:
+                break
+
+            rows = list(batch)
+            deadline = time.monotonic() + self.BATCH_WAIT
+            while len(rows) < self.BATCH_SIZE:
+                try:
+                    more = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if more is None:
+                    running = False
+                    break
+                rows.extend(more)
+
+            try:
+                self._write_rows(conn, rows)
+            except Exception as e:
+                self.logger.error(f"Błąd podczas zapisu historii: {e}")
+
+        conn.close()
+
+    def _intern_store(self, conn: sqlite3.Connection, store_id: str, name: str, added: Dict[str, int]) -> int:
+        """
+        Zwraca id wiersza sklepu, dodając go w razie potrzeby. Nowe id trafiają do added —
+        do pamięci podręcznej są przenoszone dopiero po zatwierdzeniu transakcji.
+        """
+        rowid = self._store_ids.get(store_id) or added.get(store_id)
+        if rowid is None:
+            conn.execute("INSERT OR IGNORE INTO stores (store_id, name) VALUES (?, ?)", (store_id, name))
+            rowid = conn.execute("SELECT id FROM stores WHERE store_id = ?", (store_id,)).fetchone()[0]
+            added[store_id] = rowid
+        return rowid
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[SnapshotRow]):
+        added: Dict[str, int] = {}
+        with conn:
+            conn.executemany(
+                "INSERT INTO snapshots (ts, store, item_id, available, price, pickup_start, pickup_end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (ts, self._intern_store(conn, store_id, name, added), item_id, available, price, start, end)
+                    for ts, store_id, name, item_id, available, price, start, end in rows
+                ]
+            )
+        # Po wycofaniu transakcji wiersze sklepów nie istnieją — nie zapamiętujemy ich id
+        self._store_ids.update(added)
+
+    def query(
+            self,
+            store_id: Optional[str] = None,
+            item_id: Optional[str] = None,
+            since: Optional[float] = None,
+            until: Optional[float] = None,
+            limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """Zwraca migawki pasujące do filtrów, od najnowszych"""
+        conditions = []
+        params: List[Any] = []
+
+        if store_id is not None:
+            conditions.append("st.store_id = ?")
+            params.append(str(store_id))
+        if item_id is not None:
+            conditions.append("s.item_id = ?")
+            params.append(str(item_id))
+        if since is not None:
+            conditions.append("s.ts >= ?")
+            params.append(int(since))
+        if until is not None:
+            conditions.append("s.ts <= ?")
+            params.append(int(until))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            "SELECT s.ts, st.store_id, st.name, s.item_id, s.available, s.price, s.pickup_start, s.pickup_end "
+            "FROM snapshots s JOIN stores st ON st.id = s.store "
+            f"{where} ORDER BY s.ts DESC LIMIT ?"
+        )
+        params.append(int(limit))
+
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+
+        columns = ('ts', 'store_id', 'store_name', 'item_id', 'available', 'price', 'pickup_start', 'pickup_end')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self):
+        """Zapisuje oczekujące migawki i zamyka bazę"""
+        self.logger.debug("Zamykanie bazy historii...")
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        with self._read_lock:
+            self._read_conn.close()
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from ..api import ItemRecord, Store, StoreCatalogue
+from ..utils import NiceLogger
+
+# Wersja 1 zapisywała paczki w zagnieżdżonym formacie API, wersja 2 — płasko, z danymi sklepu
+# w każdej paczce; wersja 3 zapisuje sklepy osobno, a paczki odwołują się do nich po store_id
+SNAPSHOT_VERSION = 3
+
+
+class PackageSnapshot:
+    """
+    Zwarta migawka ostatniej listy paczek i listy firm zapisywana na dysku.
+
+    Pozwala wyrenderować listę natychmiast po starcie, zanim wykonane zostanie
+    jakiekolwiek zapytanie sieciowe. Zapis jest atomowy (plik tymczasowy + rename)
+    i może odbywać się w wątku roboczym.
+    """
+
+    def __init__(self, path: Path):
+        self.logger = NiceLogger("PackageSnapshot").get_logger()
+        self.path = Path(path)
+        self.last_save = 0.0
+        self._save_lock = threading.Lock()
+
+    def load(self, stores: Optional[StoreCatalogue] = None) -> Tuple[List[ItemRecord], List[str], Optional[float]]:
+        """Wczytuje migawkę; zwraca (paczki, firmy, czas zapisu). Sklepy trafiają do katalogu stores"""
+        if not self.path.exists():
+            self.logger.debug("Brak migawki paczek")
+            return [], [], None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            version = data.get('version')
+            if stores is None:
+                stores = StoreCatalogue()
+
+            if version == SNAPSHOT_VERSION:
+                for entry in data.get('stores', []):
+                    stores.intern(Store.from_dict(entry))
+                packages = [ItemRecord.from_dict(item, stores) for item in data.get('packages', [])]
+            elif version == 2:
+                packages = [ItemRecord.from_dict(item, stores) for item in data.get('packages', [])]
+            elif version == 1:
+                packages = [ItemRecord.from_api(item, stores) for item in data.get('packages', [])]
+            else:
+                self.logger.warning("Nieobsługiwana wersja migawki, pomijam")
+                return [], [], None
+
+            companies = data.get('companies', [])
+            saved_at = data.get('saved_at')
+            self.logger.debug(f"Wczytano migawkę: {len(packages)} paczek, {len(companies)} firm")
+            return packages, companies, saved_at
+
+        except Exception as e:
+            self.logger.error(f"Błąd podczas wczytywania migawki: {e}")
+            return [], [], None
+
+    def save(self, packages: List[ItemRecord], companies: List[str]):
+        """Zapisuje migawkę atomowo"""
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'stores': [store.to_dict() for store in {id(item.store): item.store for item in packages}.values()],
+            'packages': [item.to_dict() for item in packages],
+            'companies': sorted(set(companies)),
+        }
+
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        try:
+            with self._save_lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self.last_save = time.monotonic()
+            self.logger.debug(f"Zapisano migawkę: {len(packages)} paczek")
+        except Exception as e:
+            self.logger.error(f"Błąd podczas zapisywania migawki: {e}")
+
+    def save_throttled(self, packages: List[ItemRecord], companies: List[str], min_interval: float = 60):
+        """Zapisuje migawkę nie częściej niż co min_interval sekund"""
+        if time.monotonic() - self.last_save >= min_interval:
+            self.save(packages, companies)
@@ -1,3 +1,4 @@
-from .logger import NiceLogger
+from .logger import NiceLogger, set_log_level, shutdown_logging
+from .async_bridge import AsyncLoopThread, TkAsyncBridge
 
-__all__ = ['NiceLogger']
\ No newline at end of file
+__all__ = ['NiceLogger', 'set_log_level', 'shutdown_logging', 'AsyncLoopThread', 'TkAsyncBridge']
@@ -0,0 +1,184 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional
+
+from .logger import NiceLogger
+
+
+class AsyncLoopThread:
+    """
+    Pętla asyncio działająca w dedykowanym wątku.
+
+    Cała praca sieciowa aplikacji trafia do tej jednej pętli, dzięki czemu
+    sesje aiohttp, semafory i zadania zawsze należą do tej samej pętli,
+    a wątek GUI pozostaje wolny.
+    """
+
+    def __init__(self, name: str = "asyncio-loop"):
+        self.logger = NiceLogger("AsyncLoopThread").get_logger()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._started = threading.Event()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def start(self):
+        """Uruchamia wątek pętli i czeka, aż pętla wystartuje"""
+        if not self._thread.is_alive():
+            self._thread.start()
+            self._started.wait()
+            self.logger.debug("Pętla asyncio uruchomiona w wątku %s", self._thread.name)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and self.loop.is_running()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Zleca korutynę do pętli w tle (bezpieczne z dowolnego wątku)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_sync(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Zleca korutynę i blokująco czeka na wynik — tylko poza pętlą w tle"""
+        return self.submit(coro).result(timeout)
+
+    def call_soon(self, callback: Callable, *args):
+        """Wywołuje funkcję w wątku pętli"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    async def _cancel_all(self):
+        tasks = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout: float = 5.0):
+        """Anuluje zadania, zatrzymuje pętlę i czeka na zakończenie wątku"""
+        if not self._thread.is_alive():
+            return
+
+        self.logger.debug("Zatrzymywanie pętli asyncio...")
+        try:
+            self.run_sync(self._cancel_all(), timeout)
+        except Exception as e:
+            self.logger.warning(f"Nie udało się anulować wszystkich zadań: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+        self.logger.debug("Pętla asyncio zatrzymana")
+
+
+class TkAsyncBridge:
+    """
+    Most między pętlą asyncio w wątku tła a wątkiem Tk.
+
+    Korutyny są zlecane do AsyncLoopThread, a ich wyniki (oraz dowolne wywołania
+    zgłoszone przez call_in_tk) trafiają do bezpiecznej wątkowo kolejki, którą
+    opróżnia wątek Tk. Kolejka jest sprawdzana często tylko wtedy, gdy jakieś
+    zadanie jest w toku — w spoczynku rzadkie sprawdzenie prawie nie zużywa CPU.
+    """
+
+    BUSY_INTERVAL = 20
+    IDLE_INTERVAL = 500
+
+    def __init__(self, root, loop_thread: AsyncLoopThread):
+        self.logger = NiceLogger("TkAsyncBridge").get_logger()
+        self.root = root
+        self.loop_thread = loop_thread
+        self._results: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._after_id = None
+        self._running = False
+
+    def start(self):
+        """Rozpoczyna opróżnianie kolejki w wątku Tk"""
+        self._running = True
+        self._schedule_drain()
+
+    def stop(self):
+        """Przestaje opróżniać kolejkę"""
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def submit(
+            self,
+            coro: Coroutine,
+            on_done: Optional[Callable[[Any], None]] = None,
+            on_error: Optional[Callable[[BaseException], None]] = None
+    ) -> Future:
+        """
+        Zleca korutynę do pętli w tle. Callbacki on_done / on_error są wywoływane w wątku Tk.
+        """
+        with self._lock:
+            self._outstanding += 1
+
+        future = self.loop_thread.submit(coro)
+        future.add_done_callback(lambda f: self._results.put((self._finish, (f, on_done, on_error))))
+
+        # Zadanie w toku — przejdź na częste sprawdzanie kolejki
+        if self._running and threading.current_thread() is threading.main_thread():
+            self._schedule_drain(self.BUSY_INTERVAL)
+
+        return future
+
+    def call_in_tk(self, callback: Callable, *args):
+        """Zleca wywołanie funkcji w wątku Tk (bezpieczne z dowolnego wątku)"""
+        self._results.put((callback, args))
+
+    def _finish(self, future: Future, on_done: Optional[Callable], on_error: Optional[Callable]):
+        with self._lock:
+            self._outstanding -= 1
+
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                self.logger.error(f"Błąd w zadaniu asynchronicznym: {error}")
+            return
+
+        if on_done:
+            on_done(future.result())
+
+    def _schedule_drain(self, delay: Optional[int] = None):
+        if not self._running:
+            return
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+
+        if delay is None:
+            delay = self.BUSY_INTERVAL if self._outstanding else self.IDLE_INTERVAL
+        self._after_id = self.root.after(delay, self._drain)
+
+    def _drain(self):
+        """Wykonuje w wątku Tk wszystkie oczekujące callbacki"""
+        self._after_id = None
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.error(f"Błąd w callbacku wątku Tk: {e}", exc_info=True)
+
+        self._schedule_drain()
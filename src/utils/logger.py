@@ -1,8 +1,14 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Optional, Set, Union
+
 import coloredlogs
 from enum import IntEnum
 
@@ -16,74 +22,152 @@ class LogLevel(IntEnum):
     CRITICAL = logging.CRITICAL
 
 
+LOG_FORMAT = (
+    '%(asctime)s.%(msecs)03d | '
+    '%(levelname)-8s | '
+    '%(name)s | '
+    '%(filename)s:%(lineno)d | '
+    '%(message)s'
+)
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, który w wątku wywołującym jedynie scala argumenty wiadomości.
+    Pełne formatowanie linii (czas, kolory) odbywa się w wątku zapisującym.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LoggingPipeline:
+    """Jednorazowo konfigurowane handlery współdzielone przez wszystkie loggery aplikacji"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue_handler: Optional[QueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.level = logging.getLevelName(os.environ.get('TGTG_LOG_LEVEL', 'DEBUG').upper())
+        if not isinstance(self.level, int):
+            self.level = logging.DEBUG
+        self.logger_names: Set[str] = set()
+
+    def ensure_configured(self) -> QueueHandler:
+        """Tworzy handlery przy pierwszym użyciu"""
+        if self.queue_handler is not None:
+            return self.queue_handler
+
+        with self.lock:
+            if self.queue_handler is not None:
+                return self.queue_handler
+
+            # Utworzenie katalogu na logi w Dokumentach
+            documents_path = Path.home() / "Documents" / "TGTG Detector"
+            log_dir = documents_path / "logs"
+            log_dir.mkdir(parents=True, exist_ok=True)
+
+            # Handler dla plików logów
+            current_time = datetime.now().strftime('%Y%m%d')
+            log_file = log_dir / f"tgtg_detector_{current_time}.log"
+
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=10 * 1024 * 1024,  # 10MB
+                backupCount=5,
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+            # Kolorowe logi w konsoli
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(coloredlogs.ColoredFormatter(
+                fmt=LOG_FORMAT,
+                datefmt=DATE_FORMAT,
+                level_styles={
+                    'debug': {'color': 'white'},
+                    'info': {'color': 'green'},
+                    'warning': {'color': 'yellow', 'bold': True},
+                    'error': {'color': 'red', 'bold': True},
+                    'critical': {'color': 'red', 'bold': True, 'background': 'white'}
+                },
+                field_styles={
+                    'asctime': {'color': 'cyan'},
+                    'levelname': {'color': 'white', 'bold': True},
+                    'filename': {'color': 'magenta'},
+                    'name': {'color': 'blue'},
+                }
+            ))
+
+            # Formatowanie i zapis odbywają się w osobnym wątku
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            self.listener = QueueListener(log_queue, file_handler, console_handler)
+            self.listener.start()
+            atexit.register(self.stop)
+
+            self.queue_handler = _DeferredQueueHandler(log_queue)
+            return self.queue_handler
+
+    def stop(self):
+        """Zapisuje zaległe wpisy i zatrzymuje wątek zapisujący"""
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+
+_pipeline = _LoggingPipeline()
+
+
+def set_log_level(level: Union[int, str]):
+    """
+    Ustawia poziom logowania wszystkich loggerów aplikacji.
+    Przy poziomie wyższym niż DEBUG wywołania logger.debug(...) z argumentami
+    w stylu %s nie formatują wiadomości ani nie tworzą rekordów.
+    """
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+
+    _pipeline.level = level
+    for name in _pipeline.logger_names:
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging():
+    """Opróżnia kolejkę logów i zatrzymuje wątek zapisujący"""
+    _pipeline.stop()
+
+
 class NiceLogger:
     """
-    Klasa zarządzająca logowaniem w aplikacji TGTG Detector
+    Klasa zarządzająca logowaniem w aplikacji TGTG Detector.
+
+    Handlery (plik + kolorowa konsola) są tworzone raz na proces. Każdy logger
+    dostaje jedynie współdzielony QueueHandler, a formatowanie i zapis wykonuje
+    wątek w tle, więc logowanie nie blokuje wątku Tk ani pętli asyncio.
     """
 
     def __init__(self, logger_name: str = "tgtg_detector"):
+        queue_handler = _pipeline.ensure_configured()
+
         self.logger = logging.getLogger(logger_name)
-        self.logger.setLevel(logging.DEBUG)
-
-        # Utworzenie katalogu na logi w Dokumentach
-        documents_path = Path.home() / "Documents" / "TGTG Detector"
-        log_dir = documents_path / "logs"
-        log_dir.mkdir(parents=True, exist_ok=True)
-
-        # Format logów
-        self.log_format = (
-            '%(asctime)s.%(msecs)03d | '
-            '%(levelname)-8s | '
-            '%(name)s | '
-            '%(filename)s:%(lineno)d | '
-            '%(message)s'
-        )
-
-        self.date_format = '%Y-%m-%d %H:%M:%S'
-
-        # Konfiguracja formattera
-        formatter = logging.Formatter(self.log_format, self.date_format)
-
-        # Handler dla plików logów
-        current_time = datetime.now().strftime('%Y%m%d')
-        log_file = log_dir / f"tgtg_detector_{current_time}.log"
-
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=5,
-            encoding='utf-8'
-        )
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(logging.DEBUG)
-
-        # Handler dla konsoli
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-
-        # Konfiguracja kolorowych logów w konsoli
-        coloredlogs.install(
-            level='DEBUG',
-            logger=self.logger,
-            fmt=self.log_format,
-            datefmt=self.date_format,
-            level_styles={
-                'debug': {'color': 'white'},
-                'info': {'color': 'green'},
-                'warning': {'color': 'yellow', 'bold': True},
-                'error': {'color': 'red', 'bold': True},
-                'critical': {'color': 'red', 'bold': True, 'background': 'white'}
-            },
-            field_styles={
-                'asctime': {'color': 'cyan'},
-                'levelname': {'color': 'white', 'bold': True},
-                'filename': {'color': 'magenta'},
-                'name': {'color': 'blue'},
-            }
-        )
-
-        # Dodanie handlerów do loggera
-        self.logger.addHandler(file_handler)
+        self.logger.setLevel(_pipeline.level)
+
+        if queue_handler not in self.logger.handlers:
+            self.logger.addHandler(queue_handler)
+            self.logger.propagate = False
+            _pipeline.logger_names.add(logger_name)
+
+        self.log_format = LOG_FORMAT
+        self.date_format = DATE_FORMAT
 
     def get_logger(self) -> logging.Logger:
         """Zwraca skonfigurowany logger"""
@@ -98,4 +182,4 @@ if __name__ == "__main__":
     logger.info("Aplikacja została uruchomiona")
     logger.warning("Uwaga! To jest ostrzeżenie")
     logger.error("Wystąpił błąd!")
-    logger.critical("Krytyczny błąd aplikacji!")
\ No newline at end of file
+    logger.critical("Krytyczny błąd aplikacji!")